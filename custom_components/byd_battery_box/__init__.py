@@ -9,7 +9,7 @@ from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTER
 from homeassistant.core import HomeAssistant
 
 from . import hub
-from .const import CONF_BMS_SCAN_INTERVAL, CONF_LOG_SCAN_INTERVAL, CONF_UNIT_ID, DOMAIN
+from .const import CONF_BMS_SCAN_INTERVAL, CONF_LOG_SCAN_INTERVAL, CONF_LOG_STORE, CONF_UNIT_ID, DEFAULT_LOG_STORE, DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -27,14 +27,17 @@ async def async_setup_entry(hass: HomeAssistant, entry: HubConfigEntry) -> bool:
     port = entry.data[CONF_PORT]
     unit_id = entry.data.get(CONF_UNIT_ID, 1)
     scan_interval = entry.data[CONF_SCAN_INTERVAL]
-    scan_interval_bms = entry.data[CONF_BMS_SCAN_INTERVAL]
+    scan_interval_bms = entry.options.get(CONF_BMS_SCAN_INTERVAL, entry.data[CONF_BMS_SCAN_INTERVAL])
     scan_interval_log = entry.data[CONF_LOG_SCAN_INTERVAL]
+    log_store = entry.data.get(CONF_LOG_STORE, DEFAULT_LOG_STORE)
 
     _LOGGER.debug("Setup %s.%s", DOMAIN, name)
 
     # Store an instance of the "connecting" class that does the work of speaking
     # with your actual devices.
-    entry.runtime_data = hub.Hub(hass = hass, name = name, host = host, port = port, unit_id=unit_id, scan_interval = scan_interval, scan_interval_bms = scan_interval_bms, scan_interval_log=scan_interval_log)
+    entry.runtime_data = hub.Hub(hass = hass, name = name, host = host, port = port, unit_id=unit_id, scan_interval = scan_interval, scan_interval_bms = scan_interval_bms, scan_interval_log=scan_interval_log, log_store=log_store, entry_id=entry.entry_id, options=dict(entry.options))
+
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     await entry.runtime_data.init_data()
 
@@ -43,6 +46,10 @@ async def async_setup_entry(hass: HomeAssistant, entry: HubConfigEntry) -> bool:
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
     return True
 
+async def async_update_options(hass: HomeAssistant, entry: HubConfigEntry) -> None:
+    """Reload the entry after the options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     # This is called when an entry/configured device is to be removed. The class
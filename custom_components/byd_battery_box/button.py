@@ -11,6 +11,7 @@ from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from . import HubConfigEntry
 from .const import (
     BMU_BUTTON_TYPES,
+    BMU_ONLY_BUTTON_TYPES,
     ENTITY_PREFIX,
 )
 from .hub import Hub
@@ -28,7 +29,7 @@ async def async_setup_entry(
 
     entities = []
 
-    for info in BMU_BUTTON_TYPES.values():
+    for info in (BMU_BUTTON_TYPES | BMU_ONLY_BUTTON_TYPES).values():
         button = BydBoxButton(
             platform_name = ENTITY_PREFIX,
             hub = hub,
@@ -94,6 +95,7 @@ class BydBoxButton(ButtonEntity):
         # Key patterns:
         # - update_log_history_XXX
         # - reset_history
+        # - export_log_files
         parts = self._key.split('_')
         device = parts[0]
         if 'bms' in device:
@@ -105,6 +107,10 @@ class BydBoxButton(ButtonEntity):
             self._hub.reset_history_cell_voltage(device_id)
             return
 
+        if self._key == 'export_log_files':
+            await self._hub.async_export_log_files()
+            return
+
         # default: update log history buttons
         try:
             log_depth = int(float(parts[-1]) * 0.05)
@@ -8,37 +8,99 @@ import csv
 import json
 import logging
 import os
+import struct
+import sys
 import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque
 from datetime import datetime
 
 from .bydbox_const import (
     APPLICATION_LIST,
     BMS_ERRORS,
     BMS_LOG_CODES,
-    BMS_POWER_OFF,
-    BMS_STATUS_OFF,
-    BMS_STATUS_ON,
     BMS_WARNINGS,
     BMS_WARNINGS3,
-    BMU_CALIBRATION,
     BMU_ERRORS,
     BMU_LOG_CODES,
-    BMU_LOG_ERRORS,
-    BMU_LOG_WARNINGS,
-    BMU_STATUS,
-    DATA_POINTS,
     HVL_INVERTER_LIST,
     INVERTER_LIST,
     LVS_INVERTER_LIST,
     MODULE_SPECS,
-    MODULE_TYPE,
     PHASE_LIST,
     WORKING_AREA,
 )
+from .cells import CellHistory, CellView, array_from_cells, dedupe_view, materialize
 from .extmodbusclient import ExtModbusClient
+from .logdecoder import (
+    BALANCING_CELLS,
+    BALANCING_FLAG_BYTES,
+    LOG_CODE_BALANCING,
+    LOG_UNIT_BMS,
+    LOG_UNIT_BMU,
+    balancing_cells,
+    decode_log_record,
+    log_record_to_str,
+    log_unit_type,
+)
+from .logindex import LogIndex
+from .logstore import LOG_STORES, LogJournal
+from .registers import (
+    BMS_BALANCING_MODULES,
+    BMS_BALANCING_OFFSET,
+    BMS_CELL_SLOTS,
+    BMS_READOUT_REGS,
+    BMS_STATUS_BLOCK,
+    BMS_STATUS_REGS,
+    BMS_TEMP_SLICES,
+    BMS_TEMP_SLOTS,
+    BMS_VOLTAGE_SLICES,
+    BMU_STATUS_BLOCK,
+    EXT_INFO_BLOCK,
+    INFO_BLOCK,
+    LOG_PAGE_RECORDS,
+    LOG_READOUT,
+    LOG_READOUT_REGS,
+    LOG_READOUTS,
+    LOG_RECORD,
+)
+from .scheduler import (
+    PRIORITY_BMS,
+    PRIORITY_BMU,
+    PRIORITY_LOG,
+    PRIORITY_LOG_HISTORY,
+    PRIORITY_PROBE,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+LOG_UNITS = 4 # BMU and up to 3 BMS
+LOG_RETENTION_DAYS = 30
+LOG_ARCHIVE_RETENTION_DAYS = 5 * 365 # stores keeping only a window of the log in memory
+LOG_HISTORY_KNOWN_PAGES = 2 # consecutive stored pages after which a history download may stop
+SNAPSHOT_VERSION = 1
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0) # upper bounds (s) of the call latency histograms
+# topology restored from the warm-start snapshot, next to the last data values
+SNAPSHOT_ATTRS = ('_bms_qty', '_modules', '_cells', '_temps', '_bat_type')
+SNAPSHOT_SKIP_KEYS = ('log', 'log_entries', 'log_count', 'log_history', 'log_history_progress')
+CELL_HISTORY_KEYS = (
+    '_cell_voltages_max_history',
+    '_cell_voltages_min_history',
+    '_max_history_cell_voltage',
+    '_max_history_cell_voltage_cells',
+    '_min_history_cell_voltage',
+    '_min_history_cell_voltage_cells',
+)
+BMS_STATUS_REG31_47 = [6659, 7683, 256, 20528, 13104, 21552, 12848, 23090, 12848, 14129, 12593, 13619, 12920, 30840, 30840, 270, 270]
+# bits of a byte, least significant first
+BYTE_BITS = tuple(tuple((v >> bit) & 1 for bit in range(8)) for v in range(256))
+
+def materialize_json(value):
+    if isinstance(value, CellView):
+        return materialize(value)
+    return None
+
 class BydBoxClient(ExtModbusClient):
     """Async Modbus Client for BYD Battery Box"""
 
@@ -50,26 +112,52 @@ class BydBoxClient(ExtModbusClient):
     _temps = 0 # number of temp sensors per module
     _bat_type = ''
     _new_logs = {}
-    _b_cells_total = {}
     _min_response_delay = 0.2 # minimum delayin s after write register
     _retry_delay = 0.2
+    log_max_entries = None # optional retention by count in addition to the age, set from the options
+    log_max_bytes = None # optional retention by approximate stored size, set from the options
 
     data = {}
-    log = {}
 
-    def __init__(self, host: str, port: int, unit_id: int, timeout: int) -> None:
+    def __init__(self, host: str, port: int, unit_id: int, timeout: int, log_store: str = 'jsonl') -> None:
         """Init Class"""
         super().__init__(host = host, port = port, unit_id=unit_id, timeout=timeout, framer='rtu')
 
         self.data['unit_id'] = unit_id
+        self.log = LogIndex()
 
-        self._log_path = './custom_components/byd_battery_box/logs/'
-        self._log_csv_path = self._log_path + 'byd_log.csv'
-        self._log_txt_path = self._log_path + 'byd.log'
-        self._log_json_path = self._log_path + 'byd_log.json'
+        self._log_store_type = log_store
+        self._log_floor = None # oldest key in memory while older entries are only in the store
+        self._archived_keys = frozenset() # keys in the store, replaced by the executor after each load/save
+
+        self.set_log_path('./custom_components/byd_battery_box/logs/')
 
         # Initialize connection health monitor
         self.health_monitor = self.ConnectionHealthMonitor(self)
+        self.response_wait = self.ResponseWaitEstimator(self._min_response_delay, self._retry_delay)
+        self.log_cache = self.DecodedLogCache()
+        self.log_tail = self.LogTailCursor()
+        # balancing events (log code 17) per BMS and per cell, maintained as entries come and go
+        self._b_total = [0] * LOG_UNITS
+        self._b_cells_total = [array('I', [0]) * BALANCING_CELLS for _ in range(LOG_UNITS)]
+        self._cell_history = {} # CellHistory per BMS
+        self._log_history_coverage = {} # pages of the last finished history download per unit
+
+    def set_log_path(self, path: str) -> None:
+        self._log_path = path
+        self._log_csv_path = self._log_path + 'byd_log.csv'
+        self._log_txt_path = self._log_path + 'byd.log'
+        self._log_json_path = self._log_path + 'byd_log.json' # legacy full rewrite format, migrated to the journal
+        self._log_journal_path = self._log_path + 'byd_log.jsonl'
+        self._log_history_path = self._log_path + 'log_history_job.json'
+        self._log_history_coverage_path = self._log_path + 'log_history_coverage.json'
+        self._snapshot_path = self._log_path + 'device_snapshot.json'
+        store_class, file_name = LOG_STORES[self._log_store_type]
+        self.log_store = store_class(self._log_path + file_name)
+
+    @property
+    def log_retention_days(self) -> int:
+        return LOG_ARCHIVE_RETENTION_DAYS if self.log_store.memory_entries else LOG_RETENTION_DAYS
 
     def get_connection_metrics(self):
         """Return current connection health data for HA sensor."""
@@ -82,81 +170,146 @@ class BydBoxClient(ExtModbusClient):
             'connection_quality': round(self.health_monitor.connection_quality * 100, 1),
             'last_latency': round(self.health_monitor.last_latency, 3) if self.health_monitor.last_latency else None,
             'avg_latency': round(self.health_monitor.avg_latency, 3) if self.health_monitor.avg_latency else None,
+            'error_rate': round(self.health_monitor.error_rate * 100, 1),
             'consecutive_failures': self.health_monitor.consecutive_failures,
             'last_success': self.health_monitor.last_success.isoformat() if self.health_monitor.last_success else None,
             'connection_health': 'healthy' if health_status else 'unhealthy'
         }
 
+    def _observe_call(self, operation, start, ok) -> None:
+        self.health_monitor.observe(operation, time.perf_counter() - start, ok)
+
     class ClientBusyLock:
-        """Async context manager for managing client busy state."""
+        """Async context manager holding the Modbus link for one transaction.
 
-        def __init__(self, client):
+        Waiters are served by priority (BMU > BMS > log tail > log history)
+        and woken on release instead of polling a busy flag.
+        """
+
+        def __init__(self, client, priority=PRIORITY_BMU):
             self.client = client
+            self.priority = priority
 
         async def __aenter__(self):
-            while self.client.busy:
-                await asyncio.sleep(0.1)
-            self.client.busy = True
+            await self.client.scheduler.acquire(self.priority)
             return self
 
         async def __aexit__(self, exc_type, exc_val, exc_tb):
-            self.client.busy = False
+            self.client.scheduler.release()
 
     class ConnectionHealthMonitor:
-        """Monitors connection health metrics and quality."""
+        """Connection health derived from the timings of the real Modbus traffic.
+
+        Every read and write call lands in a latency histogram per operation
+        and in a window of recent outcomes for the error rate. A probe read is
+        only sent when the link has been idle for idle_threshold, and then
+        holds the link like any other transaction.
+        """
 
-        def __init__(self, client, update_interval=60):
+        def __init__(self, client, update_interval=60, idle_threshold=120, window=100):
             self.client = client
             self.last_latency = None
             self.avg_latency = None
-            self.connection_quality = 1.0  # 0.0 to 1.0
             self.last_success = None
             self.consecutive_failures = 0
             self.update_interval = update_interval
+            self.idle_threshold = idle_threshold
+            self.histograms = {'read': self.LatencyHistogram(), 'write': self.LatencyHistogram()}
+            self.last_activity = None
+            self.probes = 0
+            self.probes_skipped = 0
+            self._outcomes = deque(maxlen=window)
             self._monitor_task = None
 
-        async def measure_latency(self) -> float | None:
-            start = time.perf_counter()
-            try:
-                # Quick, low-impact register read for measurement
-                result = await self.client.read_holding_registers(
-                    unit_id=self.client._unit_id,
-                    address=0x0000,  # Basic info register - low impact
-                    count=1
-                )
-                if result:
-                    latency = time.perf_counter() - start
-                    self.last_latency = latency
-
-                    # Update rolling average
-                    if self.avg_latency is None:
-                        self.avg_latency = latency
-                    else:
-                        self.avg_latency = (self.avg_latency * 0.8) + (latency * 0.2)
-
-                    # Calculate quality score (inverse relationship with latency)
-                    self.connection_quality = max(0.0, min(1.0, 2.0 / (1.0 + latency)))
-
-                    self.last_success = datetime.now()
-                    self.consecutive_failures = 0
-                    return latency
-            except Exception as e:
+        class LatencyHistogram:
+            """Call latencies (s) counted per LATENCY_BUCKETS upper bound, the last bucket is open."""
+
+            def __init__(self):
+                self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+                self.count = 0
+                self.errors = 0
+                self.total = 0.0
+                self.max = 0.0
+
+            def add(self, latency, ok) -> None:
+                self.buckets[bisect_left(LATENCY_BUCKETS, latency)] += 1
+                self.count += 1
+                self.total += latency
+                self.max = max(self.max, latency)
+                if not ok:
+                    self.errors += 1
+
+            def get_stats(self) -> dict:
+                bounds = [f'le_{bound}' for bound in LATENCY_BUCKETS] + ['inf']
+                return {
+                    'count': self.count,
+                    'errors': self.errors,
+                    'avg': round(self.total / self.count, 3) if self.count else None,
+                    'max': round(self.max, 3),
+                    'buckets': dict(zip(bounds, self.buckets, strict=True)),
+                }
+
+        def observe(self, operation, latency, ok) -> None:
+            """Record one Modbus call of the given operation ('read' or 'write')."""
+            self.last_activity = time.monotonic()
+            self.histograms[operation].add(latency, ok)
+            self._outcomes.append(ok)
+            if not ok:
                 self.consecutive_failures += 1
-                _LOGGER.debug(f"Latency measurement failed: {e}")
-
-            return None
-
-        async def health_check(self) -> bool:
-            latency = await self.measure_latency()
-            # Consider healthy if latency < 5s and not too many consecutive failures
-            return (latency is not None and latency < 5.0 and
-                    self.consecutive_failures < 3)
+                return
+            self.consecutive_failures = 0
+            self.last_success = datetime.now()
+            self.last_latency = latency
+            if self.avg_latency is None:
+                self.avg_latency = latency
+            else:
+                self.avg_latency = (self.avg_latency * 0.8) + (latency * 0.2)
+
+        @property
+        def error_rate(self) -> float:
+            """Share of failed calls within the window."""
+            if not self._outcomes:
+                return 0.0
+            return self._outcomes.count(False) / len(self._outcomes)
+
+        @property
+        def connection_quality(self) -> float:
+            """0.0 to 1.0, falls with the average latency and the error rate."""
+            quality = 1.0 if self.avg_latency is None else max(0.0, min(1.0, 2.0 / (1.0 + self.avg_latency)))
+            return quality * (1.0 - self.error_rate)
+
+        def idle_time(self) -> float:
+            if self.last_activity is None:
+                return float('inf')
+            return time.monotonic() - self.last_activity
+
+        async def probe(self) -> bool:
+            """Read one register so an idle link is still measured."""
+            async with self.client.ClientBusyLock(self.client, PRIORITY_PROBE):
+                # traffic that held the link meanwhile measured it already
+                if self.idle_time() < self.idle_threshold:
+                    self.probes_skipped += 1
+                    return True
+                self.probes += 1
+                result = await self.client.read_holding_registers(unit_id=self.client._unit_id, address=0x0000, count=1, retries=0)
+            return result is not None
 
         async def periodic_health_update(self):
-            """Run health checks periodically"""
+            """Probe the link whenever it was idle for idle_threshold"""
             while True:
-                await self.measure_latency()
                 await asyncio.sleep(self.update_interval)
+                if self.idle_time() >= self.idle_threshold:
+                    await self.probe()
+
+        def get_stats(self) -> dict:
+            return {
+                'window': len(self._outcomes),
+                'error_rate': round(self.error_rate, 3),
+                'idle': round(self.idle_time(), 1) if self.last_activity is not None else None,
+                'probes': self.probes,
+                'probes_skipped': self.probes_skipped,
+                'histograms': {operation: histogram.get_stats() for operation, histogram in self.histograms.items()},
+            }
 
         def start_monitoring(self):
             """Start the background monitoring task"""
@@ -176,24 +329,198 @@ class BydBoxClient(ExtModbusClient):
                     self._monitor_task = None
                 _LOGGER.debug("Connection health monitoring stopped")
 
+    class ResponseWaitEstimator:
+        """Learns how long the gateway needs before 0x0551/0x05A1 report ready.
+
+        Every wait yields a readiness sample: the midpoint between the last
+        missed probe and the successful one, or a slightly shrunk upper bound
+        when the first probe already hit, so the schedule keeps probing for a
+        faster gateway. The first probe is placed at the learned p75 and
+        misses back off from the observed spread up to the retry delay.
+        """
+
+        NAMES = {0x0551: 'bms', 0x05A1: 'log'}
+        MIN_SAMPLES = 5
+        MIN_STEP = 0.05
+        FIRST_HIT_SHRINK = 0.8
+
+        def __init__(self, default_first, default_step, window=20):
+            self.default_first = default_first
+            self.default_step = default_step
+            self._samples = {}
+            self._stats = {}
+            self._window = window
+
+        def _percentile(self, values, pct):
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round((len(ordered) - 1) * pct)))]
+
+        def first_delay(self, address) -> float:
+            samples = self._samples.get(address)
+            if samples is None or len(samples) < self.MIN_SAMPLES:
+                return self.default_first + self.default_step
+            return max(self.MIN_STEP, self._percentile(samples, 0.75))
+
+        def next_delay(self, address, misses) -> float:
+            samples = self._samples.get(address)
+            if samples is None or len(samples) < self.MIN_SAMPLES:
+                return self.default_step
+            spread = self._percentile(samples, 0.95) - self._percentile(samples, 0.75)
+            step = max(self.MIN_STEP, spread / 2) * (2 ** (misses - 1))
+            return min(self.default_step, step)
+
+        def _get_stats(self, address) -> dict:
+            return self._stats.setdefault(address, {'waits': 0, 'probes': 0, 'timeouts': 0, 'wait_time': 0.0})
+
+        def record(self, address, elapsed, probes, last_miss=None):
+            if last_miss is None:
+                sample = elapsed * self.FIRST_HIT_SHRINK
+            else:
+                sample = (last_miss + elapsed) / 2
+            self._samples.setdefault(address, deque(maxlen=self._window)).append(sample)
+            stats = self._get_stats(address)
+            stats['waits'] += 1
+            stats['probes'] += probes
+            stats['wait_time'] += elapsed
+
+        def record_timeout(self, address, probes):
+            stats = self._get_stats(address)
+            stats['timeouts'] += 1
+            stats['probes'] += probes
+
+        def get_stats(self) -> dict:
+            result = {}
+            for address, stats in self._stats.items():
+                samples = self._samples.get(address) or []
+                waits = stats['waits']
+                result[self.NAMES.get(address, f'0x{address:04X}')] = {
+                    'samples': len(samples),
+                    'ready_p50': round(self._percentile(samples, 0.5), 3) if samples else None,
+                    'ready_p95': round(self._percentile(samples, 0.95), 3) if samples else None,
+                    'first_probe': round(self.first_delay(address), 3),
+                    'waits': waits,
+                    'timeouts': stats['timeouts'],
+                    'probes_per_wait': round(stats['probes'] / waits, 2) if waits else None,
+                    'avg_wait': round(stats['wait_time'] / waits, 3) if waits else None,
+                }
+            return result
+
+    class DecodedLogCache:
+        """LRU cache of decoded log entries keyed by log key.
+
+        Log entries never change once written, so the decoded record
+        (timestamp, unit name, code description, datapoints, detail and hex
+        data) is kept and rendering the log only decodes new entries.
+        """
+
+        def __init__(self, maxsize=10000):
+            self.maxsize = maxsize
+            self._records = OrderedDict()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+        def get(self, key):
+            record = self._records.get(key)
+            if record is None:
+                self.misses += 1
+                return None
+            self._records.move_to_end(key)
+            self.hits += 1
+            return record
+
+        def put(self, key, record) -> None:
+            self._records[key] = record
+            self._records.move_to_end(key)
+            if len(self._records) > self.maxsize:
+                self._records.popitem(last=False)
+                self.evictions += 1
+
+        def clear(self) -> None:
+            self._records.clear()
+
+        def get_stats(self) -> dict:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._records),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+    class LogTailCursor:
+        """Newest known log key per unit and counters of the log tail reads.
+
+        A log page lists the newest entry first, so a tail read stops at the
+        first known entry and only reads the readouts up to it. An unchanged
+        unit costs one readout instead of five. A page that ends with the log
+        of the unit is counted as ended, not as unchanged.
+        """
+
+        def __init__(self):
+            self.keys = {}
+            self.unchanged = 0
+            self.partial = 0
+            self.full = 0
+            self.ended = 0
+            self.new_entries = 0
+            self.readouts = 0
+            self.readouts_skipped = 0
+
+        def known(self, unit_id, k) -> bool:
+            return self.keys.get(unit_id) == k
+
+        def record(self, unit_id, newest, added, readouts, stopped, ended) -> None:
+            if newest is not None:
+                self.keys[unit_id] = newest
+            self.new_entries += added
+            self.readouts += readouts
+            self.readouts_skipped += LOG_READOUTS - readouts
+            if ended:
+                self.ended += 1
+            elif not stopped:
+                self.full += 1
+            elif added == 0:
+                self.unchanged += 1
+            else:
+                self.partial += 1
+
+        def get_stats(self) -> dict:
+            return {
+                'cursor': {str(unit_id): k for unit_id, k in self.keys.items()},
+                'unchanged': self.unchanged,
+                'partial': self.partial,
+                'full': self.full,
+                'ended': self.ended,
+                'new_entries': self.new_entries,
+                'readouts': self.readouts,
+                'readouts_skipped': self.readouts_skipped,
+            }
+
     async def init_data(self, close = False) -> bool:
-        async with self.ClientBusyLock(self):
+        async with self.ClientBusyLock(self, PRIORITY_BMU):
             if not self._client.connected:
                 await self._client.connect()
 
             try:
-                await self.update_info_data()
+                info = await self.update_info_data()
             except Exception:
                 raise Exception(f"Error reading base info unit id: {self._unit_id}")
 
             try:
-                await self.update_ext_info_data()
+                ext_info = await self.update_ext_info_data()
             except Exception:
                 raise Exception(f"Error reading ext info unit id: {self._unit_id}")
 
             self.initialized = True
             if close:
                 self.close()
+            if not (info and ext_info):
+                # a connected device that does not answer, topology values were not read
+                _LOGGER.warning(f"No info data read from unit id: {self._unit_id} base info: {info} ext info: {ext_info}")
+                return False
             _LOGGER.debug("init done.")
             return True
 
@@ -207,39 +534,105 @@ class BydBoxClient(ExtModbusClient):
                 _LOGGER.error(f'Failed to create log folder {self._log_path}')
                 return False
 
-        if os.path.isfile(self._log_json_path):
-            try:
-                with open(self._log_json_path) as openfile:
-                    # Reading from json file
-                    log = json.load(openfile)
-            except Exception as e:
-                _LOGGER.debug(f"Failed loading json log file {e}")
+        cutoff_timestamp = datetime.now().timestamp() - (self.log_retention_days * 24 * 60 * 60)
+        try:
+            if not self.log_store.exists() and not self._migrate_log_files():
                 return False
-            #self.save_log_txt_file(log, append=False)
-            self.log = log
-            self.data['log_entries'] = len(self.log)
-            self.data['log'] = self.get_log_list(20)
-            self._update_balancing_cells_totals()
-            self.save_log_csv_file()
-            _LOGGER.debug(f"log entries loaded: {len(log)}")
-
-            #TODO update last_log per unit
-            # last_log = logs[-1]
-            # log = {'ts': ts.timestamp(), 'u': unit_id, 'c': code, 'data': hexdata}
-            # last_log_id = self._get_unit_log_sensor_id(0)
-            # code_desc = self._get_log_code_desc(unit_id, code)
-            # self.data[last_log_id] = f'{ts.strftime("%m/%d/%Y, %H:%M:%S")} {code} {code_desc}'
-            return True
+            if self.log_store.memory_entries:
+                cutoff_timestamp = self._store_retention_cutoff(cutoff_timestamp)
+                self.log_store.prune(cutoff_timestamp)
+            log = self.log_store.load()
+        except Exception as e:
+            _LOGGER.debug(f"Failed loading log file {e}")
+            return False
+
+        # entries expired since the last run are still in the journal until it is compacted
+        log = LogIndex(log)
+        if self.log_store.memory_entries:
+            # count and size limits are applied to the archive store above
+            log.trim(cutoff_timestamp)
+        else:
+            log.trim(cutoff_timestamp, self.log_max_entries, self.log_max_bytes)
+        if self.log_store.needs_compaction(len(log)):
+            self.log_store.compact(log)
+        self.log = log
+        self._update_log_floor()
+        self._refresh_archived_keys()
+        self.data['log_entries'] = self.get_log_entry_count()
+        self.data['log'] = self.get_log_list(20)
+        self.rebuild_balancing_totals()
+        self._update_balancing_cells_totals()
+        _LOGGER.debug(f"log entries loaded: {len(log)}")
+
+        #TODO update last_log per unit
+        # last_log = logs[-1]
+        # log = {'ts': ts.timestamp(), 'u': unit_id, 'c': code, 'data': hexdata}
+        # last_log_id = self._get_unit_log_sensor_id(0)
+        # code_desc = self._get_log_code_desc(unit_id, code)
+        # self.data[last_log_id] = f'{ts.strftime("%m/%d/%Y, %H:%M:%S")} {code} {code_desc}'
+        return True
 
+    def _migrate_log_files(self) -> bool:
+        """Import the log of an older file format into the configured store."""
+        for path in (self._log_journal_path, self._log_json_path):
+            if path == self.log_store.path or not os.path.isfile(path):
+                continue
+            if path == self._log_json_path:
+                with open(path) as openfile:
+                    log = json.load(openfile)
+            else:
+                log = LogJournal(path).load()
+            self.log_store.import_entries(log)
+            os.replace(path, path + '.bak')
+            _LOGGER.info(f"migrated {len(log)} log entries from {path} to {self.log_store.path}")
+            return True
         return False
 
-    async def update_all_bms_status_data(self) -> bool:
-        async with self.ClientBusyLock(self):
+    def _update_log_floor(self) -> None:
+        window = self.log_store.memory_entries
+        if window and len(self.log) >= window:
+            self._log_floor = self.log.oldest_key()
+        else:
+            self._log_floor = None
+
+    def _refresh_archived_keys(self, added=None) -> None:
+        """Rebuild the key set of a windowed store, or extend it by the keys just appended; runs in the executor."""
+        if not self.log_store.memory_entries:
+            return
+        if added is None:
+            keys = frozenset(k for k, _ in self.log_store.iter_entries())
+        else:
+            keys = self._archived_keys.union(added)
+        # swapped in one assignment, the event loop only reads the set
+        self._archived_keys = keys
+
+    def _log_archived(self, k) -> bool:
+        """True if k is not newer than the in-memory window and already in the store."""
+        # compare the timestamps only, entries of the same second may sort differently in the store;
+        # runs on the event loop for every parsed record, so the store itself is not queried
+        return self._log_floor is not None and k[:17] <= self._log_floor[:17] and k in self._archived_keys
+
+    def get_log_entry_count(self) -> int:
+        if self.log_store.memory_entries:
+            return len(self._archived_keys) + len(self._new_logs)
+        return len(self.log)
+
+    def iter_log_entries(self, code=None):
+        """Yield (key, entry) of the full log in key order."""
+        if self.log_store.memory_entries:
+            yield from self.log_store.iter_entries(code)
+            return
+        for k, entry in self.log.items():
+            if code is None or entry['c'] == code:
+                yield k, entry
+
+    async def update_all_bms_status_data(self, full=True) -> bool:
+        async with self.ClientBusyLock(self, PRIORITY_BMS):
             for bms_id in range(1, self._bms_qty + 1):
                 if bms_id > 0:
                     await asyncio.sleep(.2)
                 try:
-                    result = await self.update_bms_status_data(bms_id)
+                    result = await self.update_bms_status_data(bms_id, full=full)
                 except Exception:
                     _LOGGER.error(f"Error reading BMS status data {bms_id}", exc_info=True)
                     return False
@@ -249,7 +642,7 @@ class BydBoxClient(ExtModbusClient):
             return True
 
     async def update_all_log_data(self) -> bool:
-        async with self.ClientBusyLock(self):
+        async with self.ClientBusyLock(self, PRIORITY_LOG):
             result = False
             self._new_logs = {}
             for device_id in range(self._bms_qty + 1):
@@ -265,55 +658,54 @@ class BydBoxClient(ExtModbusClient):
 
             self.data['log'] = self.get_log_list(20)
             self._update_balancing_cells_totals()
-            self.data['log_entries'] = len(self.log)
+            self.data['log_entries'] = self.get_log_entry_count()
             return True
 
+    def _count_balancing(self, entry:dict, step=1) -> None:
+        """Add (step=1) or remove (step=-1) a log entry from the balancing counters."""
+        if entry['c'] == LOG_CODE_BALANCING:
+            self._count_balancing_flags(entry['u'], bytes.fromhex(entry['data'][:BALANCING_FLAG_BYTES * 2]), step)
+
+    def _count_balancing_flags(self, unit_id, flags, step=1) -> None:
+        if not (1 <= unit_id < len(self._b_total)):
+            return
+        self._b_total[unit_id] += step
+        counts = self._b_cells_total[unit_id]
+        for cell_id in balancing_cells(flags):
+            counts[cell_id] += step
+
+    def rebuild_balancing_totals(self) -> None:
+        """Recount the balancing counters from the full log."""
+        for unit_id in range(len(self._b_total)):
+            self._b_total[unit_id] = 0
+            self._b_cells_total[unit_id] = array('I', [0]) * BALANCING_CELLS
+        if self.log_store.memory_entries:
+            for unit_id, _, payload in self.log_store.iter_payloads(LOG_CODE_BALANCING):
+                self._count_balancing_flags(unit_id, payload)
+            return
+        for log in self.log.values():
+            self._count_balancing(log)
+
     def _update_balancing_cells_totals(self) -> None:
         try:
             if len(self.log) == 0:
                 # skip until logs are available
                 return
-            balancing_total = [0, 0, 0, 0]
-            b_cells_total = {}
-            for _k, log in self.log.items():
-                if log['c'] == 17:
-                    ts = datetime.fromtimestamp(log['ts'])
-                    decoded = self.decode_bms_log_data(ts, 17, bytearray.fromhex(log['data']))
-                    b_cells = decoded['b_cells']
-                    unit_id = log['u']
-                    if not (1 <= unit_id < len(balancing_total)):
-                        continue
-                    balancing_total[unit_id] += 1
-                    unit_b_cells_total = {}
-                    if unit_id in b_cells_total:
-                        unit_b_cells_total = b_cells_total.get(unit_id)
-                    for cell_id in b_cells:
-                        if cell_id in unit_b_cells_total:
-                            unit_b_cells_total[cell_id] += 1
-                        else:
-                            unit_b_cells_total[cell_id] = 1
-                    b_cells_total[unit_id] = unit_b_cells_total
-
             for bms_id in range(1, self._bms_qty + 1):
                 r = None
-                if b_cells_total.get(bms_id) is not None:
-                    r = self._get_balancings_totals_per_module(b_cells_total.get(bms_id))
-                self.data[f'bms{bms_id}_b_total'] = balancing_total[bms_id]
+                if self._b_total[bms_id] > 0:
+                    r = self._get_balancings_totals_per_module(self._b_cells_total[bms_id])
+                self.data[f'bms{bms_id}_b_total'] = self._b_total[bms_id]
                 self.data[f'bms{bms_id}_b_cells_total'] = r
         except Exception as e:
             _LOGGER.error(f'Unknown error calculation balancing totals {e}', exc_info=True)
-        #_LOGGER.debug(f'balancing {balancing_total[1]} {self._b_cells_total.get(1)}')
-        #_LOGGER.debug(f'balancing {balancing_total[2]} {self._b_cells_total.get(2)}')
 
-    def _get_balancings_totals_per_module(self, t) -> list:
+    def _get_balancings_totals_per_module(self, counts) -> list:
         r = []
         for m in range(self._modules):
-            mct = []
-            for c in range(self._cells):
-                ct = t.get(str((m * self._cells) + c))
-                if ct is None:
-                    ct = 0
-                mct.append(ct)
+            mct = counts[m * self._cells:(m + 1) * self._cells].tolist()
+            if len(mct) < self._cells:
+                mct += [0] * (self._cells - len(mct))
             r.append({'m': m, 'bct':mct})
         return r
 
@@ -332,20 +724,16 @@ class BydBoxClient(ExtModbusClient):
 
     async def update_info_data(self) -> bool:
         """start reading info data"""
-        regs = await self.get_registers(address=0x0000, count=20)
+        regs = await self.get_registers(address=INFO_BLOCK.address, count=INFO_BLOCK.count)
         if regs is None:
             return False
 
-        bmuSerial = self._client.convert_from_registers(regs[0:10], data_type = self._client.DATATYPE.STRING)[:-1]
+        info = INFO_BLOCK.decode(regs)
+        bmuSerial = info['serial'][:-1]
         # 10-12 ?
         _LOGGER.debug(f'bmu reg 10-12: {regs[10:12]}')
-        bmu_v_A_1, bmu_v_A_2 = self.convert_from_registers_int8(regs[12:13])
-        bmu_v_B_1, bmu_v_B_2 = self.convert_from_registers_int8(regs[13:14])
-        bms_v1, bms_v2 = self.convert_from_registers_int8(regs[14:15])
-        bmu_area, bms_area = self.convert_from_registers_int8(regs[15:16])
-        towers, modules = self.convert_from_registers_int4(regs[16:17])
-        application_id, lvs_type_id = self.convert_from_registers_int8(regs[17:18])
-        phase_id = self.convert_from_registers_int8(regs[18:19])[0]
+        towers = info['towers']
+        modules = info['modules']
         # 19-21 ?
         _LOGGER.debug(f'bmu reg 19-21: {regs[19:21]}')
 
@@ -363,11 +751,11 @@ class BydBoxClient(ExtModbusClient):
         else:
             _LOGGER.error(f'Battery type HV/LV could not be determined. SN starts wtih: {bmuSerial[:4]} ')
 
-        bmu_v_A = f'{bmu_v_A_1}.{bmu_v_A_2}'
-        bmu_v_B = f'{bmu_v_B_1}.{bmu_v_B_2}'
-        bms_v = f'{bms_v1}.{bms_v2}'
+        bmu_v_A = f"{info['bmu_v_A_1']}.{info['bmu_v_A_2']}"
+        bmu_v_B = f"{info['bmu_v_B_1']}.{info['bmu_v_B_2']}"
+        bms_v = f"{info['bms_v_1']}.{info['bms_v_2']}"
 
-        if bmu_area == 0:
+        if info['bmu_area'] == 0:
             bmu_v = bmu_v_A
         else:
             bmu_v = bmu_v_B
@@ -379,28 +767,29 @@ class BydBoxClient(ExtModbusClient):
         self.data['bmu_v_B'] = bmu_v_B
         self.data['bmu_v'] = bmu_v
         self.data['bms_v'] = bms_v
-        self.data['bmu_area'] = WORKING_AREA[bmu_area]
-        self.data['bms_area'] = WORKING_AREA[bms_area]
+        self.data['bmu_area'] = WORKING_AREA[info['bmu_area']]
+        self.data['bms_area'] = WORKING_AREA[info['bms_area']]
         self.data['towers'] = towers
         self.data['modules'] = modules
         self._bms_qty = towers
         self._modules = modules
         self._bat_type = bat_type
 
-        self.data['application'] = APPLICATION_LIST[application_id]
-        self.data['lvs_type'] = lvs_type_id
-        self.data['phase'] = PHASE_LIST[phase_id]
+        self.data['application'] = APPLICATION_LIST[info['application_id']]
+        self.data['lvs_type'] = info['lvs_type_id']
+        self.data['phase'] = PHASE_LIST[info['phase_id']]
 
         return True
 
     async def update_ext_info_data(self) -> bool:
         """start reading info data"""
-        regs = await self.get_registers(address=0x0010, count=2)
+        regs = await self.get_registers(address=EXT_INFO_BLOCK.address, count=EXT_INFO_BLOCK.count)
         if regs is None:
             return False
 
-        inverter_id = self.convert_from_registers_int8(regs[0:1])[0]
-        bat_type_id = self.convert_from_registers_int8(regs[1:2])[0]
+        ext_info = EXT_INFO_BLOCK.decode(regs)
+        inverter_id = ext_info['inverter_id']
+        bat_type_id = ext_info['bat_type_id']
 
         model, capacity_module = 'NA', 0.0
         if self._bat_type == 'HV':
@@ -439,56 +828,76 @@ class BydBoxClient(ExtModbusClient):
 
     async def update_bmu_status_data(self) -> bool:
         """start reading bmu status data"""
-        async with self.ClientBusyLock(self):
-            regs = await self.get_registers(address=0x0500, count=21) # 1280
+        async with self.ClientBusyLock(self, PRIORITY_BMU):
+            regs = await self.get_registers(address=BMU_STATUS_BLOCK.address, count=BMU_STATUS_BLOCK.count) # 1280
             if regs is None:
                 _LOGGER.warning('update_bmu_status_data regs is None')
                 return False
 
-            soc = self._client.convert_from_registers(regs[0:1], data_type = self._client.DATATYPE.UINT16)
-            max_cell_voltage = round(self._client.convert_from_registers(regs[1:2], data_type = self._client.DATATYPE.UINT16) * 0.01,2)
-            min_cell_voltage = round(self._client.convert_from_registers(regs[2:3], data_type = self._client.DATATYPE.UINT16) * 0.01,2)
-            soh = self._client.convert_from_registers(regs[3:4], data_type = self._client.DATATYPE.UINT16)
-            current = round(self._client.convert_from_registers(regs[4:5], data_type = self._client.DATATYPE.INT16) * 0.1,1)
-            bat_voltage = round(self._client.convert_from_registers(regs[5:6], data_type = self._client.DATATYPE.UINT16) * 0.01,2)
-            max_cell_temp = self._client.convert_from_registers(regs[6:7], data_type = self._client.DATATYPE.INT16)
-            min_cell_temp = self._client.convert_from_registers(regs[7:8], data_type = self._client.DATATYPE.INT16)
-            bmu_temp = self._client.convert_from_registers(regs[8:9], data_type = self._client.DATATYPE.INT16)
+            status = BMU_STATUS_BLOCK.decode(regs)
             # 9-12 ?
             if regs[9:13] != [0, 792, 0, 0]:
                 _LOGGER.debug(f'bmu status reg 9-12: {regs[9:13]} [0, 792, 0, 0]')
-            errors = self._client.convert_from_registers(regs[13:14], data_type = self._client.DATATYPE.UINT16)
-            param_t_v1, param_t_v2 = self.convert_from_registers_int8(regs[14:15])
-            output_voltage = round(self._client.convert_from_registers(regs[16:17], data_type = self._client.DATATYPE.UINT16) * 0.01,2)
-            # TODO: change to use standard pymodbus function once HA has been upgraded to later version
-            charge_lfte = self.convert_from_registers(regs[17:19], data_type = self._client.DATATYPE.UINT32, word_order='little') * 0.1
-            discharge_lfte = self.convert_from_registers(regs[19:21], data_type = self._client.DATATYPE.UINT32, word_order='little') * 0.1
-
-            param_t_v = f"{param_t_v1}.{param_t_v2}"
-            efficiency = round((discharge_lfte / charge_lfte) * 100.0,1)
-
-            self.data['soc'] = soc
-            self.data['max_cell_v'] = max_cell_voltage
-            self.data['min_cell_v'] = min_cell_voltage
-            self.data['soh'] = soh
+
+            current = status['current']
+            output_voltage = status['output_voltage']
+            charge_lfte = status['charge_lfte']
+            discharge_lfte = status['discharge_lfte']
+
+            self.data['soc'] = status['soc']
+            self.data['max_cell_v'] = status['max_cell_v']
+            self.data['min_cell_v'] = status['min_cell_v']
+            self.data['soh'] = status['soh']
             self.data['current'] = current
-            self.data['bat_voltage'] = bat_voltage
-            self.data['max_cell_temp'] = max_cell_temp
-            self.data['min_cell_temp'] = min_cell_temp
-            self.data['bmu_temp'] = bmu_temp
-            self.data['errors'] =  self.bitmask_to_string(errors, BMU_ERRORS, 'Normal')
-            self.data['param_t_v'] = param_t_v
+            self.data['bat_voltage'] = status['bat_voltage']
+            self.data['max_cell_temp'] = status['max_cell_temp']
+            self.data['min_cell_temp'] = status['min_cell_temp']
+            self.data['bmu_temp'] = status['bmu_temp']
+            self.data['errors'] =  self.bitmask_to_string(status['errors'], BMU_ERRORS, 'Normal')
+            self.data['param_t_v'] = f"{status['param_t_v_1']}.{status['param_t_v_2']}"
             self.data['output_voltage'] = output_voltage
             self.data['power'] = current * output_voltage
             self.data['charge_lfte'] = charge_lfte
             self.data['discharge_lfte'] = discharge_lfte
-            self.data['efficiency'] = efficiency
+            self.data['efficiency'] = round((discharge_lfte / charge_lfte) * 100.0,1)
             self.data['updated'] = datetime.now()
 
             return True
 
-    async def update_bms_status_data(self, bms_id) -> bool:
-        """start reading status data"""
+    def _decode_bms_status_block(self, regs) -> dict:
+        """Decode the 260 register BMS status block, or only its first readout.
+
+        The registers are packed once into a big-endian buffer; the head is
+        decoded by the BMS_STATUS_BLOCK schema and the balancing flags, cell
+        voltages and temperatures are read as arrays straight from that buffer.
+        """
+        buf = memoryview(struct.pack(f'>{len(regs)}H', *regs))
+        block = BMS_STATUS_BLOCK.decode_from(buf)
+
+        a = BMS_BALANCING_OFFSET * 2
+        balancing = array('H')
+        balancing.frombytes(buf[a:a + min(self._modules, BMS_BALANCING_MODULES) * 2])
+        if sys.byteorder == 'little':
+            balancing.byteswap()
+        block['balancing'] = balancing
+        if len(regs) < BMS_STATUS_REGS:
+            return block
+
+        voltages = array('h')
+        for a, b in BMS_VOLTAGE_SLICES:
+            voltages.frombytes(buf[a*2:b*2])
+        if sys.byteorder == 'little':
+            voltages.byteswap()
+        temps = array('B')
+        for a, b in BMS_TEMP_SLICES:
+            temps.frombytes(buf[a*2:b*2])
+
+        block['voltages'] = voltages
+        block['temps'] = temps
+        return block
+
+    async def update_bms_status_data(self, bms_id, full=True) -> bool:
+        """start reading status data; without full only the first readout with the summary values"""
 
         await self.write_registers(unit_id=self._unit_id, address=0x0550, payload=[bms_id,0x8100])
 
@@ -496,142 +905,120 @@ class BydBoxClient(ExtModbusClient):
         if not response_reg:
             return None
 
+        count = BMS_STATUS_REGS if full else BMS_READOUT_REGS
         regs = []
-        for i in range(4):
-            new_regs = await self.get_registers(address=0x0558, count=65)
+        for i in range(count // BMS_READOUT_REGS):
+            new_regs = await self.get_registers(address=0x0558, count=BMS_READOUT_REGS)
             if new_regs is None:
                 _LOGGER.error(f"Failed reading BMS {bms_id} status part {i}", exc_info=True)
                 return False
             else:
                 regs += new_regs
 
-        if len(regs) != 260:
+        if len(regs) != count:
             _LOGGER.error(f"unexpected number of BMS {bms_id} status regs: {len(regs)}")
             return False
 
-        # skip 1st register with length
-        max_voltage = round(self._client.convert_from_registers(regs[1:2], data_type = self._client.DATATYPE.INT16) * 0.001,3)
+        block = self._decode_bms_status_block(regs)
+
+        max_voltage = block['max_voltage']
         if max_voltage > 5:
             _LOGGER.error(f"BMS {bms_id} unexpected max voltage {max_voltage}", exc_info=True)
             return False
-        _ = round(self._client.convert_from_registers(regs[2:3], data_type = self._client.DATATYPE.INT16) * 0.001,3)  # min_voltage - parsed for register completeness
-        max_voltage_cell_module, min_voltage_cell_module = self.convert_from_registers_int8(regs[3:4])
-        max_temp = self._client.convert_from_registers(regs[4:5], data_type = self._client.DATATYPE.INT16)
-        min_temp = self._client.convert_from_registers(regs[5:6], data_type = self._client.DATATYPE.INT16)
-        max_temp_cell_module, min_temp_cell_module = self.convert_from_registers_int8(regs[6:7])
-
-        cell_balancing = []
-        balancing_cells = 0
-        for m in range(self._modules):
-            flags = self._client.convert_from_registers(regs[7+m:7+m+1], data_type = self._client.DATATYPE.UINT16)
-            bl = []
-            for bit in range(16):
-                #b = flags & (1>>bit)
-                b = flags >> bit & 1
-                #_LOGGER.debug(f'bit {b} {flags} {bit} {m}')
-                balancing_cells += b
-                bl.append(b)
-            cell_balancing.append({'m':m+1, 'b':bl})
-
-        # TODO: change to use standard pymodbus function once HA has been upgraded to later version
-        charge_lfte = self.convert_from_registers(regs[15:17], data_type = self._client.DATATYPE.UINT32, word_order='little') * 0.001
-        discharge_lfte = self.convert_from_registers(regs[17:19], data_type = self._client.DATATYPE.UINT32, word_order='little') * 0.001
+        max_voltage_cell_module = block['max_c_v_id']
+        min_voltage_cell_module = block['min_c_v_id']
+
+        flags = block['balancing']
+        cell_balancing = CellView(array('B', [bit for f in flags for bit in BYTE_BITS[f & 0xFF] + BYTE_BITS[f >> 8]]), len(flags), 16, 'b')
+        balancing_cells = sum(f.bit_count() for f in flags)
+
+        charge_lfte = block['charge_lfte']
+        discharge_lfte = block['discharge_lfte']
         # 20 ?
-        reg20 = self.convert_from_registers(regs[20:21], data_type = self._client.DATATYPE.UINT16)
-        reg20a, reg20b = self.convert_from_registers_int8(regs[3:4])
-        _LOGGER.debug(f'bms {bms_id} reg 20: uint16 {reg20} int8 a {reg20a} b {reg20b}')
+        _LOGGER.debug(f'bms {bms_id} reg 20: uint16 {block["reg20"]} int8 a {max_voltage_cell_module} b {min_voltage_cell_module}')
 
-        bat_voltage = round(self._client.convert_from_registers(regs[21:22], data_type = self._client.DATATYPE.INT16) * 0.1,2)
         # 22 ?
-        if regs[22] != 0:
-            _LOGGER.debug(f'bms {bms_id} reg 22: {regs[22]} 0')
+        if block['reg22'] != 0:
+            _LOGGER.debug(f'bms {bms_id} reg 22: {block["reg22"]} 0')
         # 23 ? Switch State ?
-        if regs[23] != 1560:
-            _LOGGER.debug(f'bms {bms_id} reg 23: {regs[23]} 1560')
-
-        output_voltage = round(self._client.convert_from_registers(regs[24:25], data_type = self._client.DATATYPE.INT16) * 0.1,2)
-        soc = round(self._client.convert_from_registers(regs[25:26], data_type = self._client.DATATYPE.INT16) * 0.1,2)
-        soh = self._client.convert_from_registers(regs[26:27], data_type = self._client.DATATYPE.INT16)
-        current = round(self._client.convert_from_registers(regs[27:28], data_type = self._client.DATATYPE.INT16) * 0.1,2)
-        warnings1 = self._client.convert_from_registers(regs[28:29], data_type = self._client.DATATYPE.UINT16)
-        warnings2 = self._client.convert_from_registers(regs[29:30], data_type = self._client.DATATYPE.UINT16)
-        warnings3 = self._client.convert_from_registers(regs[30:31], data_type = self._client.DATATYPE.UINT16)
+        if block['reg23'] != 1560:
+            _LOGGER.debug(f'bms {bms_id} reg 23: {block["reg23"]} 1560')
+
         # 31-47 ?
-        if regs[31:42] != [6659, 7683, 256, 20528, 13104, 21552, 12848, 23090, 12848, 14129, 12593]:
-            _LOGGER.debug(f'bms {bms_id} reg 31-42: {regs[31:42]} [6659, 7683, 256, 20528, 13104, 21552, 12848, 23090, 12848, 14129, 12593, 13619, 12920, 30840, 30840, 270, 270]')
-        if regs[42:44] != [13619, 12920]:
-            _LOGGER.debug(f'bms {bms_id} reg 42-44: {regs[42:44]} [13619, 12920]')
-        if regs[44:48] != [30840, 30840, 270, 270]:
-            _LOGGER.debug(f'bms {bms_id} reg 44-48: {regs[44:48]} [30840, 30840, 270, 270]')
+        if regs[31:48] != BMS_STATUS_REG31_47:
+            _LOGGER.debug(f'bms {bms_id} reg 31-47: {regs[31:48]} {BMS_STATUS_REG31_47}')
+
+        efficiency = round((discharge_lfte / charge_lfte) * 100.0, 1)
+
+        warnings_list = self.bitmask_to_strings(block['warnings1'], BMS_WARNINGS) + self.bitmask_to_strings(block['warnings2'], BMS_WARNINGS) + self.bitmask_to_strings(block['warnings3'], BMS_WARNINGS3)
+        warnings = self.strings_to_string(strings=warnings_list, default='Normal', max_length=255)
+
+        updated = datetime.now()
+
+        if full:
+            self._update_bms_cell_data(bms_id, block)
+        else:
+            # cell voltage extremes of the head block, so they match the cell ids below
+            self.data[f'bms{bms_id}_max_c_v'] = max_voltage
+            self.data[f'bms{bms_id}_min_c_v'] = block['min_voltage']
+
+        self.data[f'bms{bms_id}_max_c_v_id'] = max_voltage_cell_module
+        self.data[f'bms{bms_id}_min_c_v_id'] = min_voltage_cell_module
+        self.data[f'bms{bms_id}_max_c_t'] = block['max_c_t']
+        self.data[f'bms{bms_id}_min_c_t'] = block['min_c_t']
+        self.data[f'bms{bms_id}_max_c_t_id'] = block['max_c_t_id']
+        self.data[f'bms{bms_id}_min_c_t_id'] = block['min_c_t_id']
+        self.data[f'bms{bms_id}_balancing_qty'] = balancing_cells
+        self.data[f'bms{bms_id}_soc'] = block['soc']
+        self.data[f'bms{bms_id}_soh'] = block['soh']
+        self.data[f'bms{bms_id}_current'] = block['current']
+        self.data[f'bms{bms_id}_bat_voltage'] = block['bat_voltage']
+        self.data[f'bms{bms_id}_output_voltage'] = block['output_voltage']
+        self.data[f'bms{bms_id}_charge_lfte'] = charge_lfte
+        self.data[f'bms{bms_id}_discharge_lfte'] = discharge_lfte
+        self.data[f'bms{bms_id}_efficiency'] = efficiency
 
-        errors = self._client.convert_from_registers(regs[48:49], data_type = self._client.DATATYPE.UINT16)
-        all_cell_voltages = []
-        cell_voltages= [] # list of dict
+        self.data[f'bms{bms_id}_warnings'] = warnings
+        self.data[f'bms{bms_id}_errors'] = self.bitmask_to_string(block['errors'], BMS_ERRORS, 'Normal')
+        self.data[f'bms{bms_id}_cell_balancing'] = dedupe_view(self.data.get(f'bms{bms_id}_cell_balancing'), cell_balancing)
 
-        regs_voltages = regs[49:65] + regs[66:130] + regs[131:180]
-        regs_temps = regs[180:195] + regs[196:213]
+        self.data[f'bms{bms_id}_updated'] = updated
 
-        all_cell_temps = []
-        cell_temps = [] # list of dict
+        return True
 
+    def _update_bms_cell_data(self, bms_id, block) -> None:
+        """Cell voltages, temperatures and the values derived from them, only in the full status block."""
+        # cell values as compact arrays, sliced per module
+        voltages = block['voltages']
+        temps = block['temps']
         temp_parts = 0
         if self._temps > 0:
             temp_parts = round(self._temps/2)
 
+        all_cell_voltages = array('h')
+        all_cell_temps = array('B')
         for m in range(self._modules):
-            values = []
-            for i in range(self._cells):
-                 voltage = self._client.convert_from_registers(regs_voltages[i+m*16:i+m*16+1], data_type = self._client.DATATYPE.INT16)
-                 values.append(voltage)
-            all_cell_voltages += values
-            cell_voltages.append({'m':m+1, 'v':values})
-            values = []
-            for i in range(temp_parts):
-                values += self.convert_from_registers_int8(regs_temps[i+m*4:i+m*4+1])
-            all_cell_temps += values
-            cell_temps.append({'m':m+1, 't':values})
-
-        # calculate quantity cells balancing
-        #balancing_cells = 0
-        #for cell in cell_flags:
-        #   if cell['f'] & 1 == 1:
-        #      balancing_cells += 1
-
-        efficiency = round((discharge_lfte / charge_lfte) * 100.0, 1)
+            all_cell_voltages.extend(voltages[m*BMS_CELL_SLOTS:m*BMS_CELL_SLOTS+self._cells])
+            all_cell_temps.extend(temps[m*BMS_TEMP_SLOTS:m*BMS_TEMP_SLOTS+temp_parts*2])
+        # list of dict views, built when an attribute is read
+        cell_voltages = CellView(all_cell_voltages, self._modules, self._cells, 'v')
+        cell_temps = CellView(all_cell_temps, self._modules, temp_parts*2, 't')
+
+        if all_cell_temps:
+            self.data[f'bms{bms_id}_cell_temps'] = dedupe_view(self.data.get(f'bms{bms_id}_cell_temps'), cell_temps)
+            self.data[f'bms{bms_id}_avg_c_t'] = round(sum(all_cell_temps) / len(all_cell_temps),1)
+        if not all_cell_voltages:
+            # HVL modules report no cell values
+            return
 
         avg_cell_voltage = round(sum(all_cell_voltages) / len(all_cell_voltages) * 0.001, 3)
-        avg_cell_temp = round(sum(all_cell_temps) / len(all_cell_temps),1)
-        # Compute actual per-update extremes by iterating through all_cell_voltages (values are in mV)
+        # Compute actual per-update extremes from all cell voltages (values are in mV)
         calc_max_c_v = round(max(all_cell_voltages) * 0.001, 3)
         calc_min_c_v = round(min(all_cell_voltages) * 0.001, 3)
 
-        warnings_list = self.bitmask_to_strings(warnings1, BMS_WARNINGS) + self.bitmask_to_strings(warnings2, BMS_WARNINGS) + self.bitmask_to_strings(warnings3, BMS_WARNINGS3)
-        warnings = self.strings_to_string(strings=warnings_list, default='Normal', max_length=255)
-
-        updated = datetime.now()
-
         self.data[f'bms{bms_id}_max_c_v'] = calc_max_c_v
         self.data[f'bms{bms_id}_min_c_v'] = calc_min_c_v
-        self.data[f'bms{bms_id}_max_c_v_id'] = max_voltage_cell_module
-        self.data[f'bms{bms_id}_min_c_v_id'] = min_voltage_cell_module
-        self.data[f'bms{bms_id}_max_c_t'] = max_temp
-        self.data[f'bms{bms_id}_min_c_t'] = min_temp
-        self.data[f'bms{bms_id}_max_c_t_id'] = max_temp_cell_module
-        self.data[f'bms{bms_id}_min_c_t_id'] = min_temp_cell_module
-        self.data[f'bms{bms_id}_balancing_qty'] = balancing_cells
-        self.data[f'bms{bms_id}_soc'] = soc
-        self.data[f'bms{bms_id}_soh'] = soh
-        self.data[f'bms{bms_id}_current'] = current
-        self.data[f'bms{bms_id}_bat_voltage'] = bat_voltage
-        self.data[f'bms{bms_id}_output_voltage'] = output_voltage
-        self.data[f'bms{bms_id}_charge_lfte'] = charge_lfte
-        self.data[f'bms{bms_id}_discharge_lfte'] = discharge_lfte
-        self.data[f'bms{bms_id}_efficiency'] = efficiency
-
-        self.data[f'bms{bms_id}_warnings'] = warnings
-        self.data[f'bms{bms_id}_errors'] = self.bitmask_to_string(errors, BMS_ERRORS, 'Normal')
-        self.data[f'bms{bms_id}_cell_balancing'] = cell_balancing
-        self.data[f'bms{bms_id}_cell_voltages'] = cell_voltages
+        self.data[f'bms{bms_id}_cell_voltages'] = dedupe_view(self.data.get(f'bms{bms_id}_cell_voltages'), cell_voltages)
         self.data[f'bms{bms_id}_avg_c_v'] = avg_cell_voltage
         # Update history of cell voltage extremes (max/min of individual cells)
         # Use the per-update extremes computed from all cells above.
@@ -649,104 +1036,35 @@ class BydBoxClient(ExtModbusClient):
             self.data[max_key] = calc_max_c_v
             self.data[min_key] = calc_min_c_v
 
-        # Per-cell history (mV): maintain element-wise max/min for each cell across updates
-        max_hist_key = f'bms{bms_id}_cell_voltages_max_history'
-        min_hist_key = f'bms{bms_id}_cell_voltages_min_history'
-        prev_max_hist = self.data.get(max_hist_key)
-        prev_min_hist = self.data.get(min_hist_key)
-        def same_shape(a, b):
-            try:
-                if a is None or b is None:
-                    return False
-                if len(a) != len(b):
-                    return False
-                for i in range(len(a)):
-                    if a[i].get('m') != b[i].get('m'):
-                        return False
-                    va = a[i].get('v') or []
-                    vb = b[i].get('v') or []
-                    if len(va) != len(vb):
-                        return False
-                return True
-            except Exception:
-                return False
-        # initialize if first time or shape mismatch
-        if not same_shape(prev_max_hist, cell_voltages) or not same_shape(prev_min_hist, cell_voltages):
-            self.data[max_hist_key] = json.loads(json.dumps(cell_voltages))
-            self.data[min_hist_key] = json.loads(json.dumps(cell_voltages))
+        # Per-cell history (mV): one element-wise max/min engine per BMS behind both history views
+        history = self._cell_history.get(bms_id)
+        if (history is None or not history.matches(self._modules, self._cells)
+                # restored from entity state since the last update
+                or self.data.get(f'bms{bms_id}_max_history_cell_voltage_cells') is not history.max_view
+                or self.data.get(f'bms{bms_id}_min_history_cell_voltage_cells') is not history.min_view):
+            history = self._restore_cell_history(bms_id, all_cell_voltages)
+            self._cell_history[bms_id] = history
         else:
-            # update histories element-wise
-            try:
-                new_max_hist = []
-                new_min_hist = []
-                for idx, mod in enumerate(cell_voltages):
-                    cur_vals = mod.get('v') or []
-                    pm = prev_max_hist[idx].get('v') or []
-                    pn = prev_min_hist[idx].get('v') or []
-                    max_vals = []
-                    min_vals = []
-                    for j in range(len(cur_vals)):
-                        v = cur_vals[j]
-                        max_prev = pm[j]
-                        min_prev = pn[j]
-                        max_vals.append(max(v, max_prev))
-                        min_vals.append(min(v, min_prev))
-                    new_max_hist.append({'m': mod.get('m'), 'v': max_vals})
-                    new_min_hist.append({'m': mod.get('m'), 'v': min_vals})
-                self.data[max_hist_key] = new_max_hist
-                self.data[min_hist_key] = new_min_hist
-            except Exception:
-                # fallback to reinit on any unexpected shape/value issues
-                self.data[max_hist_key] = json.loads(json.dumps(cell_voltages))
-                self.data[min_hist_key] = json.loads(json.dumps(cell_voltages))
-
-        # Update history of per-cell min/max voltages (based on current cell_voltages in mV)
-        # Initialize structures on first run to current values
-        def clone_cells(src):
-            return [{'m': item['m'], 'v': list(item['v'])} for item in src]
-
-        # Flatten helper to compute overall min/max state values in V
-        def flatten_values(cells):
-            vals = []
-            for item in cells:
-                vals.extend(item['v'])
-            return vals
-
-        max_hist_key_cells = f'bms{bms_id}_max_history_cell_voltage_cells'
-        min_hist_key_cells = f'bms{bms_id}_min_history_cell_voltage_cells'
-        max_hist_key = f'bms{bms_id}_max_history_cell_voltage'
-        min_hist_key = f'bms{bms_id}_min_history_cell_voltage'
-
-        if max_hist_key_cells not in self.data or not isinstance(self.data.get(max_hist_key_cells), list):
-            self.data[max_hist_key_cells] = clone_cells(cell_voltages)
-        if min_hist_key_cells not in self.data or not isinstance(self.data.get(min_hist_key_cells), list):
-            self.data[min_hist_key_cells] = clone_cells(cell_voltages)
-
-        # Update per-cell
-        for mi, module in enumerate(cell_voltages):
-            cur_vals = module['v']
-            max_vals = self.data[max_hist_key_cells][mi]['v']
-            min_vals = self.data[min_hist_key_cells][mi]['v']
-            for ci, mv in enumerate(cur_vals):
-                if mv > max_vals[ci]:
-                    max_vals[ci] = mv
-                if mv < min_vals[ci]:
-                    min_vals[ci] = mv
-
-        # Compute sensor state values (V)
-        max_mv = max(flatten_values(self.data[max_hist_key_cells])) if self.data[max_hist_key_cells] else None
-        min_mv = min(flatten_values(self.data[min_hist_key_cells])) if self.data[min_hist_key_cells] else None
-        if max_mv is not None:
-            self.data[max_hist_key] = round(max_mv * 0.001, 3)
-        if min_mv is not None:
-            self.data[min_hist_key] = round(min_mv * 0.001, 3)
-
-        self.data[f'bms{bms_id}_cell_temps'] = cell_temps
-        self.data[f'bms{bms_id}_avg_c_t'] = avg_cell_temp
-
-        self.data[f'bms{bms_id}_updated'] = updated
-
-        return True
+            history.update(all_cell_voltages)
+        self.data[f'bms{bms_id}_cell_voltages_max_history'] = history.max_view
+        self.data[f'bms{bms_id}_cell_voltages_min_history'] = history.min_view
+        self.data[f'bms{bms_id}_max_history_cell_voltage_cells'] = history.max_view
+        self.data[f'bms{bms_id}_min_history_cell_voltage_cells'] = history.min_view
+        self.data[f'bms{bms_id}_max_history_cell_voltage'] = history.max_voltage
+        self.data[f'bms{bms_id}_min_history_cell_voltage'] = history.min_voltage
+
+    def _restore_cell_history(self, bms_id, voltages) -> CellHistory:
+        """New history engine, seeded from restored history views of the same shape."""
+        max_values = array_from_cells(self.data.get(f'bms{bms_id}_max_history_cell_voltage_cells'), self._modules, self._cells)
+        min_values = array_from_cells(self.data.get(f'bms{bms_id}_min_history_cell_voltage_cells'), self._modules, self._cells)
+        if max_values is None or min_values is None:
+            return CellHistory(voltages, self._modules, self._cells)
+        return CellHistory(voltages, self._modules, self._cells, max_values, min_values)
+
+    def reset_cell_history(self, bms_id) -> None:
+        self._cell_history.pop(bms_id, None)
+        for suffix in CELL_HISTORY_KEYS:
+            self.data.pop(f'bms{bms_id}{suffix}', None)
 
     async def update_log_data(self, unit_id, log_depth = 1) -> bool:
         entries = 0
@@ -755,29 +1073,160 @@ class BydBoxClient(ExtModbusClient):
         else:
             update_last = False
 
+        pages = known_pages = new_pages = 0
         for _i in range(log_depth):
-            new = await self._read_log_data_unit(unit_id, update_last=update_last)
+            if update_last:
+                new = await self._read_log_data_unit(unit_id, update_last=update_last)
+            else:
+                result = await self.update_log_history_page(unit_id)
+                new, added = result if result is not None else (None, 0)
             if new is None:
                 return False
             entries += new
             if log_depth > 1:
+                pages += 1
                 if new < 20:
                     break
+                known_pages, new_pages = (known_pages + 1, new_pages) if added == 0 else (0, new_pages + 1)
+                if self.log_history_stored(unit_id, log_depth, known_pages, new_pages):
+                    _LOGGER.info(f'{self._get_device_name(unit_id)} log history already stored, skipped {log_depth - pages} pages.')
+                    break
                 _LOGGER.warning(f'...updating {self._get_device_name(unit_id)} log {entries} entries.')
         if log_depth > 1:
+            self._log_history_coverage[unit_id] = max(self._log_history_coverage.get(unit_id, 0), log_depth)
             _LOGGER.warning(f'Finished updating {self._get_device_name(unit_id)} log; found {entries} log entries.')
         return True
 
+    async def update_log_history_page(self, unit_id) -> tuple[int, int] | None:
+        """Read the next page of 20 older log entries; holds the link for this page only.
+
+        Returns the number of entries on the page and how many of them were not stored yet.
+        """
+        # release the link between pages so higher priority polls can run
+        async with self.ClientBusyLock(self, PRIORITY_LOG_HISTORY):
+            stored = len(self.log)
+            entries = await self._read_log_data_unit(unit_id, update_last=False)
+        if entries is None:
+            return None
+        return entries, len(self.log) - stored
+
+    def log_history_stored(self, unit_id, pages, known_pages, new_pages) -> bool:
+        """True if the rest of a history download of pages is already stored.
+
+        Device pages are read newest first. After LOG_HISTORY_KNOWN_PAGES fully
+        stored pages the download has reached the range of the last finished
+        download, which covers the remaining pages unless this download asks
+        for more than that one did (each page with new entries shifts the
+        stored range one page further back).
+        """
+        return known_pages >= LOG_HISTORY_KNOWN_PAGES and pages <= self._log_history_coverage.get(unit_id, 0) + new_pages
+
+    def load_log_history_coverage(self) -> None:
+        if not os.path.isfile(self._log_history_coverage_path):
+            return
+        try:
+            with open(self._log_history_coverage_path) as openfile:
+                self._log_history_coverage = {int(unit_id): pages for unit_id, pages in json.load(openfile).items()}
+        except Exception as e:
+            _LOGGER.warning(f"Failed loading log history coverage {e}")
+
+    def save_log_history_coverage(self, unit_id, pages) -> None:
+        self._log_history_coverage[unit_id] = max(self._log_history_coverage.get(unit_id, 0), pages)
+        with open(self._log_history_coverage_path, "w") as outfile:
+            json.dump(self._log_history_coverage, outfile)
+
+    def load_log_history_checkpoint(self) -> dict | None:
+        if not os.path.isfile(self._log_history_path):
+            return None
+        try:
+            with open(self._log_history_path) as openfile:
+                return json.load(openfile)
+        except Exception as e:
+            _LOGGER.warning(f"Failed loading log history checkpoint {e}")
+            return None
+
+    def save_log_history_checkpoint(self, job:dict) -> None:
+        with open(self._log_history_path, "w") as outfile:
+            json.dump(job, outfile)
+
+    def remove_log_history_checkpoint(self) -> None:
+        if os.path.isfile(self._log_history_path):
+            os.remove(self._log_history_path)
+
+    @property
+    def endpoint(self) -> str:
+        return f'{self._host}:{self._port}/{self._unit_id}'
+
+    def get_topology(self) -> dict:
+        topology = {attr: getattr(self, attr) for attr in SNAPSHOT_ATTRS}
+        topology['serial'] = self.data.get('serial')
+        topology['model'] = self.data.get('model')
+        return topology
+
+    def _load_snapshots(self) -> dict:
+        if not os.path.isfile(self._snapshot_path):
+            return {}
+        try:
+            with open(self._snapshot_path) as openfile:
+                return json.load(openfile)
+        except Exception as e:
+            _LOGGER.warning(f"Failed loading device snapshot {e}")
+            return {}
+
+    def load_snapshot(self) -> dict | None:
+        """Newest snapshot taken at this endpoint, None if there is none."""
+        snapshots = [
+            snapshot for snapshot in self._load_snapshots().values()
+            if snapshot.get('version') == SNAPSHOT_VERSION and snapshot.get('endpoint') == self.endpoint
+        ]
+        if not snapshots:
+            return None
+        return max(snapshots, key=lambda snapshot: snapshot['saved'])
+
+    def apply_snapshot(self, snapshot: dict) -> None:
+        """Take topology and last values from a snapshot instead of reading the info blocks."""
+        for attr in SNAPSHOT_ATTRS:
+            setattr(self, attr, snapshot['topology'][attr])
+        self.data.update(snapshot['data'])
+        self.initialized = True
+
+    def get_snapshot(self) -> dict | None:
+        """Copy of topology, per-cell history and last values, taken on the event loop while no update runs."""
+        serial = self.data.get('serial')
+        if not self.initialized or not serial:
+            return None
+        return {
+            'version': SNAPSHOT_VERSION,
+            'saved': time.time(),
+            'endpoint': self.endpoint,
+            'topology': self.get_topology(),
+            'data': {k: v for k, v in self.data.items() if k not in SNAPSHOT_SKIP_KEYS},
+        }
+
+    def save_snapshot(self, snapshot: dict | None) -> None:
+        """Write a snapshot from get_snapshot keyed by BMU serial for a warm start."""
+        if snapshot is None:
+            return
+        snapshots = self._load_snapshots()
+        snapshots[snapshot['topology']['serial']] = snapshot
+        tmp_path = self._snapshot_path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            # cell views are stored as lists, values without a JSON form like timestamps are restored empty
+            json.dump(snapshots, outfile, separators=(',', ':'), default=materialize_json)
+        os.replace(tmp_path, self._snapshot_path)
+
     async def _wait_for_response(self, address, ready_response = 0x8801):
         response_reg = 0
         timeout = 5
-        dt = 0
-        #j = 0
-        #start = datetime.now()
-        await asyncio.sleep(self._min_response_delay)
-        while response_reg != ready_response and dt < timeout: # wait for the response
-            await asyncio.sleep(self._retry_delay)
-            dt += self._retry_delay
+        probes = 0
+        last_miss = None
+        start = time.monotonic()
+        delay = self.response_wait.first_delay(address)
+        while True:
+            await asyncio.sleep(delay)
+            if time.monotonic() - start >= timeout:
+                break
+            probes += 1
             try:
                 data = await self.read_holding_registers(unit_id=self._unit_id, address=address, count=1)
                 if data is not None:
@@ -787,16 +1236,19 @@ class BydBoxClient(ExtModbusClient):
                         _LOGGER.debug(f"error while waiting for response {address} {data}", exc_info=True)
             except Exception:
                 _LOGGER.debug(f"error while waiting for response {address}", exc_info=True)
-            #j += 1
-        if response_reg == ready_response:
-            #_LOGGER.debug(f'waiting for ready response took {j} pings and {(datetime.now() - start).total_seconds()}s {dt}')
-            return True
-        elif dt < timeout:
+            elapsed = time.monotonic() - start
+            if response_reg == ready_response:
+                self.response_wait.record(address, elapsed, probes, last_miss)
+                return True
+            last_miss = elapsed
+            delay = self.response_wait.next_delay(address, probes)
+
+        self.response_wait.record_timeout(address, probes)
+        if response_reg != 0:
             _LOGGER.error(f"unexpected wait response {response_reg}", exc_info=True)
-            return False
         else:
             _LOGGER.error(f"wait for response timeout. {address}", exc_info=True)
-            return False
+        return False
 
     async def _read_log_data_unit(self, unit_id, update_last = True) -> int:
         """start reading log data"""
@@ -811,41 +1263,65 @@ class BydBoxClient(ExtModbusClient):
         if not response_reg:
             return None
 
-        regs = []
-        for i in range(5):
-            new_regs = await self.get_registers(address=0x05A8, count=65)
-            if new_regs is None:
-                _LOGGER.error(f"Failed reading {self._get_device_name(unit_id)} log part: {i}", exc_info=True)
-                return None
-            else:
-                regs += new_regs[1:] # skip first byte
-
-        if len(regs) == 0 or len(regs) != 320:
-            _LOGGER.error(f"Unexpected number of {self._get_device_name(unit_id)}  log regs: {len(regs)}")
-            return None
-
-        entries = 0
-        ts:datetime = None
-        for i in range(0,20):
-            sub_regs=regs[i*15:i*15+15]
-
-            data = bytearray()
-            data.append(sub_regs[3] & 0xFF)
-            for reg in sub_regs[4:]:
-                data.append(reg >> 8 & 0xFF)
-                data.append(reg & 0xFF)
-
-            code, year = self.convert_from_registers_int8(sub_regs[0:1])
-            month, day = self.convert_from_registers_int8(sub_regs[1:2])
-            hour, minute = self.convert_from_registers_int8(sub_regs[2:3])
-            second, dummy = self.convert_from_registers_int8(sub_regs[3:4])
+        # a tail read stops at the first known entry, so readouts are only read as far as needed
+        page = self.LogPage()
+        while not page.done:
+            # a tail read starts with the readout holding the newest entries, the rest of the page is read in one go
+            readouts = 1 if update_last and page.readouts == 0 else LOG_READOUTS - page.readouts
+            for _ in range(readouts):
+                new_regs = await self.get_registers(address=0x05A8, count=LOG_READOUT_REGS)
+                if new_regs is None or len(new_regs) != LOG_READOUT_REGS:
+                    _LOGGER.error(f"Failed reading {self._get_device_name(unit_id)} log part: {page.readouts}", exc_info=True)
+                    return None
+                page.buf += LOG_READOUT.pack(*new_regs[1:]) # skip first register
+                page.readouts += 1
+            self._parse_log_page(unit_id, page, update_last)
+
+        # readouts left after a stop are not drained: the next 0x05A0 request re-arms
+        # the readout at the first part of the new page, as the simulator models it
+        if update_last:
+            self.log_tail.record(unit_id, page.newest, page.added, page.readouts, page.stopped, page.ended)
+        self.data['log_count'] = len(self.log)
 
+        return page.entries
+
+    class LogPage:
+        """Raw bytes and parse state of one log page read."""
+
+        __slots__ = ('buf', 'readouts', 'parsed', 'entries', 'added', 'newest', 'keys', 'stopped', 'ended', 'done')
+
+        def __init__(self):
+            self.buf = bytearray()
+            self.readouts = 0
+            self.parsed = 0
+            self.entries = 0
+            self.added = 0
+            self.newest = None
+            self.keys = set()
+            self.stopped = False  # stopped at a known entry
+            self.ended = False  # reached the end of the unit's log
+            self.done = False
+
+    def _parse_log_page(self, unit_id, page: LogPage, update_last) -> None:
+        """Parse the records of page.buf not parsed yet in one struct pass.
+
+        Stops at the end of the log, at an invalid record and, for a tail read,
+        at the first known entry. A datetime is only built for new entries.
+        """
+        first = page.parsed
+        available = min(len(page.buf) // LOG_RECORD.size, LOG_PAGE_RECORDS)
+        records = LOG_RECORD.iter_unpack(page.buf[first * LOG_RECORD.size:available * LOG_RECORD.size])
+        page.parsed = available
+        page.done = available == LOG_PAGE_RECORDS
+        for i, (code, year, month, day, hour, minute, second, data) in enumerate(records, first):
             if year == 0 and month == 0 and day == 0 and code == 0:
                 _LOGGER.debug(f'Reached end: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code}')
-                break
+                page.ended = page.done = True
+                return
             if year in [255]:
                 _LOGGER.error(f'Invalid year in log entry: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code}')
-                break
+                page.done = True
+                return
 
             if month in [0,13]:
                 _LOGGER.warning(f'Invalid month in log entry: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code}')
@@ -853,32 +1329,42 @@ class BydBoxClient(ExtModbusClient):
             if day == 0:
                 _LOGGER.warning(f'Invalid day in log entry: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code}')
                 day = 1
-
-            try:
-                year += 2000
-                ts:datetime = datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
-            except Exception as e:
-                _LOGGER.error(f'Failed to derive log timestamp entry: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code} exception: {e}')
-                break
-
-            k = f'{ts.strftime("%Y%m%d %H:%M:%S")}-{code}-{unit_id}'
-            entries += 1
-            #_LOGGER.debug(f'log {i} {k}')
-
-            if k not in self.log:
-                hexdata = binascii.hexlify(data).decode('ascii')
-                entry = {'ts': ts.timestamp(), 'u': unit_id, 'c': code, 'data': hexdata}
+            year += 2000
+
+            # entries of this page sharing a key are skipped without ending the read;
+            # the cursor also covers a newest entry already dropped by the retention
+            record_key = (year, month, day, hour, minute, second, code)
+            duplicate = record_key in page.keys
+            page.keys.add(record_key)
+            k = f'{year:04}{month:02}{day:02} {hour:02}:{minute:02}:{second:02}-{code}-{unit_id}'
+            known = not duplicate and ((update_last and self.log_tail.known(unit_id, k)) or k in self.log or self._log_archived(k))
+            if not known and not duplicate:
+                # keys of stored entries are valid dates, so only new ones need checking
+                try:
+                    ts = datetime(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
+                except Exception as e:
+                    _LOGGER.error(f'Failed to derive log timestamp entry: {i} {year}-{month}-{day} {hour}:{minute}:{second} code: {code} exception: {e}')
+                    page.done = True
+                    return
+                entry = {'ts': ts.timestamp(), 'u': unit_id, 'c': code, 'data': data.hex()}
                 self._new_logs[k] = entry
                 self.log[k] = entry
+                self._count_balancing(entry)
+                page.added += 1
+            page.entries += 1
+            #_LOGGER.debug(f'log {i} {k}')
 
-            if update_last and i==0:
-                last_log_id = self._get_unit_log_sensor_id(unit_id)
-                code_desc = self._get_log_code_desc(unit_id, code)
-                self.data[last_log_id] = f'{ts.strftime("%m/%d/%Y, %H:%M:%S")} {code} {code_desc}'
-
-        self.data['log_count'] = len(self.log)
+            if i == 0:
+                page.newest = k
+                if update_last:
+                    last_log_id = self._get_unit_log_sensor_id(unit_id)
+                    code_desc = self._get_log_code_desc(unit_id, code)
+                    self.data[last_log_id] = f'{month:02}/{day:02}/{year}, {hour:02}:{minute:02}:{second:02} {code} {code_desc}'
 
-        return entries
+            if update_last and known:
+                # older entries of the page are known as well
+                page.stopped = page.done = True
+                return
 
     def _get_unit_log_sensor_id(self, unit_id) -> str:
         if unit_id == 0:
@@ -901,47 +1387,77 @@ class BydBoxClient(ExtModbusClient):
             code_desc = self.get_value_from_dict(BMS_LOG_CODES, code, 'Not available')
         return code_desc
 
-    def save_log_entries(self, append=True, retention_days=30) -> None:
-        """Save log entries with configurable retention to prevent unlimited growth."""
+    def save_log_entries(self, append=True, retention_days=None) -> None:
+        """Apply retention and append new log entries to the log store."""
+        if retention_days is None:
+            retention_days = self.log_retention_days
         # Apply retention policy - remove entries older than retention_days
         cutoff_timestamp = datetime.now().timestamp() - (retention_days * 24 * 60 * 60)
 
-        # Filter logs to only keep entries within retention period
-        filtered_logs = {
-            key: entry for key, entry in self.log.items()
-            if entry['ts'] >= cutoff_timestamp
-        }
+        if self.log_store.memory_entries:
+            return self._save_log_entries_windowed(retention_days, cutoff_timestamp)
 
-        # Log removal statistics
-        removed_count = len(self.log) - len(filtered_logs)
-        if removed_count > 0:
-            _LOGGER.info(f"Log retention: removed {removed_count} entries older than {retention_days} days")
+        # retention drops a prefix of the log, or scans it when the timestamps fell back
+        removed = self.log.trim(cutoff_timestamp, self.log_max_entries, self.log_max_bytes)
+        for _, entry in removed:
+            self._count_balancing(entry, -1)
+        if removed:
+            _LOGGER.info(f"Log retention: removed {len(removed)} entries older than {retention_days} days or beyond the size limits")
 
-        # Update class log dictionary with filtered entries
-        self.log = dict(sorted(filtered_logs.items()))
+        new_logs, self._new_logs = self._new_logs, {}
+        self.log_store.append({k: entry for k, entry in new_logs.items() if k in self.log})
+        if self.log_store.needs_compaction(len(self.log)):
+            self.log_store.compact(self.log)
 
-        # Save filtered logs to files (preserving exact existing format)
-        self.save_log_csv_file()
-        self.save_log_json_file()
+        _LOGGER.debug(f'Saved {len(new_logs)} new log entries. Total after retention: {len(self.log)}')
+        return True
 
-        _LOGGER.debug(f'Saved {len(self._new_logs)} new log entries. Total after retention: {len(self.log)}')
+    def _store_retention_cutoff(self, cutoff_timestamp: float) -> float:
+        """Age cutoff raised so the archive store keeps at most log_max_entries and log_max_bytes."""
+        limits = [n for n in (self.log_max_entries, self.log_max_bytes and max(1, self.log_max_bytes // self.log_store.record_bytes)) if n]
+        if limits:
+            keep_from = self.log_store.keep_cutoff(min(limits))
+            if keep_from is not None:
+                cutoff_timestamp = max(cutoff_timestamp, keep_from)
+        return cutoff_timestamp
+
+    def _save_log_entries_windowed(self, retention_days, cutoff_timestamp) -> None:
+        """Insert new entries, apply retention in the store and trim the in-memory window."""
+        new_logs, self._new_logs = self._new_logs, {}
+        self.log_store.append(new_logs)
+
+        cutoff_timestamp = self._store_retention_cutoff(cutoff_timestamp)
+        for unit_id, _, payload in self.log_store.iter_payloads(LOG_CODE_BALANCING, before=cutoff_timestamp):
+            self._count_balancing_flags(unit_id, payload, -1)
+        removed_count = self.log_store.prune(cutoff_timestamp)
+        if removed_count > 0:
+            _LOGGER.info(f"Log retention: removed {removed_count} entries older than {retention_days} days or beyond the size limits")
+        # before the window is trimmed, so entries leaving it are found as archived
+        self._refresh_archived_keys(None if removed_count > 0 else new_logs.keys())
+
+        # entries leaving the in-memory window stay in the store
+        self.log.trim(cutoff_timestamp, self.log_store.memory_entries)
+        self._update_log_floor()
+
+        _LOGGER.debug(f'Saved {len(new_logs)} new log entries. Total after retention: {self.log_store.count()}')
         return True
 
-    def save_log_json_file(self) -> None:
-        #log_s = dict(sorted(log.items()))
-        with open(self._log_json_path, "w") as outfile:
-            json.dump(self.log, outfile, indent=1, sort_keys=False, default=str)
+    def export_log_files(self) -> None:
+        """Write the CSV and text exports of the full log."""
+        self.save_log_csv_file()
+        self.save_log_txt_file(append=False)
 
-    def save_log_txt_file(self, log:dict, append=True) -> None:
+    def save_log_txt_file(self, entries=None, append=True) -> None:
+        """Write (key, entry) pairs in key order as text lines, by default the full log."""
+        if entries is None:
+            entries = self.iter_log_entries()
         if append:
             write_type = 'a'
         else:
             write_type = 'w'
         with open(self._log_txt_path, write_type) as myfile:
-            for _k, entry in self.log.items():
-                unit_id, unit_name, ts, code, data  = self.split_log_entry(entry)
-                code_desc, decoded = self.decode_log_data(unit_id, ts, code, data)
-                detail = decoded['desc']
+            for k, entry in entries:
+                ts, unit_name, code, code_desc, _, detail, _ = self.get_decoded_log_entry(k, entry)
                 line = f'{ts.strftime("%Y%m%d %H:%M:%S")} {unit_name} {code} {code_desc} {detail}\n'
                 myfile.write(line)
 
@@ -950,11 +1466,9 @@ class BydBoxClient(ExtModbusClient):
             writer = csv.writer(file)
             writer.writerow(['ts', 'unit','code','description','detail','data'])
 
-            for _k, entry in self.log.items():
-                unit_id, unit_name, ts, code, data  = self.split_log_entry(entry)
-                code_desc, decoded = self.decode_log_data(unit_id, ts, code, data)
-                detail = decoded['desc']
-                log_list = [ts.strftime("%Y%m%d %H:%M:%S"), unit_name, code, code_desc, detail, binascii.hexlify(data).decode('ascii')]
+            for k, entry in self.iter_log_entries():
+                ts, unit_name, code, code_desc, _, detail, hexdata = self.get_decoded_log_entry(k, entry)
+                log_list = [ts.strftime("%Y%m%d %H:%M:%S"), unit_name, code, code_desc, detail, hexdata]
                 writer.writerow(log_list)
 
     def split_log_entry(self, log:dict):
@@ -966,27 +1480,31 @@ class BydBoxClient(ExtModbusClient):
 
         return unit_id, unit_name, ts, code, data
 
+    def get_decoded_log_entry(self, k, entry:dict) -> tuple:
+        """Return (ts, unit name, code, code description, datapoints, detail, hex data) of a log entry, cached by key."""
+        record = self.log_cache.get(k)
+        if record is None:
+            unit_id, unit_name, ts, code, data = self.split_log_entry(entry)
+            code_desc, decoded = self.decode_log_data(unit_id, ts, code, data)
+            detail = decoded.pop('desc')
+            record = (ts, unit_name, code, code_desc, decoded, detail, binascii.hexlify(data).decode('ascii'))
+            self.log_cache.put(k, record)
+        return record
+
     def get_log_list(self, max_length) -> list:
-        logs = sorted(self.log.items(), reverse=True)
         log_list = []
-        for _k, log in logs[:max_length]:
-            unit_id, unit_name, ts, code, data = self.split_log_entry(log)
-            code_desc, decoded = self.decode_log_data(unit_id, ts, code, data)
-            detail = decoded.get('desc')
-            hexdata = log['data']
-            decoded.pop('desc')
-            log_list.append({'ts': ts, 'u': unit_name, 'c': code, 'd': code_desc, 'data': decoded, 'detail': detail, 'hexdata': hexdata})
+        for k, log in self.log.latest(max_length):
+            ts, unit_name, code, code_desc, decoded, detail, _ = self.get_decoded_log_entry(k, log)
+            log_list.append({'ts': ts, 'u': unit_name, 'c': code, 'd': code_desc, 'data': dict(decoded), 'detail': detail, 'hexdata': log['data']})
 
         return log_list
 
     def decode_log_data(self, unit_id:int, ts:datetime, code:int, data:bytearray):
-        decoded = {}
         if unit_id == 0:
             code_desc = self.get_value_from_dict(BMU_LOG_CODES, code, 'Not available')
-            decoded = self.decode_bmu_log_data(ts, code, data)
         else:
             code_desc = self.get_value_from_dict(BMS_LOG_CODES, code, 'Not available')
-            decoded = self.decode_bms_log_data(ts, code, data)
+        decoded = decode_log_record(log_unit_type(unit_id), code, data)
 
         if len(decoded)>0:
             decoded['desc'] = self.log_data_to_str(decoded)
@@ -996,272 +1514,10 @@ class BydBoxClient(ExtModbusClient):
         return code_desc, decoded
 
     def decode_bmu_log_data(self, ts:datetime, code:int, data:bytearray) -> dict:
-        datapoints = {}
-
-        if code == 0:
-            datapoints['bootl'] = data[0]
-            if data[1] == 0:
-                datapoints['exec'] = 'A'
-            elif data[1] == 1:
-                datapoints['exec'] = 'B'
-            else:
-                datapoints['exec'] = data[1]
-            datapoints['firmware_v'] = f"{data[2]:d}" + "." + f"{data[3]:d}"
-        elif code == 1:
-            if data[0] == 0:
-                datapoints['switchoff'] = '0'
-            elif data[0] == 1:
-                datapoints['switchoff'] = 'LED button'
-            else:
-                datapoints['switchoff'] = data[0]
-        elif code == 2:
-            if data[0] == 0:
-                event = 'Error/Warning cleared'
-            else:
-                error_code = data[1]
-                if error_code != 23:
-                    error = self.get_value_from_dict(BMU_LOG_ERRORS, error_code, 'Undefined')
-                    event = f'Error; {error.lower()}'
-                else:
-                    warnings = int(data[2] * 0x100 + data[3])
-                    warnings_list = self.bitmask_to_strings(warnings, BMU_LOG_WARNINGS)
-                    event = f'Warning; {self.strings_to_string(warnings_list).lower()}'
-
-            datapoints['event'] = event
-            datapoints['c_max_v'] = self.convert_from_byte_uint16(data,4)
-            datapoints['c_min_v'] = self.convert_from_byte_uint16(data,6)
-            datapoints['bat_max_t'] = data[8]
-            datapoints['bat_min_t'] = data[9]
-            datapoints['bat_v'] =  self.calculate_value(self.convert_from_byte_uint16(data,10), -1, 1)
-            datapoints['soc'] = data[12]
-            datapoints['soh'] = data[13]
-        elif code == 32:
-            datapoints['p_status'] = self.get_value_from_dict(BMU_STATUS, data[1], 'NA')
-            datapoints['n_status'] = self.get_value_from_dict(BMU_STATUS, data[0], 'Undefined')
-        elif code == 34:
-            datapoints['firmware_v'] = f"{data[1]:d}" + "." + f"{data[2]:d}"
-            datapoints['mcu'] = data[4]
-        elif code == 35:
-            datapoints['firmware_v'] = f"{data[1]:d}" + "." + f"{data[2]:d}"
-            datapoints['mcu'] = data[4]
-        elif code == 36:
-            running_time = data[0] * 0x01000000 + data[1] * 0x00010000 + data[2] * 0x00000100 + data[3]
-            datapoints['rtime'] = running_time
-            datapoints['bmu_qty_c'] = data[4]
-            datapoints['bmu_qty_t'] = data[5]
-            datapoints['c_max_v'] = self.convert_from_byte_uint16(data,6)
-            datapoints['c_min_v'] = self.convert_from_byte_uint16(data,8)
-            datapoints['c_max_t'] = data[10]
-            datapoints['c_min_t'] = data[11]
-            datapoints['out_a'] = self.calculate_value(self.convert_from_byte_int16(data,12), -1, 1)
-            datapoints['out_v'] = self.calculate_value(self.convert_from_byte_uint16(data,14), -1, 1)
-            datapoints['acc_v'] = self.calculate_value(self.convert_from_byte_uint16(data,16), -1, 1)
-            datapoints['bms_addr'] = data[18]
-            datapoints['m_type'] = self.get_value_from_dict(MODULE_TYPE, data[19], 'Undefined')
-            datapoints['m_qty'] = data[20]
-        elif code == 38:
-            datapoints['max_charge_a'] = self.calculate_value(self.convert_from_byte_int16(data,0), -1, 1)
-            datapoints['max_discharge_a'] = self.calculate_value(self.convert_from_byte_int16(data,2), -1, 1)
-            datapoints['max_charge_v'] = self.calculate_value(self.convert_from_byte_int16(data,4), -1, 1)
-            datapoints['max_discharge_v'] = self.calculate_value(self.convert_from_byte_int16(data,6), -1, 1)
-            datapoints['status'] = [self.get_value_from_dict(BMU_STATUS, data[8], 'Undefined')]
-            datapoints['bat_t'] = data[9]
-            datapoints['inverter'] = INVERTER_LIST[data[10]]
-            datapoints['bms_qty'] = data[11]
-        elif code == 40:
-            datapoints['firmware_n1']  = data[0]
-            datapoints['firmware_v1']  = f"{data[1]:d}" + "." + f"{data[2]:d}"
-            datapoints['firmware_n2']  = data[3]
-            datapoints['firmware_v2']  = f"{data[4]:d}" + "." + f"{data[5]:d}"
-            if data[6] != 0xFF:
-                datapoints['firmware_n3']  = data[6]
-                datapoints['firmware_v3']  = f"{data[7]:d}" + "." + f"{data[8]:d}"
-        elif code == 41:
-            # ?
-            pass
-        elif code == 45:
-            #status = self.get_value_from_dict(BMU_STATUS, data[0], 'Undefined')
-            datapoints['status'] = f'{data[0]}'
-            # 0: 0-1
-            # 1: 0
-            # 2: 0-1
-            # 3: x02
-            datapoints['out_v'] =  self.calculate_value(self.convert_from_byte_uint16(data,4), -1, 1)
-            datapoints['bat_v'] =  self.calculate_value(self.convert_from_byte_uint16(data,6), -1, 1)
-            # 8: 00
-            # 9: 00
-            datapoints['soc_a'] = self.calculate_value(self.convert_from_byte_uint16(data,10), -1, 1)
-            datapoints['soc_b'] = self.calculate_value(self.convert_from_byte_uint16(data,12), -1, 1)
-        elif code == 101:
-            if data[0] == 0:
-                datapoints['bms_updt'] = 'A'
-            else:
-                datapoints['bms_updt'] = 'B'
-            datapoints['firmware_v'] = f"{data[1]:d}" + "." + f"{data[2]:d}"
-        elif code == 102:
-            if data[0] == 0:
-                datapoints['bms_updt'] = 'A'
-            else:
-                datapoints['bms_updt'] = 'B'
-            datapoints['firmware_v'] = f"{data[1]:d}" + "." + f"{data[2]:d}"
-        elif code == 103:
-            datapoints['firmware_n1']  = data[0]
-            datapoints['firmware_v1']  = f"{data[1]:d}" + "." + f"{data[2]:d}"
-            datapoints['firmware_n2']  = data[3]
-            datapoints['firmware_v2']  = f"{data[4]:d}" + "." + f"{data[5]:d}"
-        elif code == 105:
-            if (data[0] == 0) or (data[0] == 1) or (data[0] == 2):
-               # BMU Parameters table update
-                #datapoints['pt_u'] = ''
-                pass
-            else:
-                # ?
-                pass
-            datapoints['pt_v'] = f"{data[1]:d}" + "." + f"{data[2]:d}"
-        elif code == 111:
-            datapoints['dt_cal'] = self.get_value_from_dict(BMU_CALIBRATION, data[0], 'Undefined')
-        elif code == 118:
-            status = self.get_value_from_dict(BMU_STATUS, data[0], 'Undefined')
-            datapoints['status'] = [status]
-            if status != 'Undefined':
-                datapoints['env_min_t'] = data[1]
-                datapoints['env_max_t'] = data[2]
-                datapoints['soc'] = data[3]
-                datapoints['soh'] = data[4]
-                datapoints['bat_t'] = data[5]
-                datapoints['bat_v'] = self.calculate_value(self.convert_from_byte_uint16(data,6), -1, 1)
-                datapoints['c_max_v'] = self.convert_from_byte_uint16(data,8)
-                datapoints['c_min_v'] = self.convert_from_byte_uint16(data,10)
-                datapoints['bat_max_t'] = data[13]
-                datapoints['bat_min_t'] = data[15]
-
-        return datapoints
+        return decode_log_record(LOG_UNIT_BMU, code, data)
 
     def decode_bms_log_data(self, ts:datetime, code:int, data:bytearray) -> dict:
-        datapoints = {}
-
-        if code == 0:
-            datapoints['bootl'] = data[0]
-            if data[1] == 0:
-                datapoints['exec'] = 'A'
-            elif data[1] == 2:
-                datapoints['exec'] = 'B'
-            else:
-                datapoints['exec'] = data[1]
-            datapoints['firmware_v'] = f"{data[3]:d}" + "." + f"{data[4]:d}"
-        elif code == 1:
-            datapoints['power_off'] =self.get_value_from_dict(BMS_POWER_OFF, data[1], default='NA')
-
-            if data[2] == 0:
-                datapoints['section'] = 'A'
-            elif data[2] == 1:
-                datapoints['section'] = 'B'
-            else:
-                datapoints['section'] = data[2]
-
-            datapoints['firmware_v']  = f"{data[3]:d}" + "." + f"{data[4]:d}"
-        elif code in [2,3,4,5,6,7,9,10,11,13,14,16,19,20,21]:
-            warnings1 = int(data[1] * 0x100 + data[0])
-            warnings2 = int(data[3] * 0x100 + data[2])
-            warnings3 = int(data[5] * 0x100 + data[4])
-            warnings_list = self.bitmask_to_strings(warnings1, BMS_WARNINGS) + self.bitmask_to_strings(warnings2, BMS_WARNINGS) + self.bitmask_to_strings(warnings3, BMS_WARNINGS3)
-            datapoints['warnings'] = warnings_list
-
-            errors = int(data[7] * 0x100 + data[6])
-            errors_list = self.bitmask_to_strings(errors, BMS_ERRORS)
-            datapoints['errors'] = errors_list
-
-            status = int(data[8])
-            if (status % 2) == 1:
-                status_list = self.bitmask_to_strings(status, BMS_STATUS_OFF)
-            else:
-                status_list = self.bitmask_to_strings(status, BMS_STATUS_ON)
-            datapoints['status'] = status_list
-
-            if code == 9:
-                datapoints['bat_idle'] = data[9]
-                datapoints['target_soc'] = data[10]
-            elif code == 20:
-                datapoints['bmu_serial_v1'] = data[9]
-                datapoints['bmu_serial_v2'] = data[10]
-            else:
-                datapoints['soc'] = data[9]
-                datapoints['soh'] = data[10]
-                datapoints['bat_v'] = self.calculate_value(self.convert_from_byte_uint16(data,11,'LE'), -1, 1)
-                datapoints['out_v'] = self.calculate_value(self.convert_from_byte_uint16(data,13,'LE'), -1, 1)
-                datapoints['out_a'] = self.calculate_value(self.convert_from_byte_int16(data,15,'LE'), -1, 1)
-
-            if code == 21:
-                datapoints['c_max_v_n'] = data[17]
-                datapoints['c_min_v_n'] = data[18]
-                datapoints['c_max_t_n'] = data[20]
-                datapoints['c_min_t_n'] = data[21]
-            else:
-                datapoints['c_max_v'] = self.convert_from_byte_uint16(data,17,'LE')
-                datapoints['c_min_v'] = self.convert_from_byte_uint16(data,19,'LE')
-                datapoints['c_max_t'] = data[21]
-                datapoints['c_min_t'] = data[22]
-        elif code in [17,18]:
-            if code == 17:
-                bc = []
-                i = 0
-                for j in range(20):
-                    b = int(data[j])
-                    for bit in range(8):
-                        if b >> bit & 1:
-                            bc.append(str(i))
-                        i += 1
-                datapoints['b_cells'] = bc
-
-            c_min_v = self.convert_from_byte_uint16(data,21,'LE')
-            datapoints['c_min_v'] = c_min_v
-        elif code in [101,102]:
-            if data[0] == 0:
-                datapoints['area'] = 'A'
-            else:
-                datapoints['area'] = 'B'
-            datapoints['firmware_p']  = f"{data[2]:d}" + "." + f"{data[1]:d}"
-            datapoints['firmware_n']  = f"{data[4]:d}" + "." + f"{data[3]:d}"
-        elif code == 105:
-            x = self.convert_from_byte_uint16(data, 0, type='LE')
-            y = self.convert_from_byte_uint16(data, 2, type='LE')
-#            datapoints['threshold']  = f"{x:d}" + "." + f"{y:d}"
-            datapoints['pt_v']  = f"{x:d}" + "." + f"{y:d}"
-        elif code == 106:
-            datapoints['sn_change'] = 1
-        elif code == 111:
-            try:
-                nt = datetime(year=data[0]+2000, month=data[1], day=data[2], hour=data[3], minute=data[4], second=data[5])
-                datapoints['nt'] = nt
-            except Exception as e:
-                _LOGGER.error(f'Failed to convert to datetime {data[0]} {data[1]} {data[2]} {data[3]} {data[4]} {data[5]} {e}')
-            #datapoints['dt'] = (ts - nt).total_seconds()
-
-        return datapoints
+        return decode_log_record(LOG_UNIT_BMS, code, data)
 
     def log_data_to_str(self, data) -> str:
-        strings = []
-        for dp, v in data.items():
-            dp_config = DATA_POINTS.get(dp)
-            if dp_config is not None:
-                s = f"{dp_config['label']}: "
-                t = dp_config.get('type')
-                if t in ['nlist','slist']:
-                    if len(v) > 0:
-                        if t == 'slist':
-                            s += ', '.join(v)
-                        else:
-                            s += ','.join(v)
-                    else:
-                        s += '-'
-                elif t == 's': # string
-                    s = dp_config['label'].replace('{v}', f'{v}')
-                else: # 'n' numeric
-                    s += f"{v}"
-                    unit = dp_config.get('unit')
-                    if len(unit) > 0:
-                        s += f" {unit}"
-                strings.append(s)
-            else:
-                _LOGGER.error(f'Datapoint {dp} not defined')
-        return f"{'. '.join(strings)}."
+        return log_record_to_str(data)
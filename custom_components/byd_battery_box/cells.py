@@ -0,0 +1,104 @@
+"""Compact per-cell values of a BMS.
+
+Cell values are kept as flat arrays shaped (modules, values per module).
+Sensors expose them as [{'m': module, key: [...]}, ...] attributes; those
+lists are only built by CellView when an attribute is actually read.
+"""
+
+from array import array
+
+
+class CellView:
+    """Lazy per-module list view of a flat value array."""
+
+    __slots__ = ('values', 'modules', 'width', 'key', '_list')
+
+    def __init__(self, values, modules: int, width: int, key: str) -> None:
+        self.values = values
+        self.modules = modules
+        self.width = width
+        self.key = key
+        self._list = None
+
+    def tolist(self) -> list:
+        if self._list is None:
+            n = self.width
+            self._list = [{'m': m + 1, self.key: self.values[m * n:(m + 1) * n].tolist()} for m in range(self.modules)]
+        return self._list
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CellView):
+            return self.key == other.key and self.width == other.width and self.values == other.values
+        return self.tolist() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+
+def dedupe_view(previous, view: CellView) -> CellView:
+    """The previous view if it holds the same values, so its lists are not built again."""
+    if isinstance(previous, CellView) and previous == view:
+        return previous
+    return view
+
+
+def materialize(value):
+    """Attribute value of a data entry, CellViews become their lists."""
+    if isinstance(value, CellView):
+        return value.tolist()
+    return value
+
+
+def array_from_cells(cells, modules: int, width: int, key: str = 'v', typecode: str = 'h') -> array | None:
+    """Flat array from a restored [{'m': module, key: [...]}, ...] list, None if it has another shape."""
+    if isinstance(cells, CellView):
+        cells = cells.tolist()
+    try:
+        if len(cells) != modules:
+            return None
+        values = array(typecode)
+        for module in cells:
+            row = module[key]
+            if len(row) != width:
+                return None
+            values.extend(row)
+        return values
+    except (TypeError, KeyError, OverflowError):
+        return None
+
+
+class CellHistory:
+    """Element-wise min and max of the cell voltages (mV) of one BMS across updates."""
+
+    def __init__(self, voltages: array, modules: int, cells: int, max_values: array | None = None, min_values: array | None = None) -> None:
+        self.modules = modules
+        self.cells = cells
+        self.max = array('h', voltages) if max_values is None else max_values
+        self.min = array('h', voltages) if min_values is None else min_values
+        self.max_view = CellView(self.max, modules, cells, 'v')
+        self.min_view = CellView(self.min, modules, cells, 'v')
+        self.update(voltages)
+
+    def matches(self, modules: int, cells: int) -> bool:
+        return self.modules == modules and self.cells == cells
+
+    def update(self, voltages: array) -> None:
+        # map() over builtins runs the whole row in C; views are only replaced on a change
+        values = array('h', map(max, self.max, voltages))
+        if values != self.max:
+            self.max = values
+            self.max_view = CellView(values, self.modules, self.cells, 'v')
+        values = array('h', map(min, self.min, voltages))
+        if values != self.min:
+            self.min = values
+            self.min_view = CellView(values, self.modules, self.cells, 'v')
+
+    @property
+    def max_voltage(self) -> float:
+        return round(max(self.max) * 0.001, 3)
+
+    @property
+    def min_voltage(self) -> float:
+        return round(min(self.min) * 0.001, 3)
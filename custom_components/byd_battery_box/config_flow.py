@@ -7,14 +7,27 @@ from typing import Any
 import voluptuous as vol
 from homeassistant import config_entries, exceptions
 from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT, CONF_SCAN_INTERVAL
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from .const import (
     CONF_BMS_SCAN_INTERVAL,
+    CONF_BMS_SUMMARY_SCAN_INTERVAL,
+    CONF_DEADBAND_HEARTBEAT,
+    CONF_DEADBAND_RELATIVE,
+    CONF_LOG_MAX_ENTRIES,
+    CONF_LOG_MAX_SIZE,
     CONF_LOG_SCAN_INTERVAL,
+    CONF_LOG_STORE,
     CONF_UNIT_ID,
+    DEADBAND_TYPES,
     DEFAULT_BMS_SCAN_INTERVAL,
+    DEFAULT_BMS_SUMMARY_SCAN_INTERVAL,
+    DEFAULT_DEADBAND_HEARTBEAT,
+    DEFAULT_DEADBAND_RELATIVE,
+    DEFAULT_LOG_MAX_ENTRIES,
+    DEFAULT_LOG_MAX_SIZE,
     DEFAULT_LOG_SCAN_INTERVAL,
+    DEFAULT_LOG_STORE,
     DEFAULT_NAME,
     DEFAULT_PORT,
     DEFAULT_SCAN_INTERVAL,
@@ -22,6 +35,7 @@ from .const import (
     DOMAIN,
 )
 from .hub import Hub
+from .logstore import LOG_STORES
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -47,6 +61,7 @@ DATA_SCHEMA = vol.Schema(
         vol.Optional(CONF_SCAN_INTERVAL, default=DEFAULT_SCAN_INTERVAL): int,
         vol.Optional(CONF_BMS_SCAN_INTERVAL, default=DEFAULT_BMS_SCAN_INTERVAL): int,
         vol.Optional(CONF_LOG_SCAN_INTERVAL, default=DEFAULT_LOG_SCAN_INTERVAL): int,
+        vol.Optional(CONF_LOG_STORE, default=DEFAULT_LOG_STORE): vol.In(list(LOG_STORES)),
     }
 )
 
@@ -69,7 +84,7 @@ async def validate_input(hass: HomeAssistant, data: dict) -> dict[str, Any]:
         raise LogScanIntervalTooShort
 
     try:
-        hub = Hub(hass, data[CONF_NAME], data[CONF_HOST], data[CONF_PORT], data[CONF_UNIT_ID], data[CONF_SCAN_INTERVAL], data[CONF_BMS_SCAN_INTERVAL], data[CONF_LOG_SCAN_INTERVAL])
+        hub = Hub(hass, data[CONF_NAME], data[CONF_HOST], data[CONF_PORT], data[CONF_UNIT_ID], data[CONF_SCAN_INTERVAL], data[CONF_BMS_SCAN_INTERVAL], data[CONF_LOG_SCAN_INTERVAL], data.get(CONF_LOG_STORE, DEFAULT_LOG_STORE))
         await hub.init_data(close=True)
     except Exception as e:
         # If there is an error, raise an exception to notify HA that there was a
@@ -133,6 +148,41 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             step_id="user", data_schema=DATA_SCHEMA, errors=errors
         )
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry) -> OptionsFlowHandler:
+        return OptionsFlowHandler()
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the options: BMS scan intervals, deadbands of the high frequency sensors and log limits."""
+
+    async def async_step_init(self, user_input=None):
+        errors = {}
+        if user_input is not None:
+            summary_interval = user_input[CONF_BMS_SUMMARY_SCAN_INTERVAL]
+            if user_input[CONF_BMS_SCAN_INTERVAL] < 60:
+                errors["base"] = "bms_scan_interval_too_short"
+            elif 0 < summary_interval < 10:
+                errors["base"] = "bms_summary_scan_interval_too_short"
+            else:
+                return self.async_create_entry(data=user_input)
+
+        options = self.config_entry.options
+        deadband = vol.All(vol.Coerce(float), vol.Range(min=0))
+        schema = {
+            vol.Optional(CONF_BMS_SCAN_INTERVAL, default=options.get(CONF_BMS_SCAN_INTERVAL, self.config_entry.data.get(CONF_BMS_SCAN_INTERVAL, DEFAULT_BMS_SCAN_INTERVAL))): int,
+            vol.Optional(CONF_BMS_SUMMARY_SCAN_INTERVAL, default=options.get(CONF_BMS_SUMMARY_SCAN_INTERVAL, DEFAULT_BMS_SUMMARY_SCAN_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=0)),
+        }
+        schema |= {
+            vol.Optional(option, default=options.get(option, default)): deadband
+            for option, (_, _, default) in DEADBAND_TYPES.items()
+        }
+        schema[vol.Optional(CONF_DEADBAND_RELATIVE, default=options.get(CONF_DEADBAND_RELATIVE, DEFAULT_DEADBAND_RELATIVE))] = deadband
+        schema[vol.Optional(CONF_DEADBAND_HEARTBEAT, default=options.get(CONF_DEADBAND_HEARTBEAT, DEFAULT_DEADBAND_HEARTBEAT))] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        schema[vol.Optional(CONF_LOG_MAX_ENTRIES, default=options.get(CONF_LOG_MAX_ENTRIES, DEFAULT_LOG_MAX_ENTRIES))] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        schema[vol.Optional(CONF_LOG_MAX_SIZE, default=options.get(CONF_LOG_MAX_SIZE, DEFAULT_LOG_MAX_SIZE))] = vol.All(vol.Coerce(int), vol.Range(min=0))
+        return self.async_show_form(step_id="init", data_schema=vol.Schema(schema), errors=errors)
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
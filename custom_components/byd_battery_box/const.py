@@ -4,6 +4,8 @@ from homeassistant.components.sensor import (
 )
 from homeassistant.helpers.entity import EntityCategory
 
+from .registers import BMS_STATUS_BLOCK, BMU_STATUS_BLOCK, EXT_INFO_BLOCK
+
 DOMAIN = "byd_battery_box"
 
 DEFAULT_NAME = "BYD Battery Box"
@@ -17,6 +19,26 @@ DEFAULT_BMS_SCAN_INTERVAL = 600
 DEFAULT_LOG_SCAN_INTERVAL = 600
 CONF_BMS_SCAN_INTERVAL = "bms_scan_interval"
 CONF_LOG_SCAN_INTERVAL = "log_scan_interval"
+CONF_BMS_SUMMARY_SCAN_INTERVAL = "bms_summary_scan_interval"
+DEFAULT_BMS_SUMMARY_SCAN_INTERVAL = 0
+CONF_LOG_STORE = "log_store"
+DEFAULT_LOG_STORE = "jsonl"
+CONF_DEADBAND_RELATIVE = "deadband_relative"
+CONF_DEADBAND_HEARTBEAT = "deadband_heartbeat"
+DEFAULT_DEADBAND_RELATIVE = 0
+DEFAULT_DEADBAND_HEARTBEAT = 300
+CONF_LOG_MAX_ENTRIES = "log_max_entries"
+CONF_LOG_MAX_SIZE = "log_max_size"
+DEFAULT_LOG_MAX_ENTRIES = 0 # 0 keeps every entry within the retention days
+DEFAULT_LOG_MAX_SIZE = 0 # MB, 0 disables
+
+# option: BMU keys, BMS keys (for every tower), default absolute deadband (0 reports every change)
+DEADBAND_TYPES = {
+    "deadband_power": [["power"], [], 0],
+    "deadband_current": [["current"], ["current"], 0],
+    "deadband_voltage": [["bat_voltage", "output_voltage"], ["bat_voltage", "output_voltage"], 0],
+    "deadband_cell_voltage": [[], ["avg_c_v", "max_c_v", "min_c_v"], 0],
+}
 
 DEVICE_TYPES = {
     0: "BMU",
@@ -33,6 +55,10 @@ BMU_BUTTON_TYPES = {
     "reset_history_cell_voltage": ["Reset history cell voltage", "reset_history_cell_voltage", None, None, None, "mdi:restore-alert", None],
 }
 
+BMU_ONLY_BUTTON_TYPES = {
+    "export_log_files": ["Export log files", "export_log_files", None, None, None, "mdi:file-export", EntityCategory.DIAGNOSTIC],
+}
+
 BMU_SENSOR_TYPES = {
     "inverter": ["Inverter", "inverter", None, None, None, None, EntityCategory.DIAGNOSTIC],
     "bmu_v": ["BMU version", "bmu_v", None, None, None, None, EntityCategory.DIAGNOSTIC],
@@ -44,54 +70,56 @@ BMU_SENSOR_TYPES = {
     "application": ["Application", "application", None, None, None, None, EntityCategory.DIAGNOSTIC],
     "phase": ["Phase", "phase", None, None, None, None, EntityCategory.DIAGNOSTIC],
     "errors": ["Errors", "errors", None, None, None, None, EntityCategory.DIAGNOSTIC],
-    "capacity": ["Total capacity", "capacity", None, None, "kWh", None, EntityCategory.DIAGNOSTIC],
+    "capacity": ["Total capacity", "capacity", None, None, EXT_INFO_BLOCK.unit('capacity'), None, EntityCategory.DIAGNOSTIC],
     "param_t_v": ["Param table version", "param_t_v", None, None, None, None, EntityCategory.DIAGNOSTIC],
     "sensors_t": ["Temperature sensors per module", "sensors_t", None, None, None, None, EntityCategory.DIAGNOSTIC],
     "cells": ["Cells per module", "cells", None, None, None, None, EntityCategory.DIAGNOSTIC],
 
-    "soc": ["State of charge", "soc", None, SensorStateClass.MEASUREMENT, "%", "mdi:battery", None],
-    "soh": ["State of health", "soh", None, SensorStateClass.MEASUREMENT, "%", "mdi:battery", None],
-    "bmu_temp": ["BMU temperature", "bmu_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:thermometer", None],
-    "max_cell_temp": ["BMU cell temperature max", "max_cell_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:thermometer", None],
-    "min_cell_temp": ["BMU cell temperature min", "min_cell_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:thermometer", None],
-    "max_cell_v": ["BMU cell voltage max", "max_cell_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "min_cell_v": ["BMU cell voltage min", "min_cell_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "current": ["BMU current", "current", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, "A", "mdi:lightning-bolt", None],
-    "bat_voltage": ["BMU battery voltage", "bat_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "output_voltage": ["BMU output voltage", "output_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "power": ["BMU power", "power", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, "W", "mdi:lightning-bolt", None],
-    "charge_lfte": ["Charge total energy", "charge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, "kWh", None, None],
-    "discharge_lfte": ["Discharge total energy", "discharge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, "kWh", None, None],
-    "efficiency": ["Efficiency", "efficiency",None, None, "%", None, None],
+    "soc": ["State of charge", "soc", None, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('soc'), "mdi:battery", None],
+    "soh": ["State of health", "soh", None, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('soh'), "mdi:battery", None],
+    "bmu_temp": ["BMU temperature", "bmu_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('bmu_temp'), "mdi:thermometer", None],
+    "max_cell_temp": ["BMU cell temperature max", "max_cell_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('max_cell_temp'), "mdi:thermometer", None],
+    "min_cell_temp": ["BMU cell temperature min", "min_cell_temp", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('min_cell_temp'), "mdi:thermometer", None],
+    "max_cell_v": ["BMU cell voltage max", "max_cell_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('max_cell_v'), "mdi:lightning-bolt", None],
+    "min_cell_v": ["BMU cell voltage min", "min_cell_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('min_cell_v'), "mdi:lightning-bolt", None],
+    "current": ["BMU current", "current", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('current'), "mdi:lightning-bolt", None],
+    "bat_voltage": ["BMU battery voltage", "bat_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('bat_voltage'), "mdi:lightning-bolt", None],
+    "output_voltage": ["BMU output voltage", "output_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('output_voltage'), "mdi:lightning-bolt", None],
+    "power": ["BMU power", "power", SensorDeviceClass.POWER, SensorStateClass.MEASUREMENT, BMU_STATUS_BLOCK.unit('power'), "mdi:lightning-bolt", None],
+    "charge_lfte": ["Charge total energy", "charge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, BMU_STATUS_BLOCK.unit('charge_lfte'), None, None],
+    "discharge_lfte": ["Discharge total energy", "discharge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, BMU_STATUS_BLOCK.unit('discharge_lfte'), None, None],
+    "efficiency": ["Efficiency", "efficiency",None, None, BMU_STATUS_BLOCK.unit('efficiency'), None, None],
     "updated": ["Updated", "updated",SensorDeviceClass.TIMESTAMP, None, None, None, EntityCategory.DIAGNOSTIC],
     "bmu_last_log": ["BMU last log", "bmu_last_log",None, None, None, None, EntityCategory.DIAGNOSTIC],
     "log_entries": ["Log entries", "log_entries",None, None, None, None, EntityCategory.DIAGNOSTIC],
+    # progress of the integration's own history download, not a device value
+    "log_history_progress": ["Log history download", "log_history_progress",None, None, "%", "mdi:progress-download", EntityCategory.DIAGNOSTIC],
 }
 
 BMS_SENSOR_TYPES = {
-    "max_c_v": ["Cell voltage max", "max_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "min_c_v": ["Cell voltage min", "min_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
+    "max_c_v": ["Cell voltage max", "max_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('max_c_v'), "mdi:lightning-bolt", None],
+    "min_c_v": ["Cell voltage min", "min_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('min_c_v'), "mdi:lightning-bolt", None],
     "max_c_v_id": ["Cell voltage max number", "max_c_v_id", None, None, None, None, None],
     "min_c_v_id": ["Cell voltage min number", "min_c_v_id", None, None, None, None, None],
-    "max_c_t": ["Cell temperature max", "max_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:thermometer", None],
-    "min_c_t": ["Cell temperature min", "min_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:thermometer", None],
+    "max_c_t": ["Cell temperature max", "max_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('max_c_t'), "mdi:thermometer", None],
+    "min_c_t": ["Cell temperature min", "min_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('min_c_t'), "mdi:thermometer", None],
     "max_c_t_id": ["Cell temperature max number", "max_c_t_id", None, None, None, None, None],
     "min_c_t_id": ["Cell temperature min number", "min_c_t_id", None, None, None, None, None],
-    "soh": ["State of health", "soh", None, SensorStateClass.MEASUREMENT, "%", "mdi:battery", None],
-    "soc": ["State of charge", "soc", None, SensorStateClass.MEASUREMENT, "%", "mdi:battery", None],
-    "current": ["Current", "current", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, "A", "mdi:lightning-bolt", None],
-    "bat_voltage": ["Battery voltage", "bat_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "output_voltage": ["Output voltage", "output_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "charge_lfte": ["Charge total energy", "charge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, "kWh", None, None],
-    "discharge_lfte": ["Discharge total energy", "discharge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, "kWh", None, None],
-    "efficiency": ["Efficiency", "efficiency",None, None, "%", None, None],
+    "soh": ["State of health", "soh", None, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('soh'), "mdi:battery", None],
+    "soc": ["State of charge", "soc", None, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('soc'), "mdi:battery", None],
+    "current": ["Current", "current", SensorDeviceClass.CURRENT, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('current'), "mdi:lightning-bolt", None],
+    "bat_voltage": ["Battery voltage", "bat_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('bat_voltage'), "mdi:lightning-bolt", None],
+    "output_voltage": ["Output voltage", "output_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('output_voltage'), "mdi:lightning-bolt", None],
+    "charge_lfte": ["Charge total energy", "charge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, BMS_STATUS_BLOCK.unit('charge_lfte'), None, None],
+    "discharge_lfte": ["Discharge total energy", "discharge_lfte", SensorDeviceClass.ENERGY, SensorStateClass.TOTAL_INCREASING, BMS_STATUS_BLOCK.unit('discharge_lfte'), None, None],
+    "efficiency": ["Efficiency", "efficiency",None, None, BMS_STATUS_BLOCK.unit('efficiency'), None, None],
     "balancing_qty": ["Cells balancing", "balancing_qty",None, None, None, "mdi:counter", None],
     "warnings": ["Warnings", "warnings",None, None, None, None, EntityCategory.DIAGNOSTIC],
     "errors": ["Errors", "errors",None, None, None, None, EntityCategory.DIAGNOSTIC],
-    "avg_c_v": ["Cells average voltage", "avg_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "avg_c_t": ["Cells average temperature", "avg_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, "°C", "mdi:lightning-bolt", None],
-    "max_history_cell_voltage": ["Max history cell voltage", "max_history_cell_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
-    "min_history_cell_voltage": ["Min history cell voltage", "min_history_cell_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, "V", "mdi:lightning-bolt", None],
+    "avg_c_v": ["Cells average voltage", "avg_c_v", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('avg_c_v'), "mdi:lightning-bolt", None],
+    "avg_c_t": ["Cells average temperature", "avg_c_t", SensorDeviceClass.TEMPERATURE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('avg_c_t'), "mdi:lightning-bolt", None],
+    "max_history_cell_voltage": ["Max history cell voltage", "max_history_cell_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('max_history_cell_voltage'), "mdi:lightning-bolt", None],
+    "min_history_cell_voltage": ["Min history cell voltage", "min_history_cell_voltage", SensorDeviceClass.VOLTAGE, SensorStateClass.MEASUREMENT, BMS_STATUS_BLOCK.unit('min_history_cell_voltage'), "mdi:lightning-bolt", None],
     "updated": ["Updated", "updated",SensorDeviceClass.TIMESTAMP, None, None, None, EntityCategory.DIAGNOSTIC],
     "last_log": ["Last log", "last_log",None, None, None, None, EntityCategory.DIAGNOSTIC],
     "b_total": ["Balancing total", "b_total",None, None, None, None, None],
@@ -102,6 +130,7 @@ CONNECTION_SENSOR_TYPES = {
     "connection_quality": ["Connection Quality", "connection_quality", None, SensorStateClass.MEASUREMENT, "%", "mdi:connection", EntityCategory.DIAGNOSTIC],
     "last_latency": ["Last Latency", "last_latency", None, None, "ms", "mdi:timer", EntityCategory.DIAGNOSTIC],
     "avg_latency": ["Average Latency", "avg_latency", None, None, "ms", "mdi:timer", EntityCategory.DIAGNOSTIC],
+    "error_rate": ["Error Rate", "error_rate", None, SensorStateClass.MEASUREMENT, "%", "mdi:alert-circle-outline", EntityCategory.DIAGNOSTIC],
     "consecutive_failures": ["Consecutive Failures", "consecutive_failures", None, SensorStateClass.MEASUREMENT, None, "mdi:alert-circle", EntityCategory.DIAGNOSTIC],
     "connection_health": ["Connection Health", "connection_health", None, None, None, "mdi:check-circle", EntityCategory.DIAGNOSTIC],
 }
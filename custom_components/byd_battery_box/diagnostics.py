@@ -0,0 +1,21 @@
+"""Diagnostics support for BYD Battery Box."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from . import HubConfigEntry
+
+TO_REDACT = {CONF_HOST, 'serial'}
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: HubConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    hub = entry.runtime_data
+    return {
+        'entry': async_redact_data(dict(entry.data), TO_REDACT),
+        'hub': async_redact_data(hub.get_diagnostics(), TO_REDACT),
+    }
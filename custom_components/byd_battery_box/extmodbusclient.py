@@ -6,6 +6,7 @@ import asyncio
 import logging
 import operator
 import struct
+import time
 from typing import Literal
 
 from pymodbus.client import AsyncModbusTcpClient
@@ -21,17 +22,19 @@ except ImportError:
 from pymodbus import ExceptionResponse
 from pymodbus.exceptions import ConnectionException, ModbusIOException
 
+from .scheduler import ModbusScheduler
+
 _LOGGER = logging.getLogger(__name__)
 
 
 class ExtModbusClient:
-    busy = False
 
     def __init__(self, host: str, port: int, unit_id: int, timeout: int, framer: str) -> None:
         """Init Class"""
         self._host = host
         self._port = port
         self._unit_id = unit_id
+        self.scheduler = ModbusScheduler()
         self._client = AsyncModbusTcpClient(host=host, port=port, framer=framer, timeout=timeout)
         _LOGGER.debug(f'client timeout {timeout}')
 
@@ -66,6 +69,13 @@ class ExtModbusClient:
     def connected(self) -> bool:
         return self._client.connected
 
+    @property
+    def busy(self) -> bool:
+        return self.scheduler.locked()
+
+    def _observe_call(self, operation: str, start: float, ok: bool) -> None:
+        """Called after every Modbus request ('read' or 'write') with its perf_counter start and outcome."""
+
     def validate(self, value, comparison, against):
         ops = {
             ">": operator.gt,
@@ -86,9 +96,11 @@ class ExtModbusClient:
 
         data = None
         for attempt in range(retries + 1):
+            start = time.perf_counter()
             try:
                 data = await self._client.read_holding_registers(address=address, count=count, device_id=unit_id)
             except (ModbusIOException, ConnectionException) as e:
+                self._observe_call('read', start, False)
                 _LOGGER.warning(
                     f'error reading registers attempt {attempt + 1}/{retries + 1}: {type(e).__name__} connected: {self._client.connected} address: {address} count: {count} unit id: {self._unit_id} {e}')
                 if attempt < retries:
@@ -97,10 +109,12 @@ class ExtModbusClient:
                     continue
                 return None
             except Exception as e:
+                self._observe_call('read', start, False)
                 _LOGGER.error(
                     f'error reading registers. unknown error. connected {self._client.connected} address: {address} count: {count} unit id: {self._unit_id} type {type(e)} error {e} ')
                 return None
 
+            self._observe_call('read', start, data is not None and not data.isError())
             if data is not None and not data.isError():
                 break
             else:
@@ -139,15 +153,20 @@ class ExtModbusClient:
         # _LOGGER.debug(f"write registers a: {address} p: {payload}")
         await self._check_and_reconnect()
 
+        start = time.perf_counter()
         try:
             result = await self._client.write_registers(address=address, values=payload, device_id=unit_id)
         except ModbusIOException as e:
+            self._observe_call('write', start, False)
             raise Exception(f'write_registers: IO error {self._client.connected} {e.fcode} {e}')
         except ConnectionException as e:
+            self._observe_call('write', start, False)
             raise Exception(f'write_registers: no connection {self._client.connected} {e} ')
         except Exception as e:
+            self._observe_call('write', start, False)
             raise Exception(f'write_registers: unknown error {self._client.connected} {type(e)} {e} ')
 
+        self._observe_call('write', start, not result.isError())
         if result.isError():
             raise Exception(f'write_registers: data error {self._client.connected} {type(result)} {result} ')
 
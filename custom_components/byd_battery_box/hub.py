@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
 from importlib.metadata import PackageNotFoundError, version
 
@@ -11,48 +12,83 @@ from homeassistant.helpers.event import async_track_time_interval
 from packaging import version as pkg_version
 
 from .bydboxclient import BydBoxClient
-from .const import ATTR_MANUFACTURER, DEVICE_TYPES, DOMAIN
+from .cells import materialize
+from .const import (
+    ATTR_MANUFACTURER,
+    CONF_BMS_SUMMARY_SCAN_INTERVAL,
+    CONF_DEADBAND_HEARTBEAT,
+    CONF_DEADBAND_RELATIVE,
+    CONF_LOG_MAX_ENTRIES,
+    CONF_LOG_MAX_SIZE,
+    DEADBAND_TYPES,
+    DEFAULT_BMS_SUMMARY_SCAN_INTERVAL,
+    DEFAULT_DEADBAND_HEARTBEAT,
+    DEFAULT_DEADBAND_RELATIVE,
+    DEFAULT_LOG_MAX_ENTRIES,
+    DEFAULT_LOG_MAX_SIZE,
+    DEFAULT_LOG_STORE,
+    DEVICE_TYPES,
+    DOMAIN,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
+# watched keys with this prefix are connection metrics instead of data keys
+CONNECTION_KEY_PREFIX = 'connection:'
+
 class Hub:
     """Hub for BYD Battery Box Interface"""
 
     PYMODBUS_VERSION = '3.11.2'
 
-    def __init__(self, hass: HomeAssistant, name: str, host: str, port: int, unit_id: int, scan_interval: int, scan_interval_bms: int = 600, scan_interval_log: int = 600) -> None:
+    def __init__(self, hass: HomeAssistant, name: str, host: str, port: int, unit_id: int, scan_interval: int, scan_interval_bms: int = 600, scan_interval_log: int = 600, log_store: str = DEFAULT_LOG_STORE, entry_id: str | None = None, options: dict | None = None) -> None:
         """Init hub."""
         self._hass = hass
         self._name = name
+        self._entry_id = entry_id
         self._id = f'{name.lower()}_{host.lower().replace('.','')}'
         self._last_full_update = datetime(2000,1,1)
+        self._last_bms_summary_update = datetime(2000,1,1)
         self._last_log_update = datetime(2000,1,1)
         self._last_update = datetime(2000,1,1)
         self._unsub_interval_method = None
-        self._entities = []
+        self._entities = {} # update callback -> (state key, watched keys), None for every update
+        self._watched_keys = set()
+        self._entity_values = {} # watched key -> value at the last notification
+        self._entity_notified_at = {} # watched key -> monotonic time of the last notification
+        self.entity_stats = {'updates': 0, 'writes': 0, 'skipped': 0, 'deadband': 0}
+        self._set_deadbands(options or {})
         self._min_update_interval = timedelta(seconds=1)
         self._scan_interval = timedelta(seconds=scan_interval)
         self._scan_interval_bms = timedelta(seconds=scan_interval_bms)
         self._scan_interval_log = timedelta(seconds=scan_interval_log)
-        self._bydclient = BydBoxClient(host=host, port=port, unit_id=unit_id, timeout=max(3, (scan_interval - 1)))
+        # head block of every BMS between the full cell readouts, 0 disables
+        self._scan_interval_bms_summary = timedelta(seconds=(options or {}).get(CONF_BMS_SUMMARY_SCAN_INTERVAL, DEFAULT_BMS_SUMMARY_SCAN_INTERVAL))
+        self._bydclient = BydBoxClient(host=host, port=port, unit_id=unit_id, timeout=max(3, (scan_interval - 1)), log_store=log_store)
+        # optional log retention by count and by size on top of the age, 0 disables
+        self._bydclient.log_max_entries = (options or {}).get(CONF_LOG_MAX_ENTRIES, DEFAULT_LOG_MAX_ENTRIES) or None
+        self._bydclient.log_max_bytes = (options or {}).get(CONF_LOG_MAX_SIZE, DEFAULT_LOG_MAX_SIZE) * 1024 * 1024 or None
         self.online = True
-        self._busy = False
-        self._update_log_history_depth = [0,0]
+        self._busy_lock = asyncio.Lock()
+        self._log_history_job = None
+        self._log_history_task = None
+        self._log_load_task = None
+        self._validate_task = None
+        self._log_loaded = asyncio.Event()
+        self.startup_timings = {}
 
     class BusyLock:
-        """Async context manager for managing busy state."""
+        """Async context manager serialising hub update cycles; waiters are woken on release."""
 
         def __init__(self, hub):
             self.hub = hub
 
         async def __aenter__(self):
-            while self.hub._busy:
-                await asyncio.sleep(0.1)
-            self.hub._busy = True
+            await self.hub._busy_lock.acquire()
             return self
 
         async def __aexit__(self, exc_type, exc_val, exc_tb):
-            self.hub._busy = False
+            self.hub._busy_lock.release()
 
 
     @property
@@ -86,19 +122,25 @@ class Hub:
         return self._id
 
     @callback
-    def async_add_hub_entity(self, update_callback):
-        """Listen for data updates."""
+    def async_add_hub_entity(self, update_callback, keys=None):
+        """Listen for changes of the given keys, or for every data update without keys.
+
+        The first key holds the entity state. If it has a deadband, changes of
+        the other (attribute) keys wait until the state itself is reported.
+        """
         # This is the first entity, set up interval.
         if not self._entities:
             self._unsub_interval_method = async_track_time_interval(
                 self._hass, self.async_update_data, self._scan_interval
             )
-        self._entities.append(update_callback)
+        self._entities[update_callback] = (keys[0], frozenset(keys)) if keys else None
+        self._update_watched_keys()
 
     @callback
     def async_remove_hub_entity(self, update_callback):
         """Remove data update."""
-        self._entities.remove(update_callback)
+        self._entities.pop(update_callback, None)
+        self._update_watched_keys()
 
         if not self._entities:
             """stop the interval timer upon removal of last entity"""
@@ -107,13 +149,77 @@ class Hub:
             asyncio.create_task(self.close())
 
     async def init_data(self, close = False):
+        """Read the device topology, or take it from the warm-start snapshot; the stored log is loaded in the background afterwards."""
+        start = time.monotonic()
+        snapshot = None
         async with self.BusyLock(self):
             await self._hass.async_add_executor_job(self.check_pymodbus_version)
-            await self._hass.async_add_executor_job(self._bydclient.update_log_from_file)
-            await self._bydclient.init_data(close = close)
+            self._time_startup_phase('pymodbus_check', start)
+            if not close:
+                phase = time.monotonic()
+                snapshot = await self._hass.async_add_executor_job(self._bydclient.load_snapshot)
+                if snapshot is not None:
+                    self._bydclient.apply_snapshot(snapshot)
+                self._time_startup_phase('snapshot', phase)
+            if snapshot is None:
+                phase = time.monotonic()
+                await self._bydclient.init_data(close = close)
+                self._time_startup_phase('device_info', phase)
             # Start connection health monitoring
             self._bydclient.health_monitor.start_monitoring()
             self.update_entities()
+        self._time_startup_phase('ready', start)
+
+        if not close:
+            if snapshot is not None:
+                self._validate_task = self._hass.async_create_background_task(
+                    self._async_validate_snapshot(snapshot), f'{DOMAIN} {self._id} snapshot validation'
+                )
+            self._log_load_task = self._hass.async_create_background_task(
+                self._async_load_log(start), f'{DOMAIN} {self._id} log load'
+            )
+
+    async def _async_validate_snapshot(self, snapshot: dict):
+        """Read the info blocks after a warm start and reload the entry if the device changed."""
+        phase = time.monotonic()
+        while True:
+            try:
+                if await self._bydclient.init_data():
+                    break
+                _LOGGER.warning("Validating device snapshot failed, the device did not answer, retrying")
+            except Exception as e:
+                _LOGGER.warning(f"Validating device snapshot failed, retrying: {e}")
+            await asyncio.sleep(60)
+        self._time_startup_phase('device_info', phase)
+        topology = self._bydclient.get_topology()
+        if topology == snapshot['topology']:
+            _LOGGER.debug(f"device snapshot of {topology['serial']} validated")
+            return
+        _LOGGER.warning(f"Device changed since the last snapshot ({snapshot['topology']} -> {topology}), reloading")
+        await self._hass.async_add_executor_job(self._bydclient.save_snapshot, self._bydclient.get_snapshot())
+        if self._entry_id is not None:
+            self._hass.config_entries.async_schedule_reload(self._entry_id)
+
+    def _time_startup_phase(self, phase: str, start: float):
+        self.startup_timings[phase] = round(time.monotonic() - start, 3)
+
+    async def _async_load_log(self, start: float):
+        """Load the stored log and balancing totals, then resume an interrupted history download."""
+        phase = time.monotonic()
+        try:
+            await self._hass.async_add_executor_job(self._bydclient.update_log_from_file)
+        finally:
+            # log scans wait for the stored log so known entries are not added again
+            self._log_loaded.set()
+        self._time_startup_phase('log_load', phase)
+        self._time_startup_phase('total', start)
+        _LOGGER.debug(f"startup phases {self.startup_timings}")
+        self.update_entities()
+
+        job = await self._hass.async_add_executor_job(self._bydclient.load_log_history_checkpoint)
+        if job is not None:
+            _LOGGER.info(f"Resuming {DEVICE_TYPES.get(job.get('unit_id'))} log history download at page {job.get('done')}/{job.get('pages')}")
+            self._start_log_history_job(job)
 
     def check_pymodbus_version(self):
         try:
@@ -145,26 +251,8 @@ class Hub:
             return
 
         async with self.BusyLock(self):
-            # update log history
-            unit_id = self._update_log_history_depth[0]
-            log_depth = self._update_log_history_depth[1]
-            if self._update_log_history_depth[1] > 0:
-                prev_len_log = len(self._bydclient.log)
-                _LOGGER.warning(f"Started loading {DEVICE_TYPES[unit_id]} log history; all other data updates will be suspended!")
-                try:
-                    await self._bydclient.update_log_data(unit_id, log_depth=log_depth)
-                    self._last_log_update = datetime.now()
-                    self._last_update = datetime.now()
-                except Exception as e:
-                    _LOGGER.error(f'Failed updating {DEVICE_TYPES[unit_id]} log history {self._update_log_history_depth} {e}', exc_info=True)
-                    return False
-                self._update_log_history_depth[1] = 0
-                if prev_len_log != len(self._bydclient.log):
-                    result : bool = await self._hass.async_add_executor_job(self._bydclient.save_log_entries)
-                return True
-
-            # update last log data
-            if ((datetime.now()-self._last_log_update) > self._scan_interval_log):
+            # update last log data; deferred while a history download pages through the same handshake
+            if ((datetime.now()-self._last_log_update) > self._scan_interval_log) and self._log_loaded.is_set() and not self.log_history_running:
                 #_LOGGER.debug(f"start update log data")
                 prev_len_log = len(self._bydclient.log)
                 result = await self._bydclient.update_all_log_data()
@@ -185,13 +273,27 @@ class Hub:
                 result = await self._bydclient.update_all_bms_status_data()
                 if result:
                     self._last_full_update = datetime.now()
+                    self._last_bms_summary_update = datetime.now()
                     self._last_update = datetime.now()
                     self.update_entities()
+                    await self._hass.async_add_executor_job(self._bydclient.save_snapshot, self._bydclient.get_snapshot())
                     _LOGGER.debug("updated BMS status")
                 else:
                     _LOGGER.error("update BMS status data failed")
                     await asyncio.sleep(5)
 
+            # update bms summary (head block only) between the full readouts
+            elif self._scan_interval_bms_summary and ((datetime.now()-self._last_bms_summary_update) > self._scan_interval_bms_summary):
+                result = await self._bydclient.update_all_bms_status_data(full=False)
+                if result:
+                    self._last_bms_summary_update = datetime.now()
+                    self._last_update = datetime.now()
+                    self.update_entities()
+                    _LOGGER.debug("updated BMS summary")
+                else:
+                    _LOGGER.error("update BMS summary data failed")
+                    await asyncio.sleep(5)
+
             # update bmu
             try:
                 #_LOGGER.debug(f"start update BMU status")
@@ -209,14 +311,128 @@ class Hub:
 
             return True
 
+    def get_diagnostics(self) -> dict:
+        """Runtime statistics for the diagnostics download."""
+        return {
+            'connection': self._bydclient.get_connection_metrics(),
+            'connection_health': self._bydclient.health_monitor.get_stats(),
+            'scheduler': self._bydclient.scheduler.get_stats(),
+            'response_wait': self._bydclient.response_wait.get_stats(),
+            'log_history': self._bydclient.data.get('log_history'),
+            'log_cache': self._bydclient.log_cache.get_stats(),
+            'log_tail': self._bydclient.log_tail.get_stats(),
+            'log_store': self._bydclient.log_store.get_stats(),
+            'log_index': self._bydclient.log.get_stats(),
+            'startup': self.startup_timings,
+            'entities': {'subscribed': len(self._entities), 'watched_keys': len(self._watched_keys), **self.entity_stats},
+            'cells': self.get_cell_details(),
+            'log': self._bydclient.data.get('log'),
+        }
+
+    def get_cell_details(self) -> dict:
+        """Per-cell values of every BMS, these attributes are not recorded."""
+        data = self._bydclient.data
+        details = {}
+        for bms_id in range(1, self._bydclient._bms_qty + 1):
+            details[f'bms{bms_id}'] = {
+                suffix: materialize(data.get(f'bms{bms_id}_{suffix}'))
+                for suffix in ('cell_voltages', 'cell_voltages_max_history', 'cell_voltages_min_history', 'cell_temps', 'cell_balancing', 'b_cells_total')
+            }
+        return details
+
+    def _set_deadbands(self, options: dict):
+        """Absolute deadbands per BMU key and per BMS key suffix from the entry options."""
+        self._deadbands_bmu = {}
+        self._deadbands_bms = {}
+        for option, (bmu_keys, bms_keys, default) in DEADBAND_TYPES.items():
+            band = options.get(option, default)
+            self._deadbands_bmu.update(dict.fromkeys(bmu_keys, band))
+            self._deadbands_bms.update(dict.fromkeys(bms_keys, band))
+        self._deadband_relative = options.get(CONF_DEADBAND_RELATIVE, DEFAULT_DEADBAND_RELATIVE) / 100
+        self._deadband_heartbeat = options.get(CONF_DEADBAND_HEARTBEAT, DEFAULT_DEADBAND_HEARTBEAT)
+
+    def _deadband(self, k: str) -> float | None:
+        """Absolute deadband of a key, None for keys that are not one of the DEADBAND_TYPES sensors."""
+        if k.startswith('bms') and k[4:5] == '_':
+            return self._deadbands_bms.get(k[5:])
+        return self._deadbands_bmu.get(k)
+
+    def _has_deadband(self, k: str) -> bool:
+        band = self._deadband(k)
+        return band is not None and bool(band or self._deadband_relative)
+
+    def _within_deadband(self, k: str, value, now: float) -> bool:
+        """True if a numeric change stays below every enabled deadband of the key and no heartbeat is due."""
+        band = self._deadband(k)
+        if band is None:
+            # counters, SOC and the other keys report every change
+            return False
+        relative = self._deadband_relative
+        if not band and not relative:
+            return False
+        previous = self._entity_values.get(k)
+        if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+            return False
+        if now - self._entity_notified_at.get(k, 0) >= self._deadband_heartbeat:
+            return False
+        delta = abs(value - previous)
+        return not (band and delta >= band) and not (relative and delta >= abs(previous) * relative)
+
+    def _update_watched_keys(self):
+        self._watched_keys = set().union(*(entity[1] for entity in self._entities.values() if entity is not None))
+
+    def _changed_keys(self) -> set:
+        """Watched keys whose value differs from the last notification."""
+        data = self._bydclient.data
+        metrics = None
+        changed = set()
+        now = time.monotonic()
+        for k in self._watched_keys:
+            if k.startswith(CONNECTION_KEY_PREFIX):
+                if metrics is None:
+                    metrics = self._bydclient.get_connection_metrics()
+                value = metrics.get(k[len(CONNECTION_KEY_PREFIX):])
+            else:
+                value = data.get(k)
+            if k not in self._entity_values or self._entity_values[k] != value:
+                if self._within_deadband(k, value, now):
+                    self.entity_stats['deadband'] += 1
+                    continue
+                self._entity_values[k] = value
+                self._entity_notified_at[k] = now
+                changed.add(k)
+        return changed
+
     def update_entities(self):
-        for update_callback in self._entities:
-            update_callback()
+        """Write the state of the entities whose watched keys changed."""
+        changed = self._changed_keys()
+        stats = self.entity_stats
+        stats['updates'] += 1
+        for update_callback, entity in list(self._entities.items()):
+            if entity is None:
+                notify = True
+            elif self._has_deadband(entity[0]):
+                notify = entity[0] in changed
+            else:
+                notify = not entity[1].isdisjoint(changed)
+            if notify:
+                stats['writes'] += 1
+                update_callback()
+            else:
+                stats['skipped'] += 1
 
     async def close(self):
         """Disconnect client."""
+        for task in (self._log_load_task, self._validate_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self.log_history_running:
+            # checkpoint is kept, the download resumes on next start
+            self._log_history_task.cancel()
         await self._bydclient.health_monitor.stop_monitoring()
+        await self._hass.async_add_executor_job(self._bydclient.save_snapshot, self._bydclient.get_snapshot())
         self._bydclient.close()
+        await self._hass.async_add_executor_job(self._bydclient.log_store.close)
         _LOGGER.debug("close hub")
 
     async def test_connection(self) -> bool:
@@ -228,9 +444,103 @@ class Hub:
             _LOGGER.exception("Error connecting to the device")
             return False
 
+    @property
+    def log_history_running(self) -> bool:
+        return self._log_history_task is not None and not self._log_history_task.done()
+
     def start_update_log_history(self, unit_id, log_depth):
-         _LOGGER.info(f"Scheduled {DEVICE_TYPES[unit_id]} log update for up to {log_depth*20} log entries.")
-         self._update_log_history_depth = [unit_id, log_depth]
+        if self.log_history_running:
+            _LOGGER.warning(f"{DEVICE_TYPES[self._log_history_job['unit_id']]} log history download still running, ignoring request for {DEVICE_TYPES[unit_id]}.")
+            return
+        _LOGGER.info(f"Scheduled {DEVICE_TYPES[unit_id]} log update for up to {log_depth*20} log entries.")
+        self._start_log_history_job({'unit_id': unit_id, 'pages': log_depth, 'done': 0, 'entries': 0})
+
+    def _start_log_history_job(self, job: dict):
+        self._log_history_job = job
+        self._update_log_history_progress('running')
+        self._log_history_task = self._hass.async_create_background_task(
+            self._async_run_log_history(job), f'{DOMAIN} {self._id} log history'
+        )
+
+    def _update_log_history_progress(self, state: str):
+        job = self._log_history_job
+        skipped = job.get('skipped', 0)
+        self._bydclient.data['log_history_progress'] = round((job['done'] + skipped) / job['pages'] * 100) if job['pages'] else 100
+        self._bydclient.data['log_history'] = {
+            'unit': DEVICE_TYPES[job['unit_id']],
+            'state': state,
+            'pages': job['pages'],
+            'done': job['done'],
+            'skipped': skipped,
+            'entries': job['entries'],
+        }
+
+    async def _async_run_log_history(self, job: dict):
+        """Download log history page by page in the background.
+
+        Each page holds the Modbus link only for its own handshake, so BMU polls
+        interleave between pages. The device can only page sequentially from the
+        newest entry, so a resumed job replays the pages done before the restart.
+        Once the pages reach the range a previous download already stored, the
+        remaining pages are skipped.
+        """
+        await self._log_loaded.wait()
+        await self._hass.async_add_executor_job(self._bydclient.load_log_history_coverage)
+        unit_id = job['unit_id']
+        resume_at = job['done']
+        job['done'] = 0
+        job['skipped'] = 0
+        job['entries'] = 0
+        known_pages = new_pages = 0
+        failures = 0
+        state = 'finished'
+        prev_len_log = len(self._bydclient.log)
+        while job['done'] < job['pages']:
+            try:
+                result = await self._bydclient.update_log_history_page(unit_id)
+            except Exception as e:
+                _LOGGER.error(f'Failed updating {DEVICE_TYPES[unit_id]} log history page {job["done"]} {e}', exc_info=True)
+                result = None
+            if result is None:
+                failures += 1
+                if failures >= 3:
+                    state = 'failed'
+                    break
+                await asyncio.sleep(5)
+                continue
+            failures = 0
+            new, added = result
+            job['done'] += 1
+            job['entries'] += new
+            known_pages, new_pages = (known_pages + 1, new_pages) if added == 0 else (0, new_pages + 1)
+            if new == 20 and self._bydclient.log_history_stored(unit_id, job['pages'], known_pages, new_pages):
+                job['skipped'] = job['pages'] - job['done']
+            self._update_log_history_progress('running')
+            self.update_entities()
+            if job['done'] > resume_at:
+                if job['done'] % 10 == 0 and prev_len_log != len(self._bydclient.log):
+                    await self._hass.async_add_executor_job(self._bydclient.save_log_entries)
+                    prev_len_log = len(self._bydclient.log)
+                await self._hass.async_add_executor_job(self._bydclient.save_log_history_checkpoint, dict(job))
+            if new < 20 or job['skipped']:
+                break
+
+        if prev_len_log != len(self._bydclient.log):
+            await self._hass.async_add_executor_job(self._bydclient.save_log_entries)
+        self._bydclient.data['log'] = self._bydclient.get_log_list(20)
+        self._bydclient.data['log_entries'] = self._bydclient.get_log_entry_count()
+        if state == 'finished':
+            await self._hass.async_add_executor_job(self._bydclient.remove_log_history_checkpoint)
+            await self._hass.async_add_executor_job(self._bydclient.save_log_history_coverage, unit_id, job['pages'])
+            _LOGGER.info(f"Finished loading {DEVICE_TYPES[unit_id]} log history; read {job['entries']} log entries in {job['done']} pages, skipped {job['skipped']} pages already stored.")
+        else:
+            _LOGGER.error(f"Stopped loading {DEVICE_TYPES[unit_id]} log history after {job['done']}/{job['pages']} pages; will resume on next start.")
+        self._update_log_history_progress(state)
+        self.update_entities()
+
+    async def async_export_log_files(self):
+        await self._hass.async_add_executor_job(self._bydclient.export_log_files)
+        _LOGGER.info(f"Exported {self._bydclient.get_log_entry_count()} log entries to CSV and text files.")
 
     def reset_history_cell_voltage(self, unit_id:int):
          """Reset stored per-cell min/max history for one BMS or all (unit_id=0)."""
@@ -239,16 +549,5 @@ class Hub:
          else:
              ids = [unit_id]
          for bms_id in ids:
-             for suffix in [
-                 '_max_history_cell_voltage',
-                 '_max_history_cell_voltage_cells',
-                 '_min_history_cell_voltage',
-                 '_min_history_cell_voltage_cells',
-             ]:
-                 key = f'bms{bms_id}{suffix}'
-                 if key in self._bydclient.data:
-                     try:
-                         del self._bydclient.data[key]
-                     except Exception:
-                         self._bydclient.data[key] = None
+             self._bydclient.reset_cell_history(bms_id)
          self.update_entities()
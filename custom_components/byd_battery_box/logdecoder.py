@@ -0,0 +1,324 @@
+"""Table driven decoder for BYD Battery Box log records.
+
+Every log record carries 23 payload bytes whose layout depends on the unit
+type (BMU or BMS) and the log code. LOG_DECODERS maps (unit type, code) to a
+precompiled struct layout and a handler that turns the unpacked tuple into
+datapoints, so decoding a record is one dict lookup, one unpack_from and a
+few assignments.
+"""
+
+import logging
+import struct
+from datetime import datetime
+
+from .bydbox_const import (
+    BMS_ERRORS,
+    BMS_POWER_OFF,
+    BMS_STATUS_OFF,
+    BMS_STATUS_ON,
+    BMS_WARNINGS,
+    BMS_WARNINGS3,
+    BMU_CALIBRATION,
+    BMU_LOG_ERRORS,
+    BMU_LOG_WARNINGS,
+    BMU_STATUS,
+    DATA_POINTS,
+    INVERTER_LIST,
+    MODULE_TYPE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+LOG_UNIT_BMU = 0
+LOG_UNIT_BMS = 1
+LOG_DATA_BYTES = 23
+LOG_CODE_BALANCING = 17
+BALANCING_FLAG_BYTES = 20
+BALANCING_CELLS = BALANCING_FLAG_BYTES * 8
+
+# set bit positions per byte value, least significant first
+_BYTE_SET_BITS = tuple(tuple(bit for bit in range(8) if v >> bit & 1) for v in range(256))
+_CELL_IDS = tuple(str(i) for i in range(LOG_DATA_BYTES * 8))
+_PADDING = bytes(LOG_DATA_BYTES)
+
+
+def _bit_names(names) -> tuple:
+    """Per byte value lookup of the names of its set bits, for the low and the high byte of a 16 bit mask."""
+    def name(bit):
+        v = names.get(bit)
+        return f'bit {bit} undefined' if v is None else v
+    low = tuple(tuple(name(bit) for bit in bits) for bits in _BYTE_SET_BITS)
+    high = tuple(tuple(name(bit + 8) for bit in bits) for bits in _BYTE_SET_BITS)
+    return low, high
+
+
+def _bits(bitmask, tables) -> list:
+    """Names of the set bits of a 16 bit mask, same output as bitmask_to_strings."""
+    low, high = tables
+    return list(low[bitmask & 0xFF] + high[bitmask >> 8 & 0xFF])
+
+
+_BMU_LOG_WARNINGS = _bit_names(BMU_LOG_WARNINGS)
+_BMS_WARNINGS = _bit_names(BMS_WARNINGS)
+_BMS_WARNINGS3 = _bit_names(BMS_WARNINGS3)
+_BMS_ERRORS = _bit_names(BMS_ERRORS)
+_BMS_STATUS_OFF = _bit_names(BMS_STATUS_OFF)
+_BMS_STATUS_ON = _bit_names(BMS_STATUS_ON)
+
+
+def _lookup(d, k, default) -> str:
+    v = d.get(k)
+    return f'{default}' if v is None else v
+
+
+def _area(v, b=1):
+    return 'A' if v == 0 else 'B' if v == b else v
+
+
+# ---------------------------------------------------------------------- BMU
+
+def _bmu_boot(v) -> dict:
+    return {'bootl': v[0], 'exec': _area(v[1]), 'firmware_v': f'{v[2]:d}.{v[3]:d}'}
+
+
+def _bmu_switchoff(v) -> dict:
+    s = v[0]
+    return {'switchoff': '0' if s == 0 else 'LED button' if s == 1 else s}
+
+
+def _bmu_event(v) -> dict:
+    flag, error_code, warnings, c_max_v, c_min_v, bat_max_t, bat_min_t, bat_v, soc, soh = v
+    if flag == 0:
+        event = 'Error/Warning cleared'
+    elif error_code != 23:
+        event = f'Error; {_lookup(BMU_LOG_ERRORS, error_code, "Undefined").lower()}'
+    else:
+        event = f"Warning; {(','.join(_bits(warnings, _BMU_LOG_WARNINGS))[:255] or 'NA').lower()}"
+    return {'event': event, 'c_max_v': c_max_v, 'c_min_v': c_min_v, 'bat_max_t': bat_max_t, 'bat_min_t': bat_min_t,
+            'bat_v': round(bat_v * 0.1, 1), 'soc': soc, 'soh': soh}
+
+
+def _bmu_status(v) -> dict:
+    return {'p_status': _lookup(BMU_STATUS, v[1], 'NA'), 'n_status': _lookup(BMU_STATUS, v[0], 'Undefined')}
+
+
+def _bmu_firmware_mcu(v) -> dict:
+    return {'firmware_v': f'{v[0]:d}.{v[1]:d}', 'mcu': v[2]}
+
+
+def _bmu_running(v) -> dict:
+    return {
+        'rtime': v[0], 'bmu_qty_c': v[1], 'bmu_qty_t': v[2], 'c_max_v': v[3], 'c_min_v': v[4],
+        'c_max_t': v[5], 'c_min_t': v[6], 'out_a': round(v[7] * 0.1, 1), 'out_v': round(v[8] * 0.1, 1),
+        'acc_v': round(v[9] * 0.1, 1), 'bms_addr': v[10], 'm_type': _lookup(MODULE_TYPE, v[11], 'Undefined'), 'm_qty': v[12],
+    }
+
+
+def _bmu_limits(v) -> dict:
+    return {
+        'max_charge_a': round(v[0] * 0.1, 1), 'max_discharge_a': round(v[1] * 0.1, 1),
+        'max_charge_v': round(v[2] * 0.1, 1), 'max_discharge_v': round(v[3] * 0.1, 1),
+        'status': [_lookup(BMU_STATUS, v[4], 'Undefined')], 'bat_t': v[5], 'inverter': INVERTER_LIST[v[6]], 'bms_qty': v[7],
+    }
+
+
+def _bmu_firmware3(v) -> dict:
+    d = {'firmware_n1': v[0], 'firmware_v1': f'{v[1]:d}.{v[2]:d}', 'firmware_n2': v[3], 'firmware_v2': f'{v[4]:d}.{v[5]:d}'}
+    if v[6] != 0xFF:
+        d['firmware_n3'] = v[6]
+        d['firmware_v3'] = f'{v[7]:d}.{v[8]:d}'
+    return d
+
+
+def _bmu_soc(v) -> dict:
+    return {'status': f'{v[0]}', 'out_v': round(v[1] * 0.1, 1), 'bat_v': round(v[2] * 0.1, 1),
+            'soc_a': round(v[3] * 0.1, 1), 'soc_b': round(v[4] * 0.1, 1)}
+
+
+def _bmu_bms_update(v) -> dict:
+    return {'bms_updt': 'A' if v[0] == 0 else 'B', 'firmware_v': f'{v[1]:d}.{v[2]:d}'}
+
+
+def _bmu_firmware2(v) -> dict:
+    return {'firmware_n1': v[0], 'firmware_v1': f'{v[1]:d}.{v[2]:d}', 'firmware_n2': v[3], 'firmware_v2': f'{v[4]:d}.{v[5]:d}'}
+
+
+def _bmu_param_table(v) -> dict:
+    return {'pt_v': f'{v[0]:d}.{v[1]:d}'}
+
+
+def _bmu_calibration(v) -> dict:
+    return {'dt_cal': _lookup(BMU_CALIBRATION, v[0], 'Undefined')}
+
+
+def _bmu_environment(v) -> dict:
+    status = _lookup(BMU_STATUS, v[0], 'Undefined')
+    d = {'status': [status]}
+    if status != 'Undefined':
+        d.update({
+            'env_min_t': v[1], 'env_max_t': v[2], 'soc': v[3], 'soh': v[4], 'bat_t': v[5], 'bat_v': round(v[6] * 0.1, 1),
+            'c_max_v': v[7], 'c_min_v': v[8], 'bat_max_t': v[9], 'bat_min_t': v[10],
+        })
+    return d
+
+
+# ---------------------------------------------------------------------- BMS
+
+def _bms_boot(v) -> dict:
+    return {'bootl': v[0], 'exec': _area(v[1], 2), 'firmware_v': f'{v[2]:d}.{v[3]:d}'}
+
+
+def _bms_power_off(v) -> dict:
+    return {'power_off': _lookup(BMS_POWER_OFF, v[0], 'NA'), 'section': _area(v[1]), 'firmware_v': f'{v[2]:d}.{v[3]:d}'}
+
+
+def _bms_status_record(code):
+    def handler(v) -> dict:
+        status = v[4]
+        d = {
+            'warnings': _bits(v[0], _BMS_WARNINGS) + _bits(v[1], _BMS_WARNINGS) + _bits(v[2], _BMS_WARNINGS3),
+            'errors': _bits(v[3], _BMS_ERRORS),
+            'status': _bits(status, _BMS_STATUS_OFF if status % 2 == 1 else _BMS_STATUS_ON),
+        }
+        if code == 9:
+            d['bat_idle'] = v[5]
+            d['target_soc'] = v[6]
+        elif code == 20:
+            d['bmu_serial_v1'] = v[5]
+            d['bmu_serial_v2'] = v[6]
+        else:
+            d['soc'] = v[5]
+            d['soh'] = v[6]
+            d['bat_v'] = round(v[7] * 0.1, 1)
+            d['out_v'] = round(v[8] * 0.1, 1)
+            d['out_a'] = round(v[9] * 0.1, 1)
+        b17, b18, b19, b20, b21, b22 = v[10:]
+        if code == 21:
+            d['c_max_v_n'] = b17
+            d['c_min_v_n'] = b18
+            d['c_max_t_n'] = b20
+            d['c_min_t_n'] = b21
+        else:
+            d['c_max_v'] = b18 << 8 | b17
+            d['c_min_v'] = b20 << 8 | b19
+            d['c_max_t'] = b21
+            d['c_min_t'] = b22
+        return d
+    return handler
+
+
+def balancing_cells(flags) -> list:
+    """Cell indexes set in the balancing bitfield (first 20 bytes) of a BMS code 17 record."""
+    return [j * 8 + bit for j, b in enumerate(flags[:BALANCING_FLAG_BYTES]) if b for bit in _BYTE_SET_BITS[b]]
+
+
+def _bms_balancing(v) -> dict:
+    return {'b_cells': [_CELL_IDS[i] for i in balancing_cells(v[0])], 'c_min_v': v[1]}
+
+
+def _bms_balancing_end(v) -> dict:
+    return {'c_min_v': v[0]}
+
+
+def _bms_firmware(v) -> dict:
+    return {'area': 'A' if v[0] == 0 else 'B', 'firmware_p': f'{v[2]:d}.{v[1]:d}', 'firmware_n': f'{v[4]:d}.{v[3]:d}'}
+
+
+def _bms_param_table(v) -> dict:
+    return {'pt_v': f'{v[0]:d}.{v[1]:d}'}
+
+
+def _bms_sn_change(v) -> dict:
+    return {'sn_change': 1}
+
+
+def _bms_time(v) -> dict:
+    try:
+        return {'nt': datetime(year=v[0]+2000, month=v[1], day=v[2], hour=v[3], minute=v[4], second=v[5])}
+    except Exception as e:
+        _LOGGER.error(f'Failed to convert to datetime {v[0]} {v[1]} {v[2]} {v[3]} {v[4]} {v[5]} {e}')
+    return {}
+
+
+_BMS_STATUS_LAYOUT = '<4H3BHHh6B'  # warnings 1-3, errors, status, soc/idle, soh/target, bat_v, out_v, out_a, bytes 17-22
+
+_LAYOUTS = {
+    (LOG_UNIT_BMU, 0): ('>4B', _bmu_boot),
+    (LOG_UNIT_BMU, 1): ('>B', _bmu_switchoff),
+    (LOG_UNIT_BMU, 2): ('>BBHHHBBHBB', _bmu_event),
+    (LOG_UNIT_BMU, 32): ('>BB', _bmu_status),
+    (LOG_UNIT_BMU, 34): ('>xBBxB', _bmu_firmware_mcu),
+    (LOG_UNIT_BMU, 35): ('>xBBxB', _bmu_firmware_mcu),
+    (LOG_UNIT_BMU, 36): ('>IBBHHBBhHHBBB', _bmu_running),
+    (LOG_UNIT_BMU, 38): ('>hhhhBBBB', _bmu_limits),
+    (LOG_UNIT_BMU, 40): ('>9B', _bmu_firmware3),
+    (LOG_UNIT_BMU, 45): ('>B3xHH2xHH', _bmu_soc),
+    (LOG_UNIT_BMU, 101): ('>3B', _bmu_bms_update),
+    (LOG_UNIT_BMU, 102): ('>3B', _bmu_bms_update),
+    (LOG_UNIT_BMU, 103): ('>6B', _bmu_firmware2),
+    (LOG_UNIT_BMU, 105): ('>xBB', _bmu_param_table),
+    (LOG_UNIT_BMU, 111): ('>B', _bmu_calibration),
+    (LOG_UNIT_BMU, 118): ('>6BHHHxBxB', _bmu_environment),
+
+    (LOG_UNIT_BMS, 0): ('>BBxBB', _bms_boot),
+    (LOG_UNIT_BMS, 1): ('>xBBBB', _bms_power_off),
+    (LOG_UNIT_BMS, LOG_CODE_BALANCING): ('<20sxH', _bms_balancing),
+    (LOG_UNIT_BMS, 18): ('<21xH', _bms_balancing_end),
+    (LOG_UNIT_BMS, 101): ('>5B', _bms_firmware),
+    (LOG_UNIT_BMS, 102): ('>5B', _bms_firmware),
+    (LOG_UNIT_BMS, 105): ('<HH', _bms_param_table),
+    (LOG_UNIT_BMS, 106): ('>x', _bms_sn_change),
+    (LOG_UNIT_BMS, 111): ('>6B', _bms_time),
+}
+for _code in (2, 3, 4, 5, 6, 7, 9, 10, 11, 13, 14, 16, 19, 20, 21):
+    _LAYOUTS[(LOG_UNIT_BMS, _code)] = (_BMS_STATUS_LAYOUT, _bms_status_record(_code))
+
+# (unit type, code) -> (bound unpack_from, handler), compiled once at import
+LOG_DECODERS = {key: (struct.Struct(fmt).unpack_from, handler) for key, (fmt, handler) in _LAYOUTS.items()}
+
+
+def log_unit_type(unit_id: int) -> int:
+    return LOG_UNIT_BMU if unit_id == 0 else LOG_UNIT_BMS
+
+
+def decode_log_record(unit_type: int, code: int, data) -> dict:
+    """Datapoints of one log record, an empty dict for codes without known layout."""
+    decoder = LOG_DECODERS.get((unit_type, code))
+    if decoder is None:
+        return {}
+    unpack_from, handler = decoder
+    if len(data) < LOG_DATA_BYTES:
+        data = bytes(data) + _PADDING[len(data):]
+    return handler(unpack_from(data))
+
+
+def _compile_formatter(config):
+    label = config['label']
+    t = config.get('type')
+    if t in ('nlist', 'slist'):
+        prefix = f'{label}: '
+        sep = ', ' if t == 'slist' else ','
+        return lambda v: prefix + sep.join(v) if len(v) > 0 else prefix + '-'
+    if t == 's':
+        before, marker, after = label.partition('{v}')
+        if not marker:
+            return lambda v: label
+        return lambda v: f'{before}{v}{after}'
+    prefix = f'{label}: '
+    suffix = f" {config['unit']}" if len(config.get('unit')) > 0 else ''
+    return lambda v: f'{prefix}{v}{suffix}'
+
+
+# datapoint -> formatter producing its part of the log detail string
+LOG_FORMATTERS = {dp: _compile_formatter(config) for dp, config in DATA_POINTS.items()}
+
+
+def log_record_to_str(datapoints: dict) -> str:
+    strings = []
+    for dp, v in datapoints.items():
+        formatter = LOG_FORMATTERS.get(dp)
+        if formatter is not None:
+            strings.append(formatter(v))
+        else:
+            _LOGGER.error(f'Datapoint {dp} not defined')
+    return f"{'. '.join(strings)}."
@@ -0,0 +1,157 @@
+"""Time-ordered in-memory index of BYD Battery Box log entries."""
+
+from array import array
+from bisect import bisect_left
+from itertools import pairwise
+
+# JSON Lines overhead of an entry besides its key and hex payload, see LogJournal
+_ENTRY_OVERHEAD = len('{"k":"","ts":1737969688.0,"u":0,"c":17,"data":""}\n')
+
+
+def entry_size(k: str, entry: dict) -> int:
+    """Approximate stored size of an entry in bytes."""
+    return _ENTRY_OVERHEAD + len(k) + len(entry['data'])
+
+
+class LogIndex:
+    """Log entries by key, kept in key (time) order.
+
+    The keys sit in a sorted list with parallel arrays of timestamps and entry
+    sizes, so the newest entries are a tail slice and retention by age, count
+    or size trims a prefix found by bisect instead of scanning and sorting
+    the whole log. Reads behave like the plain dict used before.
+
+    Keys are local wall-clock strings, so their timestamps are not monotonic
+    across a DST fall-back or a device clock reset. The index notes when an
+    entry breaks the order and retention by age then scans the timestamps.
+    """
+
+    def __init__(self, log: dict | None = None) -> None:
+        self._entries = {}
+        self._keys = []
+        self._ts = array('d')
+        self._sizes = array('I')
+        self.bytes = 0
+        self._ts_ordered = True  # timestamps rise in key order
+        if log:
+            for k in sorted(log):
+                self._append(k, log[k])
+
+    def _append(self, k: str, entry: dict) -> None:
+        size = entry_size(k, entry)
+        if self._ts and entry['ts'] < self._ts[-1]:
+            self._ts_ordered = False
+        self._entries[k] = entry
+        self._keys.append(k)
+        self._ts.append(entry['ts'])
+        self._sizes.append(size)
+        self.bytes += size
+
+    def __setitem__(self, k: str, entry: dict) -> None:
+        if k in self._entries:
+            i = bisect_left(self._keys, k)
+            size = entry_size(k, entry)
+            self.bytes += size - self._sizes[i]
+            self._entries[k] = entry
+            self._ts[i] = entry['ts']
+            self._sizes[i] = size
+            self._check_order(i)
+            return
+        if not self._keys or k > self._keys[-1]:
+            # new entries arrive in order, history downloads insert older ones
+            self._append(k, entry)
+            return
+        i = bisect_left(self._keys, k)
+        size = entry_size(k, entry)
+        self._entries[k] = entry
+        self._keys.insert(i, k)
+        self._ts.insert(i, entry['ts'])
+        self._sizes.insert(i, size)
+        self.bytes += size
+        self._check_order(i)
+
+    def _check_order(self, i: int) -> None:
+        ts = self._ts[i]
+        if (i > 0 and self._ts[i - 1] > ts) or (i + 1 < len(self._ts) and ts > self._ts[i + 1]):
+            self._ts_ordered = False
+
+    def __getitem__(self, k: str) -> dict:
+        return self._entries[k]
+
+    def __contains__(self, k) -> bool:
+        return k in self._entries
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def get(self, k: str, default=None):
+        return self._entries.get(k, default)
+
+    def keys(self) -> list:
+        return list(self._keys)
+
+    def values(self) -> list:
+        return [self._entries[k] for k in self._keys]
+
+    def items(self) -> list:
+        """(key, entry) pairs in key order."""
+        return [(k, self._entries[k]) for k in self._keys]
+
+    def oldest_key(self) -> str | None:
+        return self._keys[0] if self._keys else None
+
+    def latest(self, n: int) -> list:
+        """Newest n (key, entry) pairs, newest first."""
+        if n <= 0:
+            return []
+        return [(k, self._entries[k]) for k in reversed(self._keys[-n:])]
+
+    def trim(self, cutoff: float | None = None, max_entries: int | None = None, max_bytes: int | None = None) -> list:
+        """Drop the entries older than cutoff and the oldest beyond max_entries or beyond max_bytes, return them in key order."""
+        expired = []
+        end = 0
+        if cutoff is not None:
+            if self._ts_ordered:
+                end = bisect_left(self._ts, cutoff)
+            else:
+                expired = self._drop_expired(cutoff)
+        if max_entries is not None:
+            end = max(end, len(self._keys) - max_entries)
+        if max_bytes is not None and self.bytes > max_bytes:
+            excess = self.bytes - max_bytes
+            freed = sum(self._sizes[:end])
+            while end < len(self._keys) and freed < excess:
+                freed += self._sizes[end]
+                end += 1
+        if end <= 0:
+            return expired
+        removed = [(k, self._entries.pop(k)) for k in self._keys[:end]]
+        del self._keys[:end]
+        del self._ts[:end]
+        self.bytes -= sum(self._sizes[:end])
+        del self._sizes[:end]
+        return expired + removed
+
+    def _drop_expired(self, cutoff: float) -> list:
+        """Drop the entries older than cutoff wherever they sit in key order."""
+        keep = [i for i, ts in enumerate(self._ts) if ts >= cutoff]
+        if len(keep) == len(self._keys):
+            return []
+        removed = [(k, self._entries.pop(k)) for k, ts in zip(self._keys, self._ts, strict=True) if ts < cutoff]
+        self._keys = [self._keys[i] for i in keep]
+        self._ts = array('d', (self._ts[i] for i in keep))
+        self._sizes = array('I', (self._sizes[i] for i in keep))
+        self.bytes = sum(self._sizes)
+        self._ts_ordered = all(a <= b for a, b in pairwise(self._ts))
+        return removed
+
+    def get_stats(self) -> dict:
+        return {
+            'entries': len(self._keys),
+            'bytes': self.bytes,
+            'oldest': self._keys[0] if self._keys else None,
+            'newest': self._keys[-1] if self._keys else None,
+        }
@@ -0,0 +1,489 @@
+"""Persistent storage of BYD Battery Box log entries."""
+
+import binascii
+import json
+import logging
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LogJournal:
+    """Append-only JSON Lines journal of log entries.
+
+    Each line holds one entry plus its key. New entries are appended, so a
+    save costs I/O proportional to the new entries only. Entries dropped by
+    retention stay in the file until compact() rewrites it from the live log,
+    which is done once the stale lines outgrow COMPACT_RATIO of the live ones.
+    """
+
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN_STALE = 500
+    memory_entries = None  # the whole log is kept in memory
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lines = 0  # lines in the journal file, live and stale
+        self.appended = 0
+        self.compactions = 0
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> dict:
+        log = {}
+        lines = 0
+        with open(self.path) as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    k = entry.pop('k')
+                except Exception:
+                    # torn last line after a crash, dropped on the next compaction
+                    _LOGGER.warning(f'Skipping invalid log journal line {lines}')
+                    continue
+                log[k] = entry
+        self.lines = lines
+        return log
+
+    def append(self, entries: dict) -> None:
+        if not entries:
+            return
+        with open(self.path, 'a') as f:
+            f.writelines(self._line(k, entry) for k, entry in entries.items())
+        self.lines += len(entries)
+        self.appended += len(entries)
+
+    def needs_compaction(self, live: int) -> bool:
+        stale = self.lines - live
+        return stale >= self.COMPACT_MIN_STALE and stale > live * self.COMPACT_RATIO
+
+    def compact(self, log: dict) -> None:
+        """Rewrite the journal with the live entries only."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.writelines(self._line(k, entry) for k, entry in sorted(log.items()))
+        os.replace(tmp_path, self.path)
+        self.lines = len(log)
+        self.compactions += 1
+
+    def import_entries(self, log: dict) -> None:
+        self.compact(log)
+
+    def close(self) -> None:
+        pass
+
+    def _line(self, k, entry) -> str:
+        return json.dumps({'k': k, **entry}, separators=(',', ':'), default=str) + '\n'
+
+    def get_stats(self) -> dict:
+        return {
+            'format': 'jsonl',
+            'lines': self.lines,
+            'appended': self.appended,
+            'compactions': self.compactions,
+        }
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS log (
+    k TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    u INTEGER NOT NULL,
+    c INTEGER NOT NULL,
+    data TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS log_ts ON log (ts);
+CREATE INDEX IF NOT EXISTS log_unit_ts ON log (u, ts);
+CREATE INDEX IF NOT EXISTS log_code ON log (c, u);
+"""
+
+
+class SqliteLogStore:
+    """Indexed SQLite archive of log entries.
+
+    Entries are rows keyed like the in-memory log and indexed on timestamp,
+    unit and code, so retention, newest-N and per-code counts are queries
+    instead of passes over the whole log. The client keeps only the newest
+    memory_entries in memory, the archive itself stays on disk. The database
+    runs in WAL mode and is used from executor jobs; a lock serialises access
+    to the shared connection.
+    """
+
+    memory_entries = 2000
+    record_bytes = 128  # approximate size of a row with its index entries
+    ITER_BATCH = 1000
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self.entries = 0
+        self.appended = 0
+        self.pruned = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(_SQLITE_SCHEMA)
+            self.entries = conn.execute('SELECT COUNT(*) FROM log').fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def _query(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> dict:
+        """Newest memory_entries entries in key order."""
+        return dict(reversed(self.latest(self.memory_entries)))
+
+    def append(self, entries: dict) -> None:
+        if not entries:
+            return
+        rows = [(k, entry['ts'], entry['u'], entry['c'], entry['data']) for k, entry in entries.items()]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                inserted = conn.executemany('INSERT OR IGNORE INTO log (k, ts, u, c, data) VALUES (?, ?, ?, ?, ?)', rows).rowcount
+        self.entries += inserted
+        self.appended += inserted
+
+    def import_entries(self, log: dict) -> None:
+        self.append(log)
+
+    def prune(self, cutoff: float) -> int:
+        """Delete entries older than the cutoff timestamp, return the number removed."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                removed = conn.execute('DELETE FROM log WHERE ts < ?', (cutoff,)).rowcount
+        self.entries -= removed
+        self.pruned += removed
+        return removed
+
+    def keep_cutoff(self, n: int) -> float | None:
+        """Timestamp of the n-th newest entry, None while the store holds fewer."""
+        rows = self._query('SELECT ts FROM log ORDER BY ts DESC LIMIT 1 OFFSET ?', (n - 1,))
+        return rows[0][0] if rows else None
+
+    def needs_compaction(self, live: int) -> bool:
+        return False
+
+    def count(self) -> int:
+        if self._conn is None:
+            self._query('SELECT 1')
+        return self.entries
+
+    def contains(self, k: str) -> bool:
+        return bool(self._query('SELECT 1 FROM log WHERE k = ?', (k,)))
+
+    def latest(self, n: int) -> list:
+        """Newest n (key, entry) pairs, newest first."""
+        rows = self._query('SELECT k, ts, u, c, data FROM log ORDER BY k DESC LIMIT ?', (n,))
+        return [(k, {'ts': ts, 'u': u, 'c': c, 'data': data}) for k, ts, u, c, data in rows]
+
+    def code_counts(self) -> dict:
+        """Number of entries per (unit, code)."""
+        return {(u, c): n for u, c, n in self._query('SELECT u, c, COUNT(*) FROM log GROUP BY c, u')}
+
+    def iter_entries(self, code: int | None = None, before: float | None = None):
+        """Yield (key, entry) in key order, read in batches so memory stays flat."""
+        where = 'k > ?'
+        params = []
+        if code is not None:
+            where += ' AND c = ?'
+            params.append(code)
+        if before is not None:
+            where += ' AND ts < ?'
+            params.append(before)
+        sql = f'SELECT k, ts, u, c, data FROM log WHERE {where} ORDER BY k LIMIT {self.ITER_BATCH}'
+        last = ''
+        while True:
+            rows = self._query(sql, (last, *params))
+            for k, ts, u, c, data in rows:
+                yield k, {'ts': ts, 'u': u, 'c': c, 'data': data}
+            if len(rows) < self.ITER_BATCH:
+                return
+            last = rows[-1][0]
+
+    def iter_payloads(self, code: int | None = None, before: float | None = None):
+        """Yield (unit, code, payload bytes) in key order."""
+        for _, entry in self.iter_entries(code, before):
+            yield entry['u'], entry['c'], bytes.fromhex(entry['data'])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_stats(self) -> dict:
+        return {
+            'format': 'sqlite',
+            'entries': self.entries,
+            'appended': self.appended,
+            'pruned': self.pruned,
+            'size': os.path.getsize(self.path) if self.exists() else 0,
+        }
+
+
+_RECORD = struct.Struct('<IBB23s3x')  # ts, unit, code, payload, pad to 32 bytes
+_RECORD_SIZE = _RECORD.size
+_PAYLOAD_OFFSET = 6
+_PAYLOAD_BYTES = 23
+_HEADER = b'BYDLOG\x01'.ljust(_RECORD_SIZE, b'\x00')  # magic and version in the first record slot
+
+
+# index keys sort like the log keys: timestamp, then f'{code}-{unit}' as text
+_SUFFIXES = sorted((f'{code}-{unit}', code, unit) for code in range(256) for unit in range(16))
+_SUFFIX_RANK = {(code, unit): rank for rank, (_, code, unit) in enumerate(_SUFFIXES)}
+_RANK_SUFFIX = tuple((code, unit) for _, code, unit in _SUFFIXES)
+_RANK_BITS = 12
+_RANK_MASK = (1 << _RANK_BITS) - 1
+
+
+def _index_key(ts: int, unit: int, code: int) -> int:
+    return ts << _RANK_BITS | _SUFFIX_RANK[code, unit]
+
+
+def _first_key_at(ts: float) -> int:
+    """Smallest index key with a timestamp not before ts."""
+    return _index_key(math.ceil(ts), 0, 0)
+
+
+def _key_from_log_key(k: str) -> int:
+    ts, code, unit = k.rsplit('-', 2)
+    ts = int(datetime.strptime(ts, '%Y%m%d %H:%M:%S').timestamp())
+    return _index_key(ts, int(unit), int(code))
+
+
+class BinaryLogStore:
+    """Fixed-width binary log file read through a memory map.
+
+    Every entry is a 32 byte record (uint32 timestamp, unit, code and the 23
+    byte payload) appended to the file. An index of the records sorted like
+    the log keys sits in two arrays of keys and record slots, so a lookup is a
+    bisect and retention drops a prefix of the index. Payloads are handed
+    out as memoryview slices of the map without copying. Records dropped by
+    retention stay in the file until the next compaction rewrites it.
+    """
+
+    memory_entries = 2000
+    record_bytes = _RECORD_SIZE
+    COMPACT_RATIO = 0.5
+    COMPACT_MIN_STALE = 500
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._map = None
+        self._keys = array('Q')  # sorted index keys
+        self._slots = array('I')  # record slot per index key
+        self._records = 0  # records in the file, live and stale
+        self._opened = False
+        self.appended = 0
+        self.pruned = 0
+        self.compactions = 0
+
+    def _open(self) -> None:
+        if self._opened:
+            return
+        if not os.path.isfile(self.path):
+            with open(self.path, 'wb') as f:
+                f.write(_HEADER)
+        self._remap()
+        if self._map[:_RECORD_SIZE] != _HEADER:
+            raise ValueError(f'{self.path} is not a BYD binary log file')
+        pairs = sorted(
+            (_index_key(ts, unit, code), slot)
+            for slot, (ts, unit, code, _) in enumerate(_RECORD.iter_unpack(self._map[_RECORD_SIZE:self._records * _RECORD_SIZE + _RECORD_SIZE]))
+        )
+        # the same entry may have been appended twice before a crash, keep the first copy
+        keys, slots = array('Q'), array('I')
+        for key, slot in pairs:
+            if not keys or keys[-1] != key:
+                keys.append(key)
+                slots.append(slot)
+        self._keys, self._slots = keys, slots
+        self._opened = True
+
+    def _remap(self) -> None:
+        # the previous map is released once no payload views refer to it anymore
+        with open(self.path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._records = len(self._map) // _RECORD_SIZE - 1
+
+    def _entry(self, data, slot: int) -> tuple:
+        ts, unit, code, payload = _RECORD.unpack_from(data, (slot + 1) * _RECORD_SIZE)
+        k = f'{datetime.fromtimestamp(ts):%Y%m%d %H:%M:%S}-{code}-{unit}'
+        return k, {'ts': float(ts), 'u': unit, 'c': code, 'data': binascii.hexlify(payload).decode('ascii')}
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> dict:
+        """Newest memory_entries entries in key order."""
+        return dict(reversed(self.latest(self.memory_entries)))
+
+    def append(self, entries: dict) -> None:
+        with self._lock:
+            self._open()
+            records = bytearray()
+            slot = self._records
+            for entry in entries.values():
+                ts, unit, code = int(entry['ts']), entry['u'], entry['c']
+                key = _index_key(ts, unit, code)
+                i = bisect_left(self._keys, key)
+                if i < len(self._keys) and self._keys[i] == key:
+                    continue
+                self._keys.insert(i, key)
+                self._slots.insert(i, slot)
+                records += _RECORD.pack(ts, unit, code, bytes.fromhex(entry['data']))
+                slot += 1
+            if not records:
+                return
+            with open(self.path, 'ab') as f:
+                f.write(records)
+            self._remap()
+            self.appended += len(records) // _RECORD_SIZE
+
+    def import_entries(self, log: dict) -> None:
+        self.append(log)
+
+    def prune(self, cutoff: float) -> int:
+        """Drop entries older than the cutoff timestamp from the index, return the number removed."""
+        with self._lock:
+            self._open()
+            removed = bisect_left(self._keys, _first_key_at(cutoff))
+            if removed:
+                del self._keys[:removed]
+                del self._slots[:removed]
+                self.pruned += removed
+                stale = self._records - len(self._keys)
+                if stale >= self.COMPACT_MIN_STALE and stale > len(self._keys) * self.COMPACT_RATIO:
+                    self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        """Rewrite the file with the live records in index order."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER)
+            for slot in self._slots:
+                start = (slot + 1) * _RECORD_SIZE
+                f.write(self._map[start:start + _RECORD_SIZE])
+        os.replace(tmp_path, self.path)
+        self._remap()
+        self._slots = array('I', range(len(self._keys)))
+        self.compactions += 1
+
+    def keep_cutoff(self, n: int) -> float | None:
+        """Timestamp of the n-th newest entry, None while the store holds fewer."""
+        with self._lock:
+            self._open()
+            return self._keys[-n] >> _RANK_BITS if len(self._keys) >= n else None
+
+    def needs_compaction(self, live: int) -> bool:
+        return False
+
+    def count(self) -> int:
+        with self._lock:
+            self._open()
+            return len(self._keys)
+
+    def contains(self, k: str) -> bool:
+        key = _key_from_log_key(k)
+        with self._lock:
+            self._open()
+            i = bisect_left(self._keys, key)
+            return i < len(self._keys) and self._keys[i] == key
+
+    def latest(self, n: int) -> list:
+        """Newest n (key, entry) pairs, newest first."""
+        with self._lock:
+            self._open()
+            return [self._entry(self._map, slot) for slot in reversed(self._slots[-n:])] if n > 0 else []
+
+    def code_counts(self) -> dict:
+        """Number of entries per (unit, code)."""
+        with self._lock:
+            self._open()
+            return {(unit, code): n for (code, unit), n in Counter(_RANK_SUFFIX[key & _RANK_MASK] for key in self._keys).items()}
+
+    def _snapshot(self, before: float | None) -> tuple:
+        with self._lock:
+            self._open()
+            end = len(self._keys) if before is None else bisect_left(self._keys, _first_key_at(before))
+            return self._map, self._keys[:end], self._slots[:end]
+
+    def iter_entries(self, code: int | None = None, before: float | None = None):
+        """Yield (key, entry) in index order."""
+        data, keys, slots = self._snapshot(before)
+        for key, slot in zip(keys, slots, strict=True):
+            if code is None or _RANK_SUFFIX[key & _RANK_MASK][0] == code:
+                yield self._entry(data, slot)
+
+    def iter_payloads(self, code: int | None = None, before: float | None = None):
+        """Yield (unit, code, payload) in index order, the payload a memoryview into the map."""
+        data, keys, slots = self._snapshot(before)
+        view = memoryview(data)
+        for key, slot in zip(keys, slots, strict=True):
+            record_code, unit = _RANK_SUFFIX[key & _RANK_MASK]
+            if code is None or record_code == code:
+                start = (slot + 1) * _RECORD_SIZE + _PAYLOAD_OFFSET
+                yield unit, record_code, view[start:start + _PAYLOAD_BYTES]
+
+    def close(self) -> None:
+        with self._lock:
+            self._map = None
+            self._keys, self._slots = array('Q'), array('I')
+            self._opened = False
+
+    def get_stats(self) -> dict:
+        return {
+            'format': 'binary',
+            'entries': len(self._keys),
+            'stale': self._records - len(self._keys) if self._opened else 0,
+            'appended': self.appended,
+            'pruned': self.pruned,
+            'compactions': self.compactions,
+            'size': os.path.getsize(self.path) if self.exists() else 0,
+        }
+
+
+def convert_json_log(json_path: str, bin_path: str) -> int:
+    """Convert a byd_log.json dump or byd_log.jsonl journal into a binary log file, return the entries written."""
+    if json_path.endswith('.jsonl'):
+        log = LogJournal(json_path).load()
+    else:
+        with open(json_path) as f:
+            log = json.load(f)
+    store = BinaryLogStore(bin_path)
+    store.import_entries(log)
+    count = store.count()
+    store.close()
+    return count
+
+
+# store type: (class, file name in the log folder)
+LOG_STORES = {
+    'jsonl': (LogJournal, 'byd_log.jsonl'),
+    'sqlite': (SqliteLogStore, 'byd_log.db'),
+    'binary': (BinaryLogStore, 'byd_log.bin'),
+}
@@ -0,0 +1,236 @@
+"""Declarative BYD Battery Box register map.
+
+Each block lists its fields once (offset, type, word order, bit slice, scale,
+unit). At import every block is compiled into a struct format covering the
+whole block plus a tuple of per-field steps, so decoding a block is one pack,
+one unpack and a flat pass over the fields. The same schema supplies the
+units of the sensor definitions in const.py, including the values the client
+derives from a block.
+"""
+
+import struct
+
+# struct codes per 16 bit register
+_REGISTER_CODES = {
+    'uint16': 'H',
+    'int16': 'h',
+    'uint32': 'HH',
+    'int32': 'HH',
+}
+
+
+class RegisterField:
+    """One value inside a register block."""
+
+    def __init__(self, name, offset, type='uint16', word_order='big', scale=None, digits=None, unit=None, shift=0, mask=None, length=1):
+        self.name = name
+        self.offset = offset  # register offset inside the block
+        self.type = type  # uint16, int16, uint32, int32 or string
+        self.word_order = word_order  # word order of 32 bit values
+        self.scale = scale
+        self.digits = digits  # round() digits after scaling, None keeps the raw product
+        self.unit = unit
+        self.shift = shift  # bit slice of a 16 bit register, e.g. shift=8 mask=0xFF for the high byte
+        self.mask = mask
+        self.length = length  # registers of a string
+
+    @property
+    def registers(self) -> int:
+        if self.type == 'string':
+            return self.length
+        return len(_REGISTER_CODES[self.type])
+
+
+class DerivedField:
+    """A value the client computes from a block, listed so its unit has one source."""
+
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+
+
+class RegisterBlock:
+    """A contiguous register range read in one request and its compiled decoder."""
+
+    def __init__(self, name, address, count, fields, derived=()):
+        self.name = name
+        self.address = address
+        self.count = count
+        self.fields = {f.name: f for f in fields}
+        self.derived = {f.name: f for f in derived}
+        self._pack = struct.Struct(f'>{count}H')
+        self._compile()
+
+    def _compile(self):
+        # type per register offset, unused registers become pad bytes
+        layout = [None] * self.count
+        for f in self.fields.values():
+            if f.offset + f.registers > self.count:
+                raise ValueError(f'{self.name}.{f.name} exceeds block of {self.count} registers')
+            if f.type == 'string':
+                layout[f.offset] = f'{f.length * 2}s'
+                for i in range(1, f.length):
+                    layout[f.offset + i] = ''
+            else:
+                codes = _REGISTER_CODES[f.type]
+                for i, code in enumerate(codes):
+                    existing = layout[f.offset + i]
+                    if existing not in (None, code):
+                        raise ValueError(f'{self.name}.{f.name} conflicts with another field at offset {f.offset + i}')
+                    layout[f.offset + i] = code
+
+        fmt = '>'
+        index = {}
+        position = 0
+        for offset, code in enumerate(layout):
+            if code is None:
+                fmt += '2x'
+                continue
+            if code == '':
+                continue
+            index[offset] = position
+            fmt += code
+            position += 1
+        self.format = fmt
+        self._unpack = struct.Struct(fmt)
+
+        steps = []
+        for f in self.fields.values():
+            i = index[f.offset]
+            if f.type in ('uint32', 'int32'):
+                hi, lo = (i, i + 1) if f.word_order == 'big' else (i + 1, i)
+                signed = f.type == 'int32'
+            else:
+                hi, lo, signed = i, None, False
+            steps.append((f.name, hi, lo, signed, f.shift, f.mask, f.scale, f.digits, f.type == 'string'))
+        self._steps = tuple(steps)
+
+    def unit(self, name):
+        field = self.fields.get(name) or self.derived[name]
+        return field.unit
+
+    def pack(self, regs) -> bytes:
+        """Big-endian buffer of the block registers."""
+        return self._pack.pack(*regs[:self.count])
+
+    def decode(self, regs) -> dict:
+        return self.decode_from(self.pack(regs))
+
+    def decode_from(self, buffer, offset=0) -> dict:
+        """Decode the block from a big-endian register buffer, e.g. a larger block already packed."""
+        raw = self._unpack.unpack_from(buffer, offset)
+        result = {}
+        for name, hi, lo, signed, shift, mask, scale, digits, is_string in self._steps:
+            value = raw[hi]
+            if is_string:
+                # serials shorter than the field are padded with NULs
+                result[name] = value.rstrip(b'\x00').decode('utf-8')
+                continue
+            if lo is not None:
+                value = value << 16 | raw[lo]
+                if signed and value & 0x80000000:
+                    value -= 0x100000000
+            if shift:
+                value >>= shift
+            if mask is not None:
+                value &= mask
+            if scale is not None:
+                value = value * scale
+                if digits is not None:
+                    value = round(value, digits)
+            result[name] = value
+        return result
+
+
+INFO_BLOCK = RegisterBlock('info', 0x0000, 20, [
+    RegisterField('serial', 0, 'string', length=10),
+    RegisterField('bmu_v_A_1', 12, shift=8, mask=0xFF),
+    RegisterField('bmu_v_A_2', 12, mask=0xFF),
+    RegisterField('bmu_v_B_1', 13, shift=8, mask=0xFF),
+    RegisterField('bmu_v_B_2', 13, mask=0xFF),
+    RegisterField('bms_v_1', 14, shift=8, mask=0xFF),
+    RegisterField('bms_v_2', 14, mask=0xFF),
+    RegisterField('bmu_area', 15, shift=8, mask=0xFF),
+    RegisterField('bms_area', 15, mask=0xFF),
+    RegisterField('towers', 16, shift=4, mask=0x0F),
+    RegisterField('modules', 16, mask=0x0F),
+    RegisterField('application_id', 17, shift=8, mask=0xFF),
+    RegisterField('lvs_type_id', 17, mask=0xFF),
+    RegisterField('phase_id', 18, shift=8, mask=0xFF),
+])
+
+EXT_INFO_BLOCK = RegisterBlock('ext_info', 0x0010, 2, [
+    RegisterField('inverter_id', 0, shift=8, mask=0xFF),
+    RegisterField('bat_type_id', 1, shift=8, mask=0xFF),
+], derived=[
+    DerivedField('capacity', 'kWh'),  # module capacity of the battery type times modules and towers
+])
+
+BMU_STATUS_BLOCK = RegisterBlock('bmu_status', 0x0500, 21, [
+    RegisterField('soc', 0, unit='%'),
+    RegisterField('max_cell_v', 1, scale=0.01, digits=2, unit='V'),
+    RegisterField('min_cell_v', 2, scale=0.01, digits=2, unit='V'),
+    RegisterField('soh', 3, unit='%'),
+    RegisterField('current', 4, 'int16', scale=0.1, digits=1, unit='A'),
+    RegisterField('bat_voltage', 5, scale=0.01, digits=2, unit='V'),
+    RegisterField('max_cell_temp', 6, 'int16', unit='°C'),
+    RegisterField('min_cell_temp', 7, 'int16', unit='°C'),
+    RegisterField('bmu_temp', 8, 'int16', unit='°C'),
+    RegisterField('errors', 13),
+    RegisterField('param_t_v_1', 14, shift=8, mask=0xFF),
+    RegisterField('param_t_v_2', 14, mask=0xFF),
+    RegisterField('output_voltage', 16, scale=0.01, digits=2, unit='V'),
+    RegisterField('charge_lfte', 17, 'uint32', word_order='little', scale=0.1, unit='kWh'),
+    RegisterField('discharge_lfte', 19, 'uint32', word_order='little', scale=0.1, unit='kWh'),
+], derived=[
+    DerivedField('power', 'W'),  # current times output voltage
+    DerivedField('efficiency', '%'),  # discharge over charge total energy
+])
+
+# Head of the 260 register BMS status block read from 0x0558 in 4 parts of 65
+# registers; every part starts with a length register.
+BMS_STATUS_BLOCK = RegisterBlock('bms_status', 0x0558, 49, [
+    RegisterField('max_voltage', 1, 'int16', scale=0.001, digits=3, unit='V'),
+    RegisterField('min_voltage', 2, 'int16', scale=0.001, digits=3, unit='V'),
+    RegisterField('max_c_v_id', 3, shift=8, mask=0xFF),
+    RegisterField('min_c_v_id', 3, mask=0xFF),
+    RegisterField('max_c_t', 4, 'int16', unit='°C'),
+    RegisterField('min_c_t', 5, 'int16', unit='°C'),
+    RegisterField('max_c_t_id', 6, shift=8, mask=0xFF),
+    RegisterField('min_c_t_id', 6, mask=0xFF),
+    RegisterField('charge_lfte', 15, 'uint32', word_order='little', scale=0.001, unit='kWh'),
+    RegisterField('discharge_lfte', 17, 'uint32', word_order='little', scale=0.001, unit='kWh'),
+    RegisterField('reg20', 20),
+    RegisterField('bat_voltage', 21, 'int16', scale=0.1, digits=2, unit='V'),
+    RegisterField('reg22', 22),
+    RegisterField('reg23', 23),
+    RegisterField('output_voltage', 24, 'int16', scale=0.1, digits=2, unit='V'),
+    RegisterField('soc', 25, 'int16', scale=0.1, digits=2, unit='%'),
+    RegisterField('soh', 26, 'int16', unit='%'),
+    RegisterField('current', 27, 'int16', scale=0.1, digits=2, unit='A'),
+    RegisterField('warnings1', 28),
+    RegisterField('warnings2', 29),
+    RegisterField('warnings3', 30),
+    RegisterField('errors', 48),
+], derived=[
+    DerivedField('max_c_v', 'V'),  # max_voltage, or the highest cell of a full readout
+    DerivedField('min_c_v', 'V'),
+    DerivedField('efficiency', '%'),
+    DerivedField('avg_c_v', 'V'),  # cell voltages and temperatures of the full readout
+    DerivedField('avg_c_t', '°C'),
+    DerivedField('max_history_cell_voltage', 'V'),
+    DerivedField('min_history_cell_voltage', 'V'),
+])
+BMS_STATUS_REGS = 260
+BMS_READOUT_REGS = 65  # registers per readout, the first one holds the head block and balancing flags
+LOG_READOUT_REGS = 65  # registers per readout of a log page, the first one is skipped
+LOG_READOUTS = 5
+LOG_PAGE_RECORDS = 20  # newest first
+LOG_READOUT = struct.Struct(f'>{LOG_READOUT_REGS - 1}H')
+LOG_RECORD = struct.Struct('>7B23s')  # 15 registers: code, year, month, day, hour, minute, second, data
+BMS_BALANCING_OFFSET = 7  # one uint16 of flags per module, up to 8 modules
+BMS_BALANCING_MODULES = 8
+BMS_VOLTAGE_SLICES = ((49, 65), (66, 130), (131, 180))
+BMS_TEMP_SLICES = ((180, 195), (196, 213))
+BMS_CELL_SLOTS = 16  # voltage slots per module
+BMS_TEMP_SLOTS = 8  # temperature slots (bytes) per module
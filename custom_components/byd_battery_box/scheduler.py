@@ -0,0 +1,102 @@
+"""Priority scheduler for Modbus transactions."""
+
+import asyncio
+import heapq
+import itertools
+import time
+
+# Lower value wins when several transactions wait for the link.
+PRIORITY_BMU = 0
+PRIORITY_BMS = 1
+PRIORITY_LOG = 2
+PRIORITY_LOG_HISTORY = 3
+PRIORITY_PROBE = 4
+
+PRIORITY_NAMES = {
+    PRIORITY_BMU: 'bmu',
+    PRIORITY_BMS: 'bms',
+    PRIORITY_LOG: 'log',
+    PRIORITY_LOG_HISTORY: 'log_history',
+    PRIORITY_PROBE: 'probe',
+}
+
+
+class ModbusScheduler:
+    """Async lock granting the Modbus link by priority, then arrival order.
+
+    Waiters park on a future and are woken by release(), so an idle lock costs
+    nothing and ownership is handed over directly to the next waiter.
+    Transactions hold it through BydBoxClient.ClientBusyLock.
+    """
+
+    def __init__(self) -> None:
+        self._locked = False
+        self._waiters: list = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.owner_priority: int | None = None
+        self.acquisitions = 0
+        self.contended = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    def locked(self) -> bool:
+        return self._locked
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def has_waiters(self, below: int | None = None) -> bool:
+        """Return True if someone waits, optionally only with a priority higher than below."""
+        for priority, _, fut in self._waiters:
+            if not fut.done() and (below is None or priority < below):
+                return True
+        return False
+
+    async def acquire(self, priority: int = PRIORITY_BMU) -> bool:
+        self.acquisitions += 1
+        if not self._locked and not self.has_waiters():
+            self._locked = True
+            self.owner_priority = priority
+            return True
+
+        self.contended += 1
+        start = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # ownership was handed over right before the cancellation
+                self.release()
+            raise
+        waited = time.monotonic() - start
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        self.owner_priority = priority
+        return True
+
+    def release(self) -> None:
+        if not self._locked:
+            raise RuntimeError('release of unlocked ModbusScheduler')
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                # keep the lock held and pass it on
+                fut.set_result(True)
+                return
+        self._locked = False
+        self.owner_priority = None
+
+    def get_stats(self) -> dict:
+        return {
+            'locked': self._locked,
+            'owner': PRIORITY_NAMES.get(self.owner_priority),
+            'waiting': self.waiting,
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'max_wait': round(self.max_wait, 3),
+            'avg_wait': round(self.total_wait / self.contended, 3) if self.contended else 0.0,
+        }
+
@@ -13,13 +13,14 @@ from homeassistant.helpers.icon import icon_for_battery_level
 from homeassistant.helpers.restore_state import RestoreEntity
 
 from . import HubConfigEntry
+from .cells import materialize
 from .const import (
     BMS_SENSOR_TYPES,
     BMU_SENSOR_TYPES,
     CONNECTION_SENSOR_TYPES,
     ENTITY_PREFIX,
 )
-from .hub import Hub
+from .hub import CONNECTION_KEY_PREFIX, Hub
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -89,6 +90,17 @@ async def async_setup_entry(
 class BydBoxSensor(SensorEntity, RestoreEntity):
     """Representation of an BYD Battery Box Modbus sensor."""
 
+    # per-cell lists and the decoded log are large, the diagnostics download holds them in full
+    _unrecorded_attributes = frozenset({
+        'cell_balancing',
+        'cell_temps',
+        'cell_voltages',
+        'cell_voltages_max_history',
+        'cell_voltages_min_history',
+        'log',
+        'total_cells',
+    })
+
     def __init__(self, platform_name, hub, device_info, name, key, device_class, state_class, unit, icon, entity_category):
         """Initialize the sensor."""
         self._platform_name = platform_name
@@ -106,13 +118,14 @@ class BydBoxSensor(SensorEntity, RestoreEntity):
 
     async def async_added_to_hass(self):
         """Register callbacks."""
-        self._hub.async_add_hub_entity(self._modbus_data_updated)
+        self._hub.async_add_hub_entity(self._modbus_data_updated, self._data_keys())
         # Try to restore last state from HA history for history sensors
         try:
             last_state = await self.async_get_last_state()
         except Exception:
             last_state = None
-        if last_state and (
+        # the warm-start snapshot already holds the history, restore only without it
+        if last_state and self._key not in self._hub.data and (
             'max_history_cell_voltage' in self._key or 'min_history_cell_voltage' in self._key
         ):
             # Restore state value
@@ -168,34 +181,60 @@ class BydBoxSensor(SensorEntity, RestoreEntity):
         if self._key in self._hub.data:
             return self._hub.data.get(self._key)
 
+    def _data_keys(self) -> list:
+        """Data keys the state and attributes are built from."""
+        bms = self._key[:4]
+        keys = [self._key]
+        if 'balancing_qty' in self._key:
+            keys.append(f'{bms}_cell_balancing')
+        elif 'avg_c_v' in self._key:
+            keys += [f'{bms}_cell_voltages', f'{bms}_cell_voltages_max_history', f'{bms}_cell_voltages_min_history']
+        elif 'max_history_c_v' in self._key:
+            keys += [f'{bms}_cell_voltages_max_history', f'{bms}_cell_voltages']
+        elif 'min_history_c_v' in self._key:
+            keys += [f'{bms}_cell_voltages_min_history', f'{bms}_cell_voltages']
+        elif 'avg_c_t' in self._key:
+            keys.append(f'{bms}_cell_temps')
+        elif 'log_entries' in self._key:
+            keys.append('log')
+        elif 'log_history_progress' in self._key:
+            keys.append('log_history')
+        elif 'b_total' in self._key:
+            keys.append(f'{bms}_b_cells_total')
+        elif 'max_history_cell_voltage' in self._key or 'min_history_cell_voltage' in self._key:
+            keys.append(f'{self._key}_cells')
+        return keys
+
     @property
     def extra_state_attributes(self):
         if 'balancing_qty' in self._key:
-            return {'cell_balancing': self._hub.data.get(f'{self._key[:4]}_cell_balancing')}
+            return {'cell_balancing': materialize(self._hub.data.get(f'{self._key[:4]}_cell_balancing'))}
         elif 'avg_c_v' in self._key:
             return {
-                'cell_voltages': self._hub.data.get(f'{self._key[:4]}_cell_voltages'),
-                'cell_voltages_max_history': self._hub.data.get(f'{self._key[:4]}_cell_voltages_max_history'),
-                'cell_voltages_min_history': self._hub.data.get(f'{self._key[:4]}_cell_voltages_min_history'),
+                'cell_voltages': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages')),
+                'cell_voltages_max_history': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages_max_history')),
+                'cell_voltages_min_history': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages_min_history')),
             }
         elif 'max_history_c_v' in self._key:
             return {
-                'cell_voltages_max_history': self._hub.data.get(f'{self._key[:4]}_cell_voltages_max_history'),
-                'cell_voltages': self._hub.data.get(f'{self._key[:4]}_cell_voltages'),
+                'cell_voltages_max_history': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages_max_history')),
+                'cell_voltages': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages')),
             }
         elif 'min_history_c_v' in self._key:
             return {
-                'cell_voltages_min_history': self._hub.data.get(f'{self._key[:4]}_cell_voltages_min_history'),
-                'cell_voltages': self._hub.data.get(f'{self._key[:4]}_cell_voltages'),
+                'cell_voltages_min_history': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages_min_history')),
+                'cell_voltages': materialize(self._hub.data.get(f'{self._key[:4]}_cell_voltages')),
             }
         elif 'avg_c_t' in self._key:
-            return {'cell_temps': self._hub.data.get(f'{self._key[:4]}_cell_temps')}
+            return {'cell_temps': materialize(self._hub.data.get(f'{self._key[:4]}_cell_temps'))}
         elif 'log_entries' in self._key:
             return {'log': self._hub.data.get('log')}
+        elif 'log_history_progress' in self._key:
+            return self._hub.data.get('log_history')
         elif 'b_total' in self._key:
             return {'total_cells': self._hub.data.get(f'{self._key[:4]}_b_cells_total')}
         elif 'max_history_cell_voltage' in self._key or 'min_history_cell_voltage' in self._key:
-            return {'cell_voltages': self._hub.data.get(f'{self._key}_cells')}
+            return {'cell_voltages': materialize(self._hub.data.get(f'{self._key}_cells'))}
 
         return None
 
@@ -229,7 +268,7 @@ class BydBoxConnectionSensor(SensorEntity, RestoreEntity):
 
     async def async_added_to_hass(self):
         """Register callbacks."""
-        self._hub.async_add_hub_entity(self._connection_data_updated)
+        self._hub.async_add_hub_entity(self._connection_data_updated, [f'{CONNECTION_KEY_PREFIX}{self._key}'])
 
     async def async_will_remove_from_hass(self) -> None:
         self._hub.async_remove_hub_entity(self._connection_data_updated)
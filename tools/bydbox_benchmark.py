@@ -0,0 +1,264 @@
+"""Polling benchmark for BydBoxClient against the bundled simulator.
+
+Times full update cycles end-to-end over a real TCP socket and reports
+p50/p95/p99 wall time plus Modbus round trips per cycle. Log decoding is
+measured separately in records/s on a synthetic log. Results are written
+as JSON so runs before and after a change can be compared:
+
+    python tools/bydbox_benchmark.py --output before.json
+    python tools/bydbox_benchmark.py --output after.json --baseline before.json
+
+Requires pymodbus; Home Assistant is not needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import binascii
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime
+
+TOOLS_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+PACKAGE_DIR = os.path.join(REPO_DIR, 'custom_components', 'byd_battery_box')
+
+sys.path.insert(0, TOOLS_DIR)
+
+from bydbox_simulator import BydBoxSimulator, SimulatorConfig  # noqa: E402
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def load_client_module():
+    """Import bydboxclient without executing the HA specific package __init__."""
+    if 'byd_battery_box' not in sys.modules:
+        package = types.ModuleType('byd_battery_box')
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules['byd_battery_box'] = package
+    from byd_battery_box import bydboxclient
+    return bydboxclient
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(name: str, durations: list[float], round_trips: list[int], failures: int) -> dict:
+    return {
+        'name': name,
+        'iterations': len(durations),
+        'failures': failures,
+        'mean_s': round(statistics.fmean(durations), 4) if durations else 0.0,
+        'p50_s': round(percentile(durations, 50), 4),
+        'p95_s': round(percentile(durations, 95), 4),
+        'p99_s': round(percentile(durations, 99), 4),
+        'min_s': round(min(durations), 4) if durations else 0.0,
+        'max_s': round(max(durations), 4) if durations else 0.0,
+        'round_trips': round(statistics.fmean(round_trips), 1) if round_trips else 0.0,
+    }
+
+
+class Benchmark:
+    """Runs the polling scenarios against one simulator instance."""
+
+    def __init__(self, args) -> None:
+        self.args = args
+        self.sim = BydBoxSimulator(SimulatorConfig(
+            port=0, model=args.model, towers=args.towers, modules=args.modules,
+            latency=args.latency, ready_delay=args.ready_delay, ready_jitter=args.ready_jitter,
+            log_entries=args.log_entries, seed=args.seed,
+        ))
+        self.client = None
+        self._log_dir = tempfile.mkdtemp(prefix='bydbox_bench_')
+
+    async def setup(self) -> None:
+        await self.sim.start()
+        module = load_client_module()
+        self.client = module.BydBoxClient(host='127.0.0.1', port=self.sim.config.port, unit_id=1, timeout=3)
+        self.client.set_log_path(self._log_dir + '/')
+        await self.client.init_data()
+
+    async def teardown(self) -> None:
+        if self.client is not None:
+            self.client.close()
+        await self.sim.stop()
+
+    async def measure(self, name: str, cycle, iterations: int, before=None) -> dict:
+        durations, round_trips, failures = [], [], 0
+        for _ in range(iterations):
+            if before is not None:
+                before()
+            self.sim.reset_paging()
+            requests = self.sim.stats.requests
+            start = time.perf_counter()
+            try:
+                result = await cycle()
+            except Exception:
+                _LOGGER.exception(f'{name} failed')
+                result = False
+            durations.append(time.perf_counter() - start)
+            round_trips.append(self.sim.stats.requests - requests)
+            if result is False or result is None:
+                failures += 1
+        summary = summarize(name, durations, round_trips, failures)
+        _LOGGER.info(f"{name:<28} p50 {summary['p50_s']:.3f}s p95 {summary['p95_s']:.3f}s p99 {summary['p99_s']:.3f}s round trips {summary['round_trips']}")
+        return summary
+
+    def measure_cpu(self, name: str, work, iterations: int, records: int) -> dict:
+        durations = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            work()
+            durations.append(time.perf_counter() - start)
+        summary = summarize(name, durations, [], 0)
+        summary['records'] = records
+        summary['records_per_s'] = round(records / summary['p50_s']) if summary['p50_s'] else 0
+        _LOGGER.info(f"{name:<28} p50 {summary['p50_s']:.3f}s {summary['records_per_s']} records/s")
+        return summary
+
+    def synthetic_log(self, entries: int) -> dict:
+        """Log dict in the client's format with about the given number of simulated entries."""
+        units = self.args.towers + 1
+        sim = BydBoxSimulator(SimulatorConfig(towers=self.args.towers, modules=self.args.modules, log_entries=-(-entries // units), seed=self.args.seed))
+        log = {}
+        for unit, unit_entries in enumerate(sim.logs):
+            for ts, code, payload in unit_entries:
+                log[f'{ts:%Y%m%d %H:%M:%S}-{code}-{unit}-{len(log)}'] = {'ts': ts.timestamp(), 'u': unit, 'c': code, 'data': binascii.hexlify(payload).decode('ascii')}
+                if len(log) == entries:
+                    return log
+        return log
+
+    def decode_log(self, log: dict) -> None:
+        client = self.client
+        for entry in log.values():
+            unit_id, _, ts, code, data = client.split_log_entry(entry)
+            client.decode_log_data(unit_id, ts, code, data)
+
+    def log_pages(self) -> list[bytes]:
+        """Raw log pages of the simulated BMU as packed by a history read."""
+        module = load_client_module()
+        pages = []
+        for page in range(-(-len(self.sim.logs[0]) // module.LOG_PAGE_RECORDS)):
+            regs = self.sim._log_page_block(0, page)
+            readouts = [regs[i + 1:i + module.LOG_READOUT_REGS] for i in range(0, len(regs), module.LOG_READOUT_REGS)]
+            pages.append(b''.join(module.LOG_READOUT.pack(*readout) for readout in readouts))
+        return pages
+
+    def parse_log_pages(self, pages: list[bytes]) -> None:
+        client = self.client
+        self._clear_log()
+        for buf in pages:
+            page = client.LogPage()
+            page.buf += buf
+            page.readouts = load_client_module().LOG_READOUTS
+            client._parse_log_page(0, page, update_last=False)
+
+    def _clear_log(self) -> None:
+        self.client.log = load_client_module().LogIndex()
+        self.client._new_logs = {}
+        self.client.rebuild_balancing_totals()
+
+    async def run(self) -> list[dict]:
+        args = self.args
+        client = self.client
+        results = []
+        results.append(await self.measure('bmu_status', client.update_bmu_status_data, args.iterations))
+        for bms_id in range(1, args.towers + 1):
+            results.append(await self.measure(f'bms_status_{bms_id}', lambda bms_id=bms_id: client.update_bms_status_data(bms_id), args.iterations))
+        results.append(await self.measure('bms_status_all', client.update_all_bms_status_data, args.iterations))
+        results.append(await self.measure('bms_summary_all', lambda: client.update_all_bms_status_data(full=False), args.iterations))
+        results.append(await self.measure('log_all', client.update_all_log_data, args.iterations))
+        depth = args.log_depth
+        results.append(await self.measure(f'log_history_{depth}', lambda: client.update_log_data(0, log_depth=depth), args.history_iterations, before=self._clear_log))
+        results.append(await self.measure(f'log_history_{depth}_warm', lambda: client.update_log_data(0, log_depth=depth), args.history_iterations))
+        log = self.synthetic_log(args.decode_entries)
+        results.append(self.measure_cpu(f'log_decode_{len(log)}', lambda: self.decode_log(log), args.history_iterations, len(log)))
+        pages = self.log_pages()
+        summary = self.measure_cpu(f'log_page_parse_{len(pages)}', lambda: self.parse_log_pages(pages), args.iterations, len(self.client.log))
+        summary['page_us'] = round(summary['p50_s'] / len(pages) * 1e6, 1)
+        _LOGGER.info(f"{summary['name']:<28} {summary['page_us']} us per page")
+        results.append(summary)
+        return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {r['name']: r for r in json.load(f)['results']}
+    for r in results:
+        b = baseline.get(r['name'])
+        if b is None or not b['p50_s']:
+            continue
+        _LOGGER.info(f"{r['name']:<28} p50 {b['p50_s']:.3f}s -> {r['p50_s']:.3f}s ({r['p50_s'] / b['p50_s']:.2f}x) round trips {b['round_trips']} -> {r['round_trips']}")
+
+
+async def async_main(args) -> dict:
+    bench = Benchmark(args)
+    await bench.setup()
+    try:
+        results = await bench.run()
+    finally:
+        await bench.teardown()
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+        'results': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark BydBoxClient polling cycles against the simulator')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--history-iterations', type=int, default=3)
+    parser.add_argument('--log-depth', type=int, default=10, help='pages of 20 entries for the history scenario')
+    parser.add_argument('--model', default='HVM')
+    parser.add_argument('--towers', type=int, default=3)
+    parser.add_argument('--modules', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.005, help='simulated per request latency in s')
+    parser.add_argument('--ready-delay', type=float, default=0.35)
+    parser.add_argument('--ready-jitter', type=float, default=0.1)
+    parser.add_argument('--log-entries', type=int, default=400)
+    parser.add_argument('--decode-entries', type=int, default=10000, help='size of the log for the decode throughput scenario')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=None, help='previous results file to compare against')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    logging.getLogger('byd_battery_box').setLevel(logging.ERROR)
+    logging.getLogger('pymodbus').setLevel(logging.CRITICAL)
+
+    report = asyncio.run(async_main(args))
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    _LOGGER.info(f'results written to {args.output}')
+    if args.baseline:
+        compare(report['results'], args.baseline)
+
+
+if __name__ == '__main__':
+    main()
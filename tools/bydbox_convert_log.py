@@ -0,0 +1,49 @@
+"""Convert a BYD Battery Box log to the binary log format.
+
+Reads a byd_log.json dump or a byd_log.jsonl journal and writes the 32 byte
+per entry binary log used by the 'binary' log storage:
+
+    python tools/bydbox_convert_log.py logs/byd_log.json logs/byd_log.bin
+
+Home Assistant is not needed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import types
+
+TOOLS_DIR = os.path.dirname(os.path.realpath(__file__))
+REPO_DIR = os.path.dirname(TOOLS_DIR)
+PACKAGE_DIR = os.path.join(REPO_DIR, 'custom_components', 'byd_battery_box')
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def load_logstore_module():
+    """Import logstore without executing the HA specific package __init__."""
+    if 'byd_battery_box' not in sys.modules:
+        package = types.ModuleType('byd_battery_box')
+        package.__path__ = [PACKAGE_DIR]
+        sys.modules['byd_battery_box'] = package
+    from byd_battery_box import logstore
+    return logstore
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Convert a BYD Battery Box JSON log to the binary log format')
+    parser.add_argument('source', help='byd_log.json or byd_log.jsonl')
+    parser.add_argument('target', help='binary log file, entries are added if it exists')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    logstore = load_logstore_module()
+    count = logstore.convert_json_log(args.source, args.target)
+    _LOGGER.info(f'{args.target}: {count} entries, {os.path.getsize(args.target)} bytes')
+
+
+if __name__ == '__main__':
+    main()
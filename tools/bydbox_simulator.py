@@ -0,0 +1,512 @@
+"""Offline BYD Battery Box simulator.
+
+Serves the register map read by BydBoxClient over Modbus RTU framing on a
+plain TCP socket (the same framing ExtModbusClient uses with framer='rtu'):
+
+    0x0000 (20 regs)   BMU info block
+    0x0010 (2 regs)    extended info block (inverter, battery type)
+    0x0500 (21 regs)   BMU status
+    0x0550 / 0x0551 / 0x0558   BMS status request / ready / readout
+    0x05A0 / 0x05A1 / 0x05A8   log request / ready / readout
+
+Towers, modules, cells, latency, readiness delay and drop/error rates are
+configurable so polling throughput can be measured without a battery.
+
+Usage:
+    python tools/bydbox_simulator.py --port 8080 --towers 3 --modules 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import random
+import struct
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+_LOGGER = logging.getLogger(__name__)
+
+READY_RESPONSE = 0x8801
+BMS_REQUEST = 0x0550
+BMS_READY = 0x0551
+BMS_READOUT = 0x0558
+LOG_REQUEST = 0x05A0
+LOG_READY = 0x05A1
+LOG_READOUT = 0x05A8
+
+BMS_BLOCK_REGS = 260
+LOG_BLOCK_REGS = 325
+READOUT_CHUNK = 65
+LOG_PAGE_ENTRIES = 20
+LOG_PAYLOAD_BYTES = 23
+
+# (model id on 0x0011, default cells per module, default temp sensors per module)
+MODELS = {
+    'HVL': (0, 0, 0),
+    'HVM': (1, 16, 8),
+    'HVS': (2, 32, 12),
+    'LVS': (2, 16, 8),  # LV serial, the BMU reports one tower less than it has
+}
+
+BMU_LOG_CODES = [0, 1, 2, 32, 34, 36, 38, 40, 45, 101, 102, 105, 111]
+BMS_LOG_CODES = [0, 1, 2, 3, 4, 5, 6, 7, 9, 17, 18, 101, 102, 105]
+
+
+def crc16(data: bytes) -> int:
+    """Modbus RTU CRC16."""
+    crc = 0xFFFF
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+def frame(payload: bytes) -> bytes:
+    return payload + struct.pack('<H', crc16(payload))
+
+
+@dataclass
+class SimulatorConfig:
+    """Simulated device topology and link behaviour."""
+
+    host: str = '127.0.0.1'
+    port: int = 8080
+    unit_id: int = 1
+    model: str = 'HVM'
+    towers: int = 3
+    modules: int = 5
+    cells: int | None = None  # cells per module, default from model
+    temps: int | None = None  # temperature sensors per module, default from model
+    serial: str | None = None  # BMU serial, NUL padded to 20 bytes; default a full length serial from the model
+    latency: float = 0.0  # seconds added to every response
+    latency_jitter: float = 0.0
+    ready_delay: float = 0.35  # seconds until 0x0551/0x05A1 report ready after a request
+    ready_jitter: float = 0.1
+    drop_rate: float = 0.0  # probability to silently drop a request
+    error_rate: float = 0.0  # probability to answer with a slave device busy exception
+    log_entries: int = 400  # history per unit
+    new_log_interval: float = 0.0  # seconds between new log events per unit, 0 disables
+    page_reset: float = 30.0  # seconds of log inactivity after which paging restarts at the newest page
+    seed: int | None = 42
+
+
+@dataclass
+class SimulatorStats:
+    """Request counters, reset by the benchmark between scenarios."""
+
+    requests: int = 0
+    reads: int = 0
+    writes: int = 0
+    dropped: int = 0
+    errors: int = 0
+    ready_probes: int = 0
+    ready_misses: int = 0
+    by_address: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {
+            'requests': self.requests,
+            'reads': self.reads,
+            'writes': self.writes,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'ready_probes': self.ready_probes,
+            'ready_misses': self.ready_misses,
+            'by_address': {f'0x{k:04X}': v for k, v in sorted(self.by_address.items())},
+        }
+
+
+class BydBoxSimulator:
+    """Asyncio TCP server emulating a BYD BMU gateway."""
+
+    def __init__(self, config: SimulatorConfig | None = None) -> None:
+        self.config = config or SimulatorConfig()
+        model_id, cells, temps = MODELS[self.config.model]
+        self._model_id = model_id
+        self.cells = self.config.cells if self.config.cells is not None else cells
+        self.temps = self.config.temps if self.config.temps is not None else temps
+        self.stats = SimulatorStats()
+        self._rnd = random.Random(self.config.seed)
+        self._server: asyncio.base_events.Server | None = None
+
+        units = self.config.towers + 1
+        self._voltages = [[3300 + self._rnd.randint(-15, 15) for _ in range(self.config.modules * self.cells)] for _ in range(units)]
+        self._temperatures = [[20 + self._rnd.randint(-2, 2) for _ in range(self.config.modules * self.temps)] for _ in range(units)]
+        self._charge = [12_345_678 + u * 1000 for u in range(units)]
+        self._discharge = [11_234_567 + u * 1000 for u in range(units)]
+        self._soc = 55.0
+        self._current = -4.2
+
+        # newest entry last; each entry is (datetime, code, 23 byte payload)
+        self.logs: list[list[tuple[datetime, int, bytes]]] = []
+        now = datetime.now().replace(microsecond=0)
+        for unit in range(units):
+            entries = []
+            ts = now - timedelta(minutes=7 * self.config.log_entries)
+            for _ in range(self.config.log_entries):
+                ts += timedelta(minutes=self._rnd.randint(1, 13), seconds=self._rnd.randint(0, 59))
+                entries.append(self._make_log_entry(unit, min(ts, now)))
+            self.logs.append(entries)
+        self._last_log_event = time.monotonic()
+
+        # handshake state
+        self._bms_ready_at = 0.0
+        self._bms_block: list[int] = []
+        self._bms_chunk = 0
+        self._log_ready_at = 0.0
+        self._log_block: list[int] = []
+        self._log_chunk = 0
+        self._log_unit: int | None = None
+        self._log_page = 0
+        self._log_last_request = 0.0
+
+    # ------------------------------------------------------------------ server
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, self.config.host, self.config.port)
+        sock = self._server.sockets[0].getsockname()
+        self.config.port = sock[1]
+        _LOGGER.info(f'BYD simulator listening on {sock[0]}:{sock[1]} model {self.config.model} towers {self.config.towers} modules {self.config.modules} cells {self.cells}')
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        buffer = b''
+        try:
+            while True:
+                chunk = await reader.read(1024)
+                if not chunk:
+                    break
+                buffer += chunk
+                while True:
+                    request, buffer = self._split_frame(buffer)
+                    if request is None:
+                        break
+                    response = await self._process(request)
+                    if response is not None:
+                        writer.write(response)
+                        await writer.drain()
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _split_frame(self, buffer: bytes) -> tuple[bytes | None, bytes]:
+        """Return one complete RTU request frame and the remaining buffer."""
+        if len(buffer) < 8:
+            return None, buffer
+        fc = buffer[1]
+        if fc == 0x10:
+            if len(buffer) < 7:
+                return None, buffer
+            size = 9 + buffer[6]
+        else:
+            size = 8
+        if len(buffer) < size:
+            return None, buffer
+        request, rest = buffer[:size], buffer[size:]
+        if crc16(request[:-2]) != struct.unpack('<H', request[-2:])[0]:
+            _LOGGER.warning('crc mismatch, dropping buffer')
+            return None, b''
+        return request, rest
+
+    async def _process(self, request: bytes) -> bytes | None:
+        slave, fc = request[0], request[1]
+        address = struct.unpack('>H', request[2:4])[0]
+        self.stats.requests += 1
+        self.stats.by_address[address] = self.stats.by_address.get(address, 0) + 1
+
+        delay = self.config.latency + self._rnd.uniform(0, self.config.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self._rnd.random() < self.config.drop_rate:
+            self.stats.dropped += 1
+            return None
+        if self._rnd.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return frame(bytes([slave, fc | 0x80, 0x06]))
+
+        if fc == 0x03:
+            self.stats.reads += 1
+            count = struct.unpack('>H', request[4:6])[0]
+            regs = self._read(address, count)
+            if regs is None:
+                return frame(bytes([slave, fc | 0x80, 0x02]))
+            return frame(bytes([slave, fc, count * 2]) + struct.pack(f'>{count}H', *regs))
+        if fc == 0x10:
+            self.stats.writes += 1
+            count = struct.unpack('>H', request[4:6])[0]
+            values = list(struct.unpack(f'>{count}H', request[7:7 + count * 2]))
+            if not self._write(address, values):
+                return frame(bytes([slave, fc | 0x80, 0x02]))
+            return frame(bytes([slave, fc]) + request[2:6])
+        return frame(bytes([slave, fc | 0x80, 0x01]))
+
+    # --------------------------------------------------------------- registers
+
+    def _read(self, address: int, count: int) -> list[int] | None:
+        if address == 0x0000 and count <= 20:
+            return self._info_block()[:count]
+        if address == 0x0010 and count <= 2:
+            return [0 << 8, self._model_id << 8][:count]
+        if address == 0x0500 and count <= 21:
+            return self._bmu_status_block()[:count]
+        if address == BMS_READY:
+            return [self._ready_value(self._bms_ready_at)] * count
+        if address == LOG_READY:
+            return [self._ready_value(self._log_ready_at)] * count
+        if address == BMS_READOUT and count <= READOUT_CHUNK:
+            return self._next_chunk('bms', count)
+        if address == LOG_READOUT and count <= READOUT_CHUNK:
+            return self._next_chunk('log', count)
+        return None
+
+    def _write(self, address: int, values: list[int]) -> bool:
+        if len(values) != 2 or values[1] != 0x8100:
+            return False
+        unit = values[0]
+        if address == BMS_REQUEST and 1 <= unit <= self.config.towers:
+            self._bms_block = self._bms_status_block(unit)
+            self._bms_chunk = 0
+            self._bms_ready_at = time.monotonic() + self._ready_delay()
+            return True
+        if address == LOG_REQUEST and 0 <= unit <= self.config.towers:
+            self._add_log_events()
+            now = time.monotonic()
+            if unit == self._log_unit and now - self._log_last_request < self.config.page_reset:
+                self._log_page += 1
+            else:
+                self._log_page = 0
+            self._log_unit = unit
+            self._log_last_request = now
+            self._log_block = self._log_page_block(unit, self._log_page)
+            self._log_chunk = 0
+            self._log_ready_at = now + self._ready_delay()
+            return True
+        return False
+
+    def _ready_delay(self) -> float:
+        return max(0.0, self.config.ready_delay + self._rnd.uniform(-self.config.ready_jitter, self.config.ready_jitter))
+
+    def _ready_value(self, ready_at: float) -> int:
+        self.stats.ready_probes += 1
+        if ready_at and time.monotonic() >= ready_at:
+            return READY_RESPONSE
+        self.stats.ready_misses += 1
+        return 0
+
+    def _next_chunk(self, kind: str, count: int) -> list[int]:
+        if kind == 'bms':
+            block, index = self._bms_block, self._bms_chunk
+            self._bms_chunk = (index + 1) % (BMS_BLOCK_REGS // READOUT_CHUNK)
+        else:
+            block, index = self._log_block, self._log_chunk
+            self._log_chunk = (index + 1) % (LOG_BLOCK_REGS // READOUT_CHUNK)
+        if not block:
+            return [0] * count
+        return block[index * READOUT_CHUNK:index * READOUT_CHUNK + count]
+
+    def _info_block(self) -> list[int]:
+        serial = self.config.serial
+        if serial is None:
+            serial = ('P030T020Z2008' if self.config.model != 'LVS' else 'P020T020Z2008').ljust(19, '0')[:19] + '1'
+        regs = list(struct.unpack('>10H', serial.encode('ascii').ljust(20, b'\x00')[:20]))
+        regs += [0, 0]
+        regs.append(3 << 8 | 34)  # bmu A 3.34
+        regs.append(3 << 8 | 31)  # bmu B 3.31
+        regs.append(3 << 8 | 21)  # bms 3.21
+        regs.append(1 << 8 | 1)  # working area A/A
+        towers = self.config.towers - 1 if self.config.model == 'LVS' else self.config.towers
+        regs.append((towers & 0x0F) << 4 | (self.config.modules & 0x0F))
+        regs.append(1 << 8 | 0)  # application on grid
+        regs.append(1 << 8)  # three phase
+        regs.append(0)
+        return regs
+
+    def _bmu_status_block(self) -> list[int]:
+        self._soc = min(100.0, max(0.0, self._soc + self._rnd.uniform(-0.2, 0.2)))
+        self._current = round(self._current + self._rnd.uniform(-0.3, 0.3), 1)
+        cells = [v for unit in self._voltages[1:] for v in unit]
+        temps = [t for unit in self._temperatures[1:] for t in unit]
+        bat_voltage = sum(cells[:self.config.modules * self.cells]) // 10 if cells else 0
+        charge = self._charge[0] // 100
+        discharge = self._discharge[0] // 100
+        return [
+            int(self._soc),
+            max(cells, default=0) // 10,
+            min(cells, default=0) // 10,
+            99,
+            int(self._current * 10) & 0xFFFF,
+            bat_voltage & 0xFFFF,
+            max(temps, default=0),
+            min(temps, default=0),
+            28,
+            0, 792, 0, 0,
+            0,
+            1 << 8 | 9,
+            0,
+            (bat_voltage + 5) & 0xFFFF,
+            charge & 0xFFFF, charge >> 16,
+            discharge & 0xFFFF, discharge >> 16,
+        ]
+
+    def _bms_status_block(self, unit: int) -> list[int]:
+        voltages = self._voltages[unit]
+        for i in range(len(voltages)):
+            voltages[i] = min(3600, max(3000, voltages[i] + self._rnd.randint(-2, 2)))
+        temps = self._temperatures[unit]
+        cells = self.cells
+        modules = self.config.modules
+        regs = [0] * BMS_BLOCK_REGS
+        for chunk in range(BMS_BLOCK_REGS // READOUT_CHUNK):
+            regs[chunk * READOUT_CHUNK] = READOUT_CHUNK * 2
+        if voltages:
+            vmax, vmin = max(voltages), min(voltages)
+            regs[1] = vmax
+            regs[2] = vmin
+            regs[3] = (voltages.index(vmax) + 1) << 8 | (voltages.index(vmin) + 1)
+        regs[4] = max(temps, default=0)
+        regs[5] = min(temps, default=0)
+        regs[6] = 1 << 8 | 2
+        for m in range(min(modules, 8)):
+            regs[7 + m] = self._rnd.getrandbits(16) & self._rnd.getrandbits(16) & self._rnd.getrandbits(16)
+        charge = self._charge[unit]
+        discharge = self._discharge[unit]
+        regs[15], regs[16] = charge & 0xFFFF, charge >> 16
+        regs[17], regs[18] = discharge & 0xFFFF, discharge >> 16
+        regs[21] = sum(voltages) // 100
+        regs[23] = 1560
+        regs[24] = regs[21] + 2
+        regs[25] = int(self._soc * 10)
+        regs[26] = 99
+        regs[27] = int(self._current * 10 / max(1, self.config.towers)) & 0xFFFF
+        regs[31:48] = [6659, 7683, 256, 20528, 13104, 21552, 12848, 23090, 12848, 14129, 12593, 13619, 12920, 30840, 30840, 270, 270]
+
+        # cell voltage slots: 16 per module, laid out around the chunk headers at 65 and 130
+        slots = [i for i in range(49, 180) if i not in (65, 130)]
+        for m in range(modules):
+            for c in range(cells):
+                s = m * 16 + c
+                if s < len(slots):
+                    regs[slots[s]] = voltages[m * cells + c]
+        # temperature slots: 4 registers per module, two int8 sensors each, header at 195
+        slots = [i for i in range(180, 213) if i != 195]
+        for m in range(modules):
+            row = temps[m * self.temps:(m + 1) * self.temps] + [0]  # pad an odd sensor count
+            for t in range(round(self.temps / 2)):
+                s = m * 4 + t
+                if s < len(slots):
+                    regs[slots[s]] = (row[t * 2] & 0xFF) << 8 | (row[t * 2 + 1] & 0xFF)
+        return regs
+
+    # --------------------------------------------------------------------- log
+
+    def _make_log_entry(self, unit: int, ts: datetime) -> tuple[datetime, int, bytes]:
+        if unit == 0:
+            code = self._rnd.choice(BMU_LOG_CODES)
+        else:
+            code = self._rnd.choice(BMS_LOG_CODES)
+        payload = bytearray(self._rnd.getrandbits(8) for _ in range(LOG_PAYLOAD_BYTES))
+        if unit > 0 and code == 17:
+            payload[:20] = bytes(self._rnd.getrandbits(8) & self._rnd.getrandbits(8) for _ in range(20))
+        elif code == 111:
+            payload[:6] = bytes([ts.year - 2000, ts.month, ts.day, ts.hour, ts.minute, ts.second])
+        elif unit == 0 and code == 38:
+            payload[10] = 0
+        return ts, code, bytes(payload)
+
+    def _add_log_events(self) -> None:
+        interval = self.config.new_log_interval
+        if interval <= 0:
+            return
+        now = time.monotonic()
+        while now - self._last_log_event >= interval:
+            self._last_log_event += interval
+            ts = datetime.now().replace(microsecond=0)
+            for unit, entries in enumerate(self.logs):
+                entries.append(self._make_log_entry(unit, ts))
+
+    def reset_paging(self) -> None:
+        """Make the next log request start at the newest page."""
+        self._log_unit = None
+        self._log_page = 0
+
+    def add_log_event(self, unit: int, code: int | None = None) -> None:
+        """Append a new log event for a unit (newest entry)."""
+        ts = datetime.now().replace(microsecond=0)
+        ts_entry, rnd_code, payload = self._make_log_entry(unit, ts)
+        self.logs[unit].append((ts_entry, rnd_code if code is None else code, payload))
+
+    def _log_page_block(self, unit: int, page: int) -> list[int]:
+        entries = self.logs[unit]
+        end = len(entries) - page * LOG_PAGE_ENTRIES
+        start = max(0, end - LOG_PAGE_ENTRIES)
+        page_entries = entries[start:end][::-1] if end > 0 else []
+        data = []
+        for ts, code, payload in page_entries:
+            data.append(code << 8 | (ts.year - 2000))
+            data.append(ts.month << 8 | ts.day)
+            data.append(ts.hour << 8 | ts.minute)
+            data.append(ts.second << 8 | payload[0])
+            data += struct.unpack('>11H', payload[1:])
+        data += [0] * (LOG_PAGE_ENTRIES * 16 - len(data))
+        regs = []
+        for chunk in range(LOG_BLOCK_REGS // READOUT_CHUNK):
+            regs.append((READOUT_CHUNK - 1) * 2)
+            regs += data[chunk * (READOUT_CHUNK - 1):(chunk + 1) * (READOUT_CHUNK - 1)]
+        return regs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='BYD Battery Box Modbus RTU-over-TCP simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--model', choices=sorted(MODELS), default='HVM')
+    parser.add_argument('--towers', type=int, default=3)
+    parser.add_argument('--modules', type=int, default=5)
+    parser.add_argument('--cells', type=int, default=None)
+    parser.add_argument('--temps', type=int, default=None)
+    parser.add_argument('--serial', default=None, help='BMU serial, shorter ones are NUL padded')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--latency-jitter', type=float, default=0.0)
+    parser.add_argument('--ready-delay', type=float, default=0.35)
+    parser.add_argument('--ready-jitter', type=float, default=0.1)
+    parser.add_argument('--drop-rate', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--log-entries', type=int, default=400)
+    parser.add_argument('--new-log-interval', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    config = SimulatorConfig(
+        host=args.host, port=args.port, model=args.model, towers=args.towers, modules=args.modules,
+        cells=args.cells, temps=args.temps, serial=args.serial, latency=args.latency, latency_jitter=args.latency_jitter,
+        ready_delay=args.ready_delay, ready_jitter=args.ready_jitter, drop_rate=args.drop_rate,
+        error_rate=args.error_rate, log_entries=args.log_entries, new_log_interval=args.new_log_interval,
+        seed=args.seed,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(BydBoxSimulator(config).serve_forever())
+
+
+if __name__ == '__main__':
+    main()